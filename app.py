@@ -1,34 +1,85 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file
+from flask import Flask, Request, current_app, g, has_request_context, render_template, request, redirect, url_for, session, flash, jsonify, send_file, Response, stream_with_context
 from flask_wtf.csrf import CSRFProtect
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from flask_wtf.csrf import CSRFProtect
-from functools import wraps, lru_cache
+from functools import wraps
+from collections import Counter
 import os
 import uuid
-import qrcode
-from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import hashlib
+from datetime import datetime, timedelta
 import mysql.connector
 from mysql.connector import Error
 import json
-from io import BytesIO
 import base64
 from dotenv import load_dotenv
-import mailtrap as mt
 from flask_wtf.csrf import CSRFProtect
+from events import MemoryEventBroker, FileEventBroker
+from mail_transport import MailtrapTransport, SMTPTransport
+from email_templates import EmailRenderer
+from qr_codes import QRCodeCache, QR_FORMATS, render_qr_code
+from ingest import IngestedUpload
+from storage import BlobStore, acquire_blob, release_blob, file_sha256
+from search_index import SearchIndex, extract_pdf_text
+from verify_cache import VerifyCache
+from db import ConnectionPool, ReplicaMonitor
+from sqlite_db import connect_sqlite
+from metrics import MetricsRegistry
+from profiling import ProfileStore
+from passwords import PasswordHasher, HasherBusy
+from schema import check_schema, index_warnings, pending_migrations, apply_migration, record_migration, discover
+from settings_cache import SettingsCache, SettingsSnapshot, MemoryBackend, SharedMemoryBackend, RedisBackend
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from outbox import OutboxWorker, enqueue_email, get_outbox_summary, retry_dead_email
+import time
+import random
+import threading
+import click
 
 # Load environment variables
 load_dotenv()
 
+class IngestRequest(Request):
+    """Request that streams PDF uploads straight into the upload folder"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and filename.lower().endswith('.pdf'):
+            return IngestedUpload(os.path.join(current_app.config['UPLOAD_FOLDER'], '.incoming'))
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
 app = Flask(__name__)
+app.request_class = IngestRequest
 csrf = CSRFProtect(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-this-in-production')
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Latency histograms and counters for /metrics. Each worker writes its values
+# to METRICS_DIR and /metrics merges them; set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" from the scraper.
+metrics = MetricsRegistry(os.getenv('METRICS_DIR', os.path.join('cache', 'metrics')))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def record_query(seconds):
+    """Count a database query towards the global and per-request totals"""
+    metrics.observe('geec_db_query_duration_seconds', 'Time spent executing and fetching each query', seconds)
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_time = g.get('db_time', 0.0) + seconds
+
+def record_pool_wait(pool_name):
+    return lambda seconds: metrics.observe(
+        'geec_db_pool_wait_seconds', 'Time spent waiting for a pooled connection', seconds, pool=pool_name)
+
+# Request profiling. With PROFILING_ENABLED an admin can profile a request
+# with ?profile=1 or an "X-Profile: 1" header, and PROFILE_SAMPLE_RATE of all
+# requests are profiled too. When disabled the hooks are not even installed.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+profile_store = ProfileStore(os.getenv('PROFILE_DIR', os.path.join('cache', 'profiles')),
+                             max_profiles=int(os.getenv('PROFILE_MAX_KEPT', 50)))
+
 # Database configuration
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
@@ -37,63 +88,306 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'geec_password_123')
 }
 
-# Connection pool
-db_pool = None
-try:
-    db_pool = mysql.connector.pooling.MySQLConnectionPool(
-        pool_name="geec_pool",
-        pool_size=5,
-        pool_reset_session=True,
-        **DB_CONFIG
+# DB_ENGINE=sqlite keeps everything in the SQLITE_PATH file instead of MySQL,
+# for development, the test suites and small single-server sites
+DB_ENGINE = os.getenv('DB_ENGINE', 'mysql').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join('data', 'geec_dms.sqlite3'))
+
+def connect_database():
+    """Open a new connection to the configured database engine"""
+    if DB_ENGINE == 'sqlite':
+        return connect_sqlite(SQLITE_PATH, timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)))
+    return mysql.connector.connect(**DB_CONFIG)
+
+# Connection pool. Connections are opened on first use; when all DB_POOL_SIZE
+# are busy a request waits up to DB_POOL_TIMEOUT seconds for one to be returned.
+db_pool = ConnectionPool(
+    connect_database,
+    size=int(os.getenv('DB_POOL_SIZE', 5)),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+    max_waiting=int(os.getenv('DB_POOL_MAX_WAITING', 50)),
+    ping_after=int(os.getenv('DB_POOL_PING_AFTER', 30)),
+    idle_timeout=int(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+    max_lifetime=int(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+    on_wait=record_pool_wait('primary'),
+    on_query=record_query,
+)
+
+# Optional read replica for routes marked @replica_reads. Reads go back to the
+# primary while the replica is more than DB_REPLICA_MAX_LAG seconds behind,
+# and a user's reads stay on the primary for DB_REPLICA_PIN_SECONDS after
+# they change something, so they always see their own writes.
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+DB_REPLICA_MAX_LAG = int(os.getenv('DB_REPLICA_MAX_LAG', 5))
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 10))
+replica_pool = replica_monitor = None
+if DB_REPLICA_HOST and DB_ENGINE == 'mysql':
+    REPLICA_CONFIG = dict(DB_CONFIG,
+                          host=DB_REPLICA_HOST,
+                          port=int(os.getenv('DB_REPLICA_PORT', 3306)),
+                          user=os.getenv('DB_REPLICA_USER', DB_CONFIG['user']),
+                          password=os.getenv('DB_REPLICA_PASSWORD', DB_CONFIG['password']))
+    replica_pool = ConnectionPool(
+        lambda: mysql.connector.connect(**REPLICA_CONFIG),
+        size=int(os.getenv('DB_REPLICA_POOL_SIZE', os.getenv('DB_POOL_SIZE', 5))),
+        timeout=1,
+        on_wait=record_pool_wait('replica'),
+        on_query=record_query,
     )
-except Error as e:
-    print(f"Error creating connection pool: {e}")
+    replica_monitor = ReplicaMonitor(replica_pool, max_lag=DB_REPLICA_MAX_LAG)
+
+# Password hashing runs in PASSWORD_HASH_WORKERS processes (0: on the request
+# thread) with at most PASSWORD_HASH_MAX_PENDING waiting. PASSWORD_HASH_METHOD
+# is the cost policy; older hashes are replaced at their owner's next login.
+password_hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', 2)),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16)),
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', 10)),
+)
 
 # Mailtrap configuration
 MAILTRAP_API_KEY = os.getenv('MAILTRAP_API_KEY')
 MAILTRAP_FROM_EMAIL = os.getenv('MAILTRAP_FROM_EMAIL', 'jamshid@gulfextremeinc.com')
 
+# Outgoing mail goes through one long-lived transport per process: the
+# Mailtrap HTTP API (default) or an SMTP relay
+MAIL_TRANSPORT = os.getenv('MAIL_TRANSPORT', 'mailtrap').lower()
+MAIL_TIMEOUT = float(os.getenv('MAIL_TIMEOUT', 10))
+SMTP_CONFIG = {
+    'host': os.getenv('SMTP_HOST', 'localhost'),
+    'port': int(os.getenv('SMTP_PORT', 587)),
+    'username': os.getenv('SMTP_USERNAME'),
+    'password': os.getenv('SMTP_PASSWORD'),
+    'use_tls': os.getenv('SMTP_STARTTLS', 'True').lower() == 'true',
+    'use_ssl': os.getenv('SMTP_SSL', 'False').lower() == 'true',
+    'pool_size': int(os.getenv('SMTP_POOL_SIZE', 4)),
+}
+mail_transport = None
+
+# Notification email bodies (templates/email), compiled once per process
+email_renderer = EmailRenderer(os.path.join(app.root_path, 'templates', 'email'))
+
+# Letter change events for /api/events. The file broker reaches streams held
+# by every worker; the memory broker is enough for a single-process server.
+# Each open stream holds a worker for up to EVENTS_STREAM_MAX_AGE seconds, so
+# streaming is opt-in: enable it only with many threads per worker (gunicorn
+# gthread). Otherwise, e.g. under Passenger, browsers poll instead.
+EVENTS_ENABLED = os.getenv('EVENTS_ENABLED', 'False').lower() == 'true'
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'file')
+if EVENTS_BACKEND == 'memory':
+    event_broker = MemoryEventBroker()
+else:
+    event_broker = FileEventBroker(os.getenv('EVENTS_FILE', os.path.join('logs', 'events.log')))
+
+# QR codes are drawn on demand from the letter's verification URL and cached
+# in memory and under QR_CACHE_DIR. Only with QR_BASE_URL set (the public site
+# URL): otherwise the URL depends on the Host header and nothing is cached.
+QR_BASE_URL = os.getenv('QR_BASE_URL', '')
+qr_cache = QRCodeCache(os.getenv('QR_CACHE_DIR', os.path.join('cache', 'qr')))
+
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Letter files are stored once per distinct content, sharded by SHA-256
+blob_store = BlobStore(app.config['UPLOAD_FOLDER'])
+
+# Let the front-end server send letter files instead of a Python worker:
+# 'x-sendfile' for Apache mod_xsendfile, 'x-accel' for nginx (the internal
+# location mapping DOWNLOAD_ACCEL_PREFIX to the upload folder)
+DOWNLOAD_OFFLOAD = os.getenv('DOWNLOAD_OFFLOAD', '').lower()
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-uploads/')
+
+# Full-text index of letter contents. A single background thread extracts and
+# indexes text after uploads commit, so additions and removals apply in order.
+search_index = SearchIndex(os.getenv('SEARCH_INDEX_PATH', os.path.join('cache', 'search.sqlite3')))
+index_executor = ThreadPoolExecutor(max_workers=1)
+SEARCH_PAGE_SIZE = 20
+
+# Letters per /api/verify request
+VERIFY_BATCH_MAX = int(os.getenv('VERIFY_BATCH_MAX', 1000))
+
+# Rendered /verify pages, dropped on letter events; unknown numbers are cached briefly too
+verify_cache = VerifyCache(ttl=int(os.getenv('VERIFY_CACHE_TTL', 60)),
+                           negative_ttl=int(os.getenv('VERIFY_CACHE_NEGATIVE_TTL', 10)),
+                           settle=DB_REPLICA_MAX_LAG if replica_pool else 0)
+
+# Settings values are cached per worker and dropped everywhere when the
+# settings version kept by the backend moves: 'memory' for one process,
+# 'shared' (default) for workers on one host, 'redis' across hosts
+SETTINGS_CACHE_BACKEND = os.getenv('SETTINGS_CACHE_BACKEND', 'shared').lower()
+if SETTINGS_CACHE_BACKEND == 'redis':
+    import redis
+    settings_backend = RedisBackend(redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0')))
+elif SETTINGS_CACHE_BACKEND == 'memory':
+    settings_backend = MemoryBackend()
+else:
+    settings_backend = SharedMemoryBackend(os.getenv('SETTINGS_VERSION_FILE', os.path.join('cache', 'settings.version')))
+settings_cache = SettingsCache(settings_backend, ttl=int(os.getenv('SETTINGS_CACHE_TTL', 300)))
+
 @app.context_processor
 def inject_company_info():
     """Make company info available to all templates"""
-    return {'company_info': get_company_info()}
+    return {'company_info': get_company_info(), 'events_enabled': EVENTS_ENABLED}
 
-def get_db_connection():
+def use_replica():
+    """Whether this request's reads may go to the read replica"""
+    return (replica_pool is not None and has_request_context() and g.get('db_replica', False)
+            and session.get('db_primary_until', 0) < time.time() and replica_monitor.healthy())
+
+def get_db_connection(primary=False):
     """Get database connection"""
+    pools = [db_pool]
+    if not primary and use_replica():
+        pools.insert(0, replica_pool)
+
+    connection = None
+    for pool in pools:
+        try:
+            connection = pool.get_connection()
+            break
+        except Error as e:
+            if pool is replica_pool:
+                replica_monitor.mark_failed(e)
+            print(f"Error connecting to the database: {e}")
+    if connection is None:
+        return None
+
+    # Remembered so the connection is returned even if the view raises before closing it
+    if has_request_context():
+        g.setdefault('db_connections', []).append(connection)
+    return connection
+
+@contextmanager
+def db_connection(primary=False):
+    """Borrow a pooled connection for a with block; it is always returned"""
+    connection = get_db_connection(primary=primary)
+    if connection is None:
+        raise Error("No database connection")
     try:
-        if db_pool:
-            return db_pool.get_connection()
-        else:
-            # Fallback to direct connection if pool is not initialized
-            return mysql.connector.connect(**DB_CONFIG)
+        yield connection
+    finally:
+        connection.close()
+
+@app.teardown_request
+def return_db_connections(exc=None):
+    """Give back connections a request left open"""
+    for connection in g.pop('db_connections', []):
+        connection.close()
+
+# Numbered schema migrations, applied with `flask --app app migrate`
+MIGRATIONS_DIR = os.path.join(app.root_path, 'migrations')
+if DB_ENGINE == 'sqlite':
+    MIGRATIONS_DIR = os.path.join(MIGRATIONS_DIR, 'sqlite')
+SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'True').lower() == 'true'
+schema_checked = False
+
+def warn_about_schema():
+    """Print pending migrations, missing indexes and full-scan hot queries"""
+    connection = get_db_connection(primary=True)
+    if not connection:
+        return
+    try:
+        for warning in check_schema(connection, MIGRATIONS_DIR):
+            print(f"Schema warning: {warning}")
     except Error as e:
-        print(f"Error connecting to MySQL: {e}")
-        return None
+        print(f"Schema check failed: {e}")
+    finally:
+        connection.close()
+
+@app.before_request
+def check_schema_once():
+    """Check the schema in the background when a worker serves its first request"""
+    global schema_checked
+    if SCHEMA_CHECK and not schema_checked:
+        schema_checked = True
+        threading.Thread(target=warn_about_schema, daemon=True).start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Latency and database work of this request, by endpoint"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe('geec_http_request_duration_seconds', 'Time to build a response',
+                    time.perf_counter() - started, endpoint=endpoint, method=request.method,
+                    status=response.status_code)
+    metrics.observe('geec_db_queries_per_request', 'Database queries run by a request',
+                    g.get('db_queries', 0), buckets=QUERY_COUNT_BUCKETS, endpoint=endpoint)
+    metrics.observe('geec_db_time_per_request_seconds', 'Time a request spent in database queries',
+                    g.get('db_time', 0.0), endpoint=endpoint)
+
+    for name, pool in (('primary', db_pool), ('replica', replica_pool)):
+        if pool is not None:
+            stats = pool.stats()
+            for state in ('in_use', 'idle', 'waiting'):
+                metrics.set('geec_db_pool_connections', 'Pooled connections by state',
+                            stats[state], pool=name, state=state)
+    return response
+
+@app.after_request
+def pin_writers_to_primary(response):
+    """Keep a user's reads on the primary for a while after they change something"""
+    if replica_pool is not None and request.method not in ('GET', 'HEAD', 'OPTIONS') and 'user_id' in session:
+        session['db_primary_until'] = time.time() + DB_REPLICA_PIN_SECONDS
+    return response
+
+def start_profiling():
+    """Profile this request if an admin asked for it or it was sampled"""
+    requested = session.get('role') == 'Admin' and (
+        request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1')
+    if requested or random.random() < PROFILE_SAMPLE_RATE:
+        g.profile_run = profile_store.start()
+
+def finish_profiling(response):
+    run = g.pop('profile_run', None)
+    if run is not None:
+        name = profile_store.finish(run, endpoint=request.endpoint, method=request.method, path=request.path,
+                                    status=response.status_code, user=session.get('username'))
+        response.headers['X-Profile-Id'] = name
+    return response
+
+def discard_profiling(exc=None):
+    """Save the profile of a request that failed before its response was built"""
+    run = g.pop('profile_run', None)
+    if run is not None:
+        profile_store.finish(run, endpoint=request.endpoint, method=request.method, path=request.path,
+                             status=None, error=repr(exc) if exc else None, user=session.get('username'))
+
+if PROFILING_ENABLED:
+    # Registered after the other hooks, so the profile covers the view and its templates only
+    app.before_request(start_profiling)
+    app.after_request(finish_profiling)
+    app.teardown_request(discard_profiling)
+
+def get_settings():
+    """Current settings snapshot, loaded with one query per settings version"""
+    try:
+        return settings_cache.get('settings', load_settings, decode=SettingsSnapshot)
+    except Error as e:
+        # Not cached, so settings come back as soon as the database does
+        print(f"Error loading settings: {e}")
+        return SettingsSnapshot({})
+
+def load_settings():
+    """Read every row of the settings table"""
+    # Always the primary: a lagging replica would cache old values for a whole settings version
+    with db_connection(primary=True) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT setting_key, setting_value FROM settings")
+        snapshot = SettingsSnapshot(cursor.fetchall())
+        cursor.close()
+    return snapshot
 
-@lru_cache(maxsize=1)
 def get_company_info():
     """Get company information from settings"""
-    connection = get_db_connection()
-    company_info = {'name': 'GEEC', 'logo': None}
-    
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT setting_key, setting_value FROM settings WHERE setting_key IN ('company_name', 'company_logo')")
-        settings = cursor.fetchall()
-        
-        for setting in settings:
-            if setting['setting_key'] == 'company_name':
-                company_info['name'] = setting['setting_value']
-            elif setting['setting_key'] == 'company_logo':
-                company_info['logo'] = setting['setting_value']
-        
-        cursor.close()
-        connection.close()
-    
-    return company_info
+    return get_settings().company_info
 
 def login_required(f):
     """Decorator for routes that require login"""
@@ -125,6 +419,14 @@ def ceo_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def replica_reads(f):
+    """Decorator for read-only routes whose queries may use the read replica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
 @app.route('/')
 def index():
     """Home page - redirect to dashboard if logged in, otherwise to login"""
@@ -142,12 +444,20 @@ def login():
         connection = get_db_connection()
         if connection:
             cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+            cursor.execute("SELECT id, username, full_name, role, password FROM users WHERE username = %s",
+                           (username,))
             user = cursor.fetchone()
             cursor.close()
             connection.close()
             
-            if user and check_password_hash(user['password'], password):
+            try:
+                valid = user is not None and verify_password(user, password)
+            except HasherBusy:
+                metrics.inc('geec_password_hash_rejected_total', 'Logins turned away because hashing was busy')
+                flash('The server is busy. Please try again in a moment.')
+                return render_template('login.html'), 503
+            
+            if valid:
                 session['user_id'] = user['id']
                 session['username'] = user['username']
                 session['full_name'] = user['full_name']
@@ -161,6 +471,37 @@ def login():
     
     return render_template('login.html')
 
+def verify_password(user, password):
+    """Check a login password, moving its hash to the current policy when it matches"""
+    with metrics.timer('geec_password_check_seconds', 'Time to check a login password, including the wait'):
+        if not password_hasher.verify(user['password'], password):
+            return False
+    
+    if password_hasher.needs_rehash(user['password']):
+        rehash_password(user, password)
+    return True
+
+def rehash_password(user, password):
+    """Store a new hash of a user's password; skipped if it fails, to be retried at the next login"""
+    try:
+        new_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return
+    
+    connection = get_db_connection()
+    if connection:
+        cursor = connection.cursor()
+        try:
+            # Unless the password was changed in the meantime
+            cursor.execute("UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                           (new_hash, user['id'], user['password']))
+            connection.commit()
+        except Error as e:
+            print(f"Error rehashing password for user {user['id']}: {e}")
+        finally:
+            cursor.close()
+            connection.close()
+
 @app.route('/logout')
 def logout():
     """User logout"""
@@ -168,32 +509,287 @@ def logout():
     flash('You have been logged out.')
     return redirect(url_for('login'))
 
+# Row of letter_status_counts holding the totals across all uploaders
+GLOBAL_COUNTS_OWNER = 0
+
+def adjust_status_counts(cursor, uploaded_by, old_status=None, new_status=None):
+    """Apply a letter status transition to the materialized status counters.
+
+    Runs on the caller's cursor so the counters commit or roll back together
+    with the letter change itself. Both the uploader's row and the global
+    row are updated in a single statement.
+    """
+    adjust_status_counts_many(cursor, [(uploaded_by, old_status, new_status)])
+
+def adjust_status_counts_many(cursor, transitions):
+    """Apply (uploaded_by, old_status, new_status) transitions in a single statement"""
+    deltas = Counter()
+    for uploaded_by, old_status, new_status in transitions:
+        for status, delta in ((old_status, -1), (new_status, 1)):
+            if status and old_status != new_status:
+                deltas[(GLOBAL_COUNTS_OWNER, status)] += delta
+                deltas[(uploaded_by, status)] += delta
+
+    rows = [(owner, status, delta) for (owner, status), delta in deltas.items() if delta]
+    if rows:
+        cursor.execute(f"""
+            INSERT INTO letter_status_counts (uploaded_by, status, letter_count)
+            VALUES {', '.join(['(%s, %s, %s)'] * len(rows))}
+            ON DUPLICATE KEY UPDATE letter_count = letter_count + VALUES(letter_count)
+        """, tuple(value for row in rows for value in row))
+
+def get_status_counts(uploaded_by=GLOBAL_COUNTS_OWNER):
+    """Read the letter counts per status for one uploader (or everyone) from the counters table"""
+    stats = {'verified': 0, 'pending': 0, 'rejected': 0}
+    connection = get_db_connection()
+
+    if connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT status, letter_count FROM letter_status_counts WHERE uploaded_by = %s",
+                       (uploaded_by,))
+
+        for row in cursor.fetchall():
+            if row['status'] in LETTER_STATUSES:
+                stats[row['status'].lower()] = row['letter_count']
+
+        cursor.close()
+        connection.close()
+
+    stats['total'] = stats['verified'] + stats['pending'] + stats['rejected']
+    return stats
+
+def get_session_status_counts():
+    """Admins and the CEO see the global counts, everyone else their own letters"""
+    if session.get('role') in ['Admin', 'CEO']:
+        return get_status_counts()
+    return get_status_counts(session['user_id'])
+
 @app.route('/dashboard')
 @login_required
+@replica_reads
 def dashboard():
     """Main dashboard"""
+    return render_template('dashboard.html', stats=get_session_status_counts())
+
+@app.route('/api/dashboard-stats')
+@login_required
+@replica_reads
+def dashboard_stats():
+    """Letter counts for the dashboard statistics cards"""
+    return jsonify(get_session_status_counts())
+
+@app.cli.command('reconcile-counts')
+def reconcile_counts():
+    """Rebuild letter_status_counts from the letters table and report any drift"""
     connection = get_db_connection()
-    stats = {'verified': 0, 'pending': 0, 'rejected': 0}
+    if not connection:
+        print("Database connection error.")
+        return
+
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT uploaded_by, status, letter_count FROM letter_status_counts FOR UPDATE")
+        before = {(row['uploaded_by'], row['status']): row['letter_count'] for row in cursor.fetchall()}
+
+        cursor.execute("SELECT uploaded_by, status, COUNT(*) as letter_count FROM letters GROUP BY uploaded_by, status")
+        after = {}
+        for row in cursor.fetchall():
+            after[(row['uploaded_by'], row['status'])] = row['letter_count']
+            global_key = (GLOBAL_COUNTS_OWNER, row['status'])
+            after[global_key] = after.get(global_key, 0) + row['letter_count']
+
+        cursor.execute("DELETE FROM letter_status_counts")
+        if after:
+            cursor.executemany("""
+                INSERT INTO letter_status_counts (uploaded_by, status, letter_count)
+                VALUES (%s, %s, %s)
+            """, [(owner, status, count) for (owner, status), count in after.items()])
+        connection.commit()
+    except Error as e:
+        connection.rollback()
+        print(f"Error reconciling counters: {e}")
+        return
+    finally:
+        cursor.close()
+        connection.close()
+
+    drift = [(key, before.get(key, 0), after.get(key, 0))
+             for key in sorted(set(before) | set(after), key=str)
+             if before.get(key, 0) != after.get(key, 0)]
+    for (owner, status), old, new in drift:
+        scope = 'global' if owner == GLOBAL_COUNTS_OWNER else f'user {owner}'
+        print(f"{scope} {status}: {old} -> {new}")
+    print(f"Counters reconciled, {len(drift)} drifted row(s) fixed.")
+
+def index_letter(letter_number, uploaded_by, original_filename, filename):
+    """Extract a letter's text and add it to the search index"""
+    try:
+        content = extract_pdf_text(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        search_index.add(letter_number, uploaded_by, original_filename, content)
+    except Exception as e:
+        print(f"Error indexing letter {letter_number}: {e}")
+
+@app.cli.command('migrate')
+@click.option('--status', is_flag=True, help='List applied and pending migrations and check indexes.')
+@click.option('--mark-applied', type=int, metavar='VERSION',
+              help='Record migrations up to VERSION as applied without running them.')
+def migrate(status, mark_applied):
+    """Apply pending schema migrations in order"""
+    connection = get_db_connection(primary=True)
+    if not connection:
+        print("Database connection error.")
+        return
     
-    if connection:
-        cursor = connection.cursor(dictionary=True)
+    try:
+        pending = pending_migrations(connection, MIGRATIONS_DIR)
         
-        # Get letter statistics
-        cursor.execute("SELECT status, COUNT(*) as count FROM letters GROUP BY status")
-        status_counts = cursor.fetchall()
+        if status:
+            pending_versions = {version for version, _, _ in pending}
+            for version, name, _ in discover(MIGRATIONS_DIR):
+                print(f"{version:04d}_{name}: {'pending' if version in pending_versions else 'applied'}")
+            for warning in index_warnings(connection):
+                print(f"Warning: {warning}")
+            return
         
-        for row in status_counts:
-            if row['status'] == 'Verified':
-                stats['verified'] = row['count']
-            elif row['status'] == 'Pending':
-                stats['pending'] = row['count']
-            elif row['status'] == 'Rejected':
-                stats['rejected'] = row['count']
+        if mark_applied is not None:
+            # For databases that were set up by hand from the SQL files
+            cursor = connection.cursor()
+            marked = [(version, name) for version, name, _ in pending if version <= mark_applied]
+            for version, name in marked:
+                record_migration(cursor, version, name)
+            connection.commit()
+            cursor.close()
+            print(f"Marked {len(marked)} migration(s) as applied.")
+            return
+        
+        for version, name, path in pending:
+            print(f"Applying {version:04d}_{name}...")
+            try:
+                apply_migration(connection, version, name, path)
+            except Error as e:
+                print(f"Migration {version:04d}_{name} failed: {e}")
+                return
+        print(f"Applied {len(pending)} migration(s).")
+        
+        for warning in index_warnings(connection):
+            print(f"Warning: {warning}")
+    finally:
+        connection.close()
+
+# The accounts listed under Default Login Credentials in the README. Their
+# passwords are public, so they are never created by migrations; this command
+# has to be run on purpose, and only on a database without any users.
+DEFAULT_USERS = [
+    ('admin', 'System Administrator', 'admin@example.com', 'Admin', 'admin123'),
+    ('ceo', 'Chief Executive Officer', 'ceo@example.com', 'CEO', 'ceo123'),
+    ('user', 'Standard User', 'user@example.com', 'User', 'user123'),
+]
+
+@app.cli.command('seed-default-users')
+def seed_default_users():
+    """Create the default admin, ceo and user accounts in a new database"""
+    connection = get_db_connection(primary=True)
+    if not connection:
+        print("Database connection error.")
+        return
+    
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0]:
+            print("The users table is not empty; default accounts are only created in a new database.")
+            return
         
+        cursor.executemany("""
+            INSERT INTO users (username, full_name, email, role, password, created_date)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(username, full_name, email, role, password_hasher.hash(password), datetime.now())
+              for username, full_name, email, role, password in DEFAULT_USERS])
+        connection.commit()
+        print(f"Created {len(DEFAULT_USERS)} default accounts. Change their passwords before going live.")
+    except Error as e:
+        connection.rollback()
+        print(f"Error creating default accounts: {e}")
+    finally:
         cursor.close()
         connection.close()
+
+@app.cli.command('search-backfill')
+@click.option('--rebuild', is_flag=True, help='Re-index letters that are already indexed.')
+def search_backfill(rebuild):
+    """Add existing letters to the full-text search index"""
+    connection = get_db_connection()
+    if not connection:
+        print("Database connection error.")
+        return
     
-    return render_template('dashboard.html', stats=stats)
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT letter_number, uploaded_by, original_filename, filename FROM letters")
+    letters = cursor.fetchall()
+    cursor.close()
+    connection.close()
+    
+    indexed = set() if rebuild else search_index.indexed_letters()
+    pending = [letter for letter in letters if letter['letter_number'] not in indexed]
+    for count, letter in enumerate(pending, 1):
+        index_letter(letter['letter_number'], letter['uploaded_by'], letter['original_filename'], letter['filename'])
+        if count % 100 == 0:
+            print(f"Indexed {count}/{len(pending)} letters")
+    
+    print(f"Indexed {len(pending)} letter(s); {len(letters) - len(pending)} already indexed.")
+
+@app.cli.command('migrate-uploads')
+@click.option('--dry-run', is_flag=True, help='Report what would be moved without changing anything.')
+def migrate_uploads(dry_run):
+    """Move files from the flat uploads/ directory into the content-addressed store"""
+    connection = get_db_connection()
+    if not connection:
+        print("Database connection error.")
+        return
+    
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT id, letter_number, filename FROM letters WHERE filename NOT LIKE %s", ('%/%',))
+    letters = cursor.fetchall()
+    
+    moved, shared, missing = 0, 0, 0
+    seen = set()
+    for letter in letters:
+        source_path = os.path.join(app.config['UPLOAD_FOLDER'], letter['filename'])
+        if not os.path.exists(source_path):
+            print(f"{letter['letter_number']}: file {letter['filename']} is missing, skipped")
+            missing += 1
+            continue
+        
+        sha256, size = file_sha256(source_path)
+        if sha256 in seen or os.path.exists(blob_store.path(sha256)):
+            shared += 1
+        seen.add(sha256)
+        if dry_run:
+            print(f"{letter['letter_number']}: {letter['filename']} -> {blob_store.relative_path(sha256)}")
+            moved += 1
+            continue
+        
+        # Link the blob, commit the new path, and only then drop the old name,
+        # so an interrupted run can simply be started again
+        try:
+            acquire_blob(cursor, sha256, size)
+            stored_filename = blob_store.add_file(source_path, sha256)
+            cursor.execute("""
+                UPDATE letters SET filename = %s, file_sha256 = %s, file_size = %s WHERE id = %s
+            """, (stored_filename, sha256, size, letter['id']))
+            connection.commit()
+        except Error as e:
+            connection.rollback()
+            print(f"{letter['letter_number']}: {e}")
+            continue
+        
+        os.remove(source_path)
+        moved += 1
+    
+    cursor.close()
+    connection.close()
+    action = "Would move" if dry_run else "Moved"
+    print(f"{action} {moved} file(s), {shared} duplicate(s) of already stored content; {missing} missing.")
 
 @app.route('/create_letter', methods=['GET', 'POST'])
 @login_required
@@ -210,43 +806,66 @@ def create_letter():
             return redirect(request.url)
         
         if file and file.filename.lower().endswith('.pdf'):
+            # The body was hashed and checked while it was received (see IngestRequest)
+            upload = file.stream
+            problem = upload.problem()
+            if problem:
+                flash(problem)
+                return redirect(request.url)
+            
             filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(file_path)
             
             # Generate unique barcode
             letter_number = str(uuid.uuid4()).replace('-', '')[:12].upper()
             
-            # Generate QR code
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(f"{request.url_root}verify/{letter_number}")
-            qr.make(fit=True)
-            
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            qr_buffer = BytesIO()
-            qr_img.save(qr_buffer, format='PNG')
-            qr_code_data = base64.b64encode(qr_buffer.getvalue()).decode()
-            
             # Save to database
+            upload_date = datetime.now()
             connection = get_db_connection()
             if connection:
                 cursor = connection.cursor()
-                cursor.execute("""
-                    INSERT INTO letters (letter_number, filename, original_filename, 
-                    uploaded_by, upload_date, status, qr_code, require_ceo_verification)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (letter_number, unique_filename, filename, session['user_id'], 
-                     datetime.now(), 'Pending', qr_code_data, 
-                     1 if 'require_verification' in request.form else 0))
+                stored_here = False
                 
-                connection.commit()
-                cursor.close()
-                connection.close()
+                try:
+                    # Take the blob reference (and its row lock) before placing the file,
+                    # so a concurrent delete of the same content can't remove it under us
+                    acquire_blob(cursor, upload.sha256, upload.size)
+                    stored_here = not os.path.exists(blob_store.path(upload.sha256))
+                    stored_filename = blob_store.add(upload)
+                    
+                    cursor.execute("""
+                        INSERT INTO letters (letter_number, filename, original_filename, 
+                        uploaded_by, upload_date, status, require_ceo_verification,
+                        file_sha256, file_size)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (letter_number, stored_filename, filename, session['user_id'], 
+                         upload_date, 'Pending', 
+                         1 if 'require_verification' in request.form else 0,
+                         upload.sha256, upload.size))
+                    adjust_status_counts(cursor, session['user_id'], new_status='Pending')
+                    
+                    # Queue email to CEO if verification required; delivered by the outbox worker
+                    if 'require_verification' in request.form:
+                        queue_ceo_notification(cursor, letter_number, filename, session['full_name'], upload_date)
+                    
+                    connection.commit()
+                except (Error, OSError) as e:
+                    # The blob row is rolled back too, so a file placed by this request has no
+                    # reference left; removed while the row lock still keeps other uploads out
+                    if stored_here:
+                        blob_store.remove(upload.sha256)
+                    try:
+                        connection.rollback()
+                    except Error:
+                        pass
+                    print(f"Error saving letter {letter_number}: {e}")
+                    flash('Database error occurred.')
+                    return redirect(request.url)
+                finally:
+                    cursor.close()
+                    connection.close()
                 
-                # Send email to CEO if verification required
-                if 'require_verification' in request.form:
-                    send_ceo_notification(letter_number, filename)
+                publish_letter_event('letter.created', letter_number, session['user_id'], new_status='Pending')
+                index_executor.submit(index_letter, letter_number, session['user_id'], filename, stored_filename)
                 
                 flash('Letter uploaded successfully!')
                 return redirect(url_for('letter_status'))
@@ -257,51 +876,363 @@ def create_letter():
     
     return render_template('create_letter.html')
 
+LETTER_STATUSES = ('Verified', 'Pending', 'Rejected')
+LETTERS_PAGE_SIZE = 50
+LETTERS_MAX_PAGE_SIZE = 200
+
+def encode_letter_cursor(upload_date, letter_id):
+    """Encode the (upload_date, id) keyset position of a letter as an opaque token"""
+    raw = f"{upload_date.isoformat()}|{letter_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_letter_cursor(token):
+    """Decode a cursor token back into (upload_date, id), or None if it is invalid"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        upload_date, letter_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(upload_date), int(letter_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def parse_date_filter(value):
+    """Parse a YYYY-MM-DD query parameter, ignoring anything malformed"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+def get_letter_filters(args):
+    """Build the letter_status filters from query parameters"""
+    status = args.get('status', '')
+    uploader = args.get('uploader', '')
+
+    return {
+        'status': status if status in LETTER_STATUSES else '',
+        'uploader': int(uploader) if uploader.isdigit() else None,
+        'date_from': parse_date_filter(args.get('date_from', '')),
+        'date_to': parse_date_filter(args.get('date_to', '')),
+        'q': args.get('q', '').strip()[:100],
+    }
+
+def letter_filter_args(filters):
+    """Query parameters that reproduce the given filters, for links and the next-page fetch"""
+    args = {
+        'status': filters['status'],
+        'uploader': filters['uploader'],
+        'date_from': filters['date_from'].strftime('%Y-%m-%d') if filters['date_from'] else '',
+        'date_to': filters['date_to'].strftime('%Y-%m-%d') if filters['date_to'] else '',
+        'q': filters['q'],
+    }
+    return {key: value for key, value in args.items() if value}
+
+def fetch_letters_page(filters, cursor_token=None, limit=LETTERS_PAGE_SIZE):
+    """Fetch one page of letters ordered by (upload_date, id) using keyset pagination.
+
+    Every filter is applied in SQL so the query can be served from the
+    letters indexes, and the cost of a page stays flat however deep the
+    user scrolls. Returns (letters, next_cursor); next_cursor is None on
+    the last page.
+    """
+    where = []
+    params = []
+
+    # Regular users only ever see their own letters
+    if session['role'] in ['Admin', 'CEO']:
+        if filters['uploader']:
+            where.append("l.uploaded_by = %s")
+            params.append(filters['uploader'])
+    else:
+        where.append("l.uploaded_by = %s")
+        params.append(session['user_id'])
+
+    if filters['status']:
+        where.append("l.status = %s")
+        params.append(filters['status'])
+
+    if filters['date_from']:
+        where.append("l.upload_date >= %s")
+        params.append(filters['date_from'])
+
+    if filters['date_to']:
+        where.append("l.upload_date < %s")
+        params.append(filters['date_to'] + timedelta(days=1))
+
+    if filters['q']:
+        # Prefix matches so the letter_number and original_filename indexes apply;
+        # '!' escapes wildcards the same way in MySQL and SQLite
+        pattern = filters['q'].replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+        where.append("(l.letter_number LIKE %s ESCAPE '!' OR l.original_filename LIKE %s ESCAPE '!')")
+        params.extend([pattern.upper(), pattern])
+
+    position = decode_letter_cursor(cursor_token)
+    if position:
+        where.append("(l.upload_date < %s OR (l.upload_date = %s AND l.id < %s))")
+        params.extend([position[0], position[0], position[1]])
+
+    # Select only necessary columns to reduce payload size (exclude verification_comments)
+    # Note: id and filename are required for internal logic (links, downloads)
+    query = f"""
+        SELECT l.id, l.letter_number, l.filename, l.original_filename, l.uploaded_by, l.upload_date, l.status,
+               l.verified_by, l.verified_date,
+               u1.full_name as uploaded_by_name, u2.full_name as verified_by_name
+        FROM letters l
+        LEFT JOIN users u1 ON l.uploaded_by = u1.id
+        LEFT JOIN users u2 ON l.verified_by = u2.id
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY l.upload_date DESC, l.id DESC
+        LIMIT %s
+    """
+    # Fetch one extra row to find out whether another page exists
+    params.append(limit + 1)
+
+    letters = []
+    connection = get_db_connection()
+    if connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, tuple(params))
+        letters = cursor.fetchall()
+        cursor.close()
+        connection.close()
+
+    next_cursor = None
+    if len(letters) > limit:
+        letters = letters[:limit]
+        next_cursor = encode_letter_cursor(letters[-1]['upload_date'], letters[-1]['id'])
+
+    return letters, next_cursor
+
+def get_uploader_choices():
+    """Users that can be picked in the letter_status uploader filter"""
+    connection = get_db_connection()
+    uploaders = []
+
+    if connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT id, full_name FROM users ORDER BY full_name")
+        uploaders = cursor.fetchall()
+        cursor.close()
+        connection.close()
+
+    return uploaders
+
 @app.route('/letter_status')
 @login_required
+@replica_reads
 def letter_status():
     """View letter status"""
+    filters = get_letter_filters(request.args)
+    letters, next_cursor = fetch_letters_page(filters, request.args.get('cursor'))
+    uploaders = get_uploader_choices() if session['role'] in ['Admin', 'CEO'] else []
+
+    return render_template('letter_status.html', letters=letters, next_cursor=next_cursor,
+                           filters=filters, filter_args=letter_filter_args(filters), uploaders=uploaders,
+                           status_cursor=(datetime.now() - STATUS_POLL_OVERLAP).isoformat())
+
+@app.route('/api/letters')
+@login_required
+def api_letters():
+    """Next page of letters for infinite scroll on letter_status"""
+    filters = get_letter_filters(request.args)
+    limit = request.args.get('limit', LETTERS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, LETTERS_MAX_PAGE_SIZE))
+
+    letters, next_cursor = fetch_letters_page(filters, request.args.get('cursor'), limit)
+
+    return jsonify({
+        'success': True,
+        'next_cursor': next_cursor,
+        'rows_html': render_template('_letter_rows.html', letters=letters),
+        'cards_html': render_template('_letter_cards.html', letters=letters),
+        'letters': [{
+            'letter_number': letter['letter_number'],
+            'original_filename': letter['original_filename'],
+            'uploaded_by_name': letter['uploaded_by_name'],
+            'upload_date': letter['upload_date'].isoformat() if letter['upload_date'] else None,
+            'status': letter['status'],
+            'verified_by_name': letter['verified_by_name'],
+            'verified_date': letter['verified_date'].isoformat() if letter['verified_date'] else None,
+        } for letter in letters],
+    })
+
+STATUS_POLL_MAX_LETTERS = 500
+# Status changes committed just before a poll may carry a verified_date older
+# than the poll itself, so every cursor overlaps the previous window a little.
+STATUS_POLL_OVERLAP = timedelta(seconds=10)
+
+@app.route('/api/letter-status', methods=['POST'])
+@login_required
+def api_letter_status():
+    """Batched status poll for the letters visible on letter_status.
+
+    Takes {"letter_numbers": [...], "since": cursor} and answers with a single
+    indexed IN query returning only the letters whose status changed after
+    the cursor. Nothing changed -> 204; same changes as last time -> 304.
+    """
+    data = request.get_json(silent=True) or {}
+    letter_numbers = data.get('letter_numbers')
+
+    if not isinstance(letter_numbers, list) or not all(isinstance(n, str) for n in letter_numbers):
+        return jsonify({'success': False, 'error': 'letter_numbers must be a list of strings'}), 400
+    if len(letter_numbers) > STATUS_POLL_MAX_LETTERS:
+        return jsonify({'success': False, 'error': f'At most {STATUS_POLL_MAX_LETTERS} letters per request'}), 400
+
+    since = None
+    if data.get('since'):
+        try:
+            since = datetime.fromisoformat(data['since'])
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid since cursor'}), 400
+
+    letter_numbers = list(dict.fromkeys(letter_numbers))
+    cursor_value = (datetime.now() - STATUS_POLL_OVERLAP).isoformat()
+    if not letter_numbers:
+        return '', 204, {'X-Status-Cursor': cursor_value}
+
+    placeholders = ', '.join(['%s'] * len(letter_numbers))
+    query = f"""
+        SELECT l.letter_number, l.status, l.verified_date, u.full_name as verified_by_name
+        FROM letters l
+        LEFT JOIN users u ON l.verified_by = u.id
+        WHERE l.letter_number IN ({placeholders})
+    """
+    params = list(letter_numbers)
+
+    if since:
+        query += " AND l.verified_date > %s"
+        params.append(since)
+
+    if session['role'] not in ['Admin', 'CEO']:
+        query += " AND l.uploaded_by = %s"
+        params.append(session['user_id'])
+
     connection = get_db_connection()
-    letters = []
+    if not connection:
+        return jsonify({'success': False, 'error': 'Database connection error'}), 503
+
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+    if not rows:
+        return '', 204, {'X-Status-Cursor': cursor_value}
+
+    changes = [{
+        'letter_number': row['letter_number'],
+        'status': row['status'],
+        'verified_by_name': row['verified_by_name'],
+        'verified_date': row['verified_date'].isoformat() if row['verified_date'] else None,
+    } for row in rows]
+    changes.sort(key=lambda change: change['letter_number'])
+
+    etag = hashlib.sha1(json.dumps(changes, sort_keys=True).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"', 'X-Status-Cursor': cursor_value}
+
+    response = jsonify({'success': True, 'cursor': cursor_value, 'changes': changes})
+    response.headers['X-Status-Cursor'] = cursor_value
+    response.set_etag(etag)
+    return response
+
+# Streams end after this long so workers are recycled; EventSource reconnects on its own
+EVENTS_STREAM_MAX_AGE = int(os.getenv('EVENTS_STREAM_MAX_AGE', 300))
+EVENTS_KEEPALIVE_INTERVAL = 15
+
+def publish_letter_event(event_type, letter_number, uploaded_by, old_status=None, new_status=None):
+    """Tell every open /api/events stream about a committed letter change"""
+    try:
+        event_broker.publish(event_type, {
+            'letter_number': letter_number,
+            'uploaded_by': uploaded_by,
+            'old_status': old_status,
+            'status': new_status,
+        })
+    except OSError as e:
+        print(f"Error publishing letter event: {e}")
+
+@app.route('/api/events')
+@login_required
+def letter_events():
+    """Server-Sent Events stream of letter changes visible to the current user"""
+    if not EVENTS_ENABLED:
+        # 204 tells EventSource in pages loaded before streaming was disabled to stop reconnecting
+        return '', 204
+    user_id = session['user_id']
+    sees_all = session['role'] in ['Admin', 'CEO']
+    position, resync = event_broker.position(request.headers.get('Last-Event-ID'))
+
+    def generate(position):
+        yield "retry: 5000\n\n"
+        if resync:
+            # Events were missed while disconnected; the client re-polls once
+            yield "event: resync\ndata: {}\n\n"
+
+        deadline = time.monotonic() + EVENTS_STREAM_MAX_AGE
+        while time.monotonic() < deadline:
+            events, position = event_broker.wait(position, EVENTS_KEEPALIVE_INTERVAL)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+
+            for event in events:
+                if sees_all or event.data.get('uploaded_by') == user_id:
+                    yield f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+    return Response(stream_with_context(generate(position)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/search')
+@login_required
+@replica_reads
+def search():
+    """Full-text search over letter contents and filenames"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results = []
     
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        
-        # Select only necessary columns to reduce payload size (exclude qr_code and verification_comments)
-        # Note: id and filename are required for internal logic (links, downloads)
-        columns = """
-            l.id, l.letter_number, l.filename, l.original_filename, l.uploaded_by, l.upload_date, l.status,
-            l.verified_by, l.verified_date,
-            u1.full_name as uploaded_by_name, u2.full_name as verified_by_name
-        """
-
-        if session['role'] in ['Admin', 'CEO']:
-            cursor.execute(f"""
-                SELECT {columns}
-                FROM letters l
-                LEFT JOIN users u1 ON l.uploaded_by = u1.id
-                LEFT JOIN users u2 ON l.verified_by = u2.id
-                ORDER BY l.upload_date DESC
-            """)
-        else:
+    if query:
+        # Regular users only search their own letters
+        uploaded_by = None if session.get('role') in ['Admin', 'CEO'] else session.get('user_id')
+        results = search_index.search(query, uploaded_by=uploaded_by, limit=SEARCH_PAGE_SIZE + 1,
+                                      offset=(page - 1) * SEARCH_PAGE_SIZE)
+    
+    has_next = len(results) > SEARCH_PAGE_SIZE
+    results = results[:SEARCH_PAGE_SIZE]
+    
+    # Add current status and drop letters deleted since they were indexed
+    if results:
+        connection = get_db_connection()
+        if connection:
+            cursor = connection.cursor(dictionary=True)
+            numbers = [result['letter_number'] for result in results]
             cursor.execute(f"""
-                SELECT {columns}
-                FROM letters l
-                LEFT JOIN users u1 ON l.uploaded_by = u1.id
-                LEFT JOIN users u2 ON l.verified_by = u2.id
-                WHERE l.uploaded_by = %s
-                ORDER BY l.upload_date DESC
-            """, (session['user_id'],))
-        
-        letters = cursor.fetchall()
-        cursor.close()
-        connection.close()
+                SELECT letter_number, status, upload_date FROM letters
+                WHERE letter_number IN ({', '.join(['%s'] * len(numbers))})
+            """, numbers)
+            letters = {row['letter_number']: row for row in cursor.fetchall()}
+            cursor.close()
+            connection.close()
+            
+            results = [dict(result, **letters[result['letter_number']])
+                       for result in results if result['letter_number'] in letters]
     
-    return render_template('letter_status.html', letters=letters)
+    return render_template('search.html', query=query, results=results, page=page, has_next=has_next)
 
 @app.route('/verify/<letter_number>')
+@replica_reads
 def verify_letter(letter_number):
     """Public verification page"""
+    # Other workers' approvals and deletions reach this cache through the event broker
+    verify_cache.listen(event_broker)
+    cached = verify_cache.get(letter_number)
+    if cached is not None:
+        return cached[0]
+    
     connection = get_db_connection()
     letter_info = None
     
@@ -320,7 +1251,113 @@ def verify_letter(letter_number):
         cursor.close()
         connection.close()
     
-    return render_template('verify_letter.html', letter=letter_info)
+    html = render_template('verify_letter.html', letter=letter_info)
+    # Database errors are not cached; garbage numbers are too long to be worth remembering
+    if connection and len(letter_number) <= 64:
+        verify_cache.set(letter_number, html, found=letter_info is not None)
+    return html
+
+def verification_result(row):
+    """Compact public verification record for one letter"""
+    return {
+        'letter_number': row['letter_number'],
+        'found': True,
+        'status': row['status'],
+        'upload_date': row['upload_date'].isoformat() if row['upload_date'] else None,
+        'verified_date': row['verified_date'].isoformat() if row['verified_date'] else None,
+        'verified_by': row['verified_by_name'],
+    }
+
+@app.route('/api/verify', methods=['POST'])
+@csrf.exempt
+@replica_reads
+def api_verify():
+    """Verify a batch of letters for scanners and partner systems.
+
+    Takes {"letter_numbers": [...]} (at most VERIFY_BATCH_MAX) and resolves
+    all of them with one indexed IN query; numbers that don't exist come back
+    as {"letter_number": ..., "found": false}. With Accept: application/x-ndjson
+    each result is streamed as its own JSON line as rows arrive.
+    """
+    data = request.get_json(silent=True) or {}
+    letter_numbers = data.get('letter_numbers')
+
+    if not isinstance(letter_numbers, list) or not all(isinstance(n, str) for n in letter_numbers):
+        return jsonify({'success': False, 'error': 'letter_numbers must be a list of strings'}), 400
+    if len(letter_numbers) > VERIFY_BATCH_MAX:
+        return jsonify({'success': False, 'error': f'At most {VERIFY_BATCH_MAX} letters per request'}), 400
+
+    letter_numbers = list(dict.fromkeys(letter_numbers))
+    if not letter_numbers:
+        return jsonify({'success': True, 'results': []})
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'success': False, 'error': 'Database connection error'}), 503
+
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT l.letter_number, l.status, l.upload_date, l.verified_date, u.full_name as verified_by_name
+        FROM letters l
+        LEFT JOIN users u ON l.verified_by = u.id
+        WHERE l.letter_number IN ({', '.join(['%s'] * len(letter_numbers))})
+    """, tuple(letter_numbers))
+
+    # Rows come back with the stored spelling of each number, which the IN
+    # lookup matches case-insensitively; results keep the caller's spelling
+    requested = {}
+    for letter_number in letter_numbers:
+        requested.setdefault(letter_number.lower(), []).append(letter_number)
+
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        def generate():
+            pending = dict(requested)
+            try:
+                for row in cursor:
+                    for letter_number in pending.pop(row['letter_number'].lower(), []):
+                        yield json.dumps(dict(verification_result(row), letter_number=letter_number)) + '\n'
+            finally:
+                # A client that hangs up early leaves unread rows behind
+                try:
+                    cursor.close()
+                    connection.close()
+                except Error as e:
+                    print(f"Error closing verify stream: {e}")
+            for letter_number in letter_numbers:
+                if letter_number.lower() in pending:
+                    yield json.dumps({'letter_number': letter_number, 'found': False}) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    found = {row['letter_number'].lower(): verification_result(row) for row in cursor.fetchall()}
+    cursor.close()
+    connection.close()
+
+    results = [dict(found[n.lower()], letter_number=n) if n.lower() in found else {'letter_number': n, 'found': False}
+               for n in letter_numbers]
+    return jsonify({'success': True, 'results': results})
+
+@app.route('/api/cache-stats')
+@admin_required
+def cache_stats():
+    """Hit statistics for the application caches"""
+    return jsonify({'success': True, 'verify': verify_cache.stats(), 'settings': settings_cache.stats()})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Metrics of every worker in the Prometheus text format"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/db-stats')
+@admin_required
+def db_stats():
+    """Connection pool usage for this worker"""
+    stats = {'success': True, 'pool': db_pool.stats()}
+    if replica_pool is not None:
+        stats['replica'] = dict(replica_monitor.stats(), pool=replica_pool.stats())
+    return jsonify(stats)
 
 @app.route('/ceo_verify/<letter_number>')
 @ceo_required
@@ -332,7 +1369,8 @@ def ceo_verify(letter_number):
     if connection:
         cursor = connection.cursor(dictionary=True)
         cursor.execute("""
-            SELECT l.*, u.full_name as uploaded_by_name
+            SELECT l.letter_number, l.original_filename, l.upload_date, l.status,
+                   u.full_name as uploaded_by_name
             FROM letters l
             LEFT JOIN users u ON l.uploaded_by = u.id
             WHERE l.letter_number = %s
@@ -352,19 +1390,41 @@ def approve_letter(letter_number):
     
     connection = get_db_connection()
     if connection:
-        cursor = connection.cursor()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT l.status, l.uploaded_by, l.original_filename, u.email as uploader_email
+            FROM letters l
+            LEFT JOIN users u ON l.uploaded_by = u.id
+            WHERE l.letter_number = %s
+            FOR UPDATE
+        """, (letter_number,))
+        letter = cursor.fetchone()
+        
+        if not letter:
+            connection.rollback()
+            cursor.close()
+            connection.close()
+            flash('Letter not found.')
+            return redirect(url_for('letter_status'))
+        
+        verified_date = datetime.now()
         cursor.execute("""
             UPDATE letters SET status = 'Verified', verified_by = %s, 
             verified_date = %s, verification_comments = %s
             WHERE letter_number = %s
-        """, (session['user_id'], datetime.now(), comments, letter_number))
+        """, (session['user_id'], verified_date, comments, letter_number))
+        adjust_status_counts(cursor, letter['uploaded_by'], letter['status'], 'Verified')
+        
+        # Queue approval notification to uploader; delivered by the outbox worker
+        queue_approval_notification(cursor, letter_number, letter['original_filename'], letter['uploader_email'],
+                                    'Verified', session.get('full_name'), verified_date, comments)
         
         connection.commit()
         cursor.close()
         connection.close()
         
-        # Send approval notification to uploader
-        send_approval_notification(letter_number, 'Verified', comments)
+        verify_cache.invalidate(letter_number)
+        publish_letter_event('letter.status', letter_number, letter['uploaded_by'], letter['status'], 'Verified')
         
         flash('Letter approved successfully!')
     
@@ -378,24 +1438,196 @@ def reject_letter(letter_number):
     
     connection = get_db_connection()
     if connection:
-        cursor = connection.cursor()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT l.status, l.uploaded_by, l.original_filename, u.email as uploader_email
+            FROM letters l
+            LEFT JOIN users u ON l.uploaded_by = u.id
+            WHERE l.letter_number = %s
+            FOR UPDATE
+        """, (letter_number,))
+        letter = cursor.fetchone()
+        
+        if not letter:
+            connection.rollback()
+            cursor.close()
+            connection.close()
+            flash('Letter not found.')
+            return redirect(url_for('letter_status'))
+        
+        verified_date = datetime.now()
         cursor.execute("""
             UPDATE letters SET status = 'Rejected', verified_by = %s, 
             verified_date = %s, verification_comments = %s
             WHERE letter_number = %s
-        """, (session['user_id'], datetime.now(), comments, letter_number))
+        """, (session['user_id'], verified_date, comments, letter_number))
+        adjust_status_counts(cursor, letter['uploaded_by'], letter['status'], 'Rejected')
+        
+        # Queue rejection notification to uploader; delivered by the outbox worker
+        queue_approval_notification(cursor, letter_number, letter['original_filename'], letter['uploader_email'],
+                                    'Rejected', session.get('full_name'), verified_date, comments)
         
         connection.commit()
         cursor.close()
         connection.close()
         
-        # Send rejection notification to uploader
-        send_approval_notification(letter_number, 'Rejected', comments)
+        verify_cache.invalidate(letter_number)
+        publish_letter_event('letter.status', letter_number, letter['uploaded_by'], letter['status'], 'Rejected')
         
         flash('Letter rejected.')
     
     return redirect(url_for('letter_status'))
 
+# Letters one bulk review may cover; their numbers all go into one IN list
+REVIEW_BATCH_MAX = 500
+REVIEW_ACTIONS = {'approve': 'Verified', 'reject': 'Rejected'}
+
+def review_letters(letter_numbers, new_status, comments):
+    """Approve or reject many pending letters in one transaction.
+
+    Locks the letters with one SELECT ... FOR UPDATE, changes the pending
+    ones with one set-based UPDATE and queues one notification per uploader:
+    the usual one for a single letter, a digest for several. Returns a
+    result per requested letter: reviewed, not_found or not_pending (with
+    the status it already had), or None if the database is unavailable.
+    """
+    letter_numbers = list(dict.fromkeys(letter_numbers))
+    if not letter_numbers:
+        return []
+
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    placeholders = ', '.join(['%s'] * len(letter_numbers))
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT l.letter_number, l.status, l.uploaded_by, l.original_filename, u.email as uploader_email
+            FROM letters l
+            LEFT JOIN users u ON l.uploaded_by = u.id
+            WHERE l.letter_number IN ({placeholders})
+            FOR UPDATE
+        """, tuple(letter_numbers))
+        # Keyed case-insensitively, as the letter_number lookup is
+        letters = {row['letter_number'].lower(): row for row in cursor.fetchall()}
+        pending = [letter for letter in letters.values() if letter['status'] == 'Pending']
+
+        review_date = datetime.now()
+        if pending:
+            cursor.execute(f"""
+                UPDATE letters SET status = %s, verified_by = %s,
+                verified_date = %s, verification_comments = %s
+                WHERE letter_number IN ({', '.join(['%s'] * len(pending))}) AND status = 'Pending'
+            """, (new_status, session['user_id'], review_date, comments,
+                  *(letter['letter_number'] for letter in pending)))
+            adjust_status_counts_many(cursor, [(letter['uploaded_by'], 'Pending', new_status) for letter in pending])
+            queue_review_notifications(cursor, pending, new_status, session.get('full_name'), review_date, comments)
+
+        connection.commit()
+    except Error as e:
+        connection.rollback()
+        print(f"Error reviewing letters: {e}")
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+    for letter in pending:
+        verify_cache.invalidate(letter['letter_number'])
+        publish_letter_event('letter.status', letter['letter_number'], letter['uploaded_by'], 'Pending', new_status)
+
+    results = []
+    for letter_number in letter_numbers:
+        letter = letters.get(letter_number.lower())
+        if letter is None:
+            results.append({'letter_number': letter_number, 'result': 'not_found'})
+        elif letter['status'] == 'Pending':
+            results.append({'letter_number': letter['letter_number'], 'result': 'reviewed', 'status': new_status})
+        else:
+            results.append({'letter_number': letter['letter_number'], 'result': 'not_pending',
+                            'status': letter['status']})
+    return results
+
+def review_request(letter_numbers, action, comments):
+    """Problem with a bulk review request, or None if it can go ahead"""
+    if action not in REVIEW_ACTIONS:
+        return 'Choose approve or reject.'
+    if not letter_numbers:
+        return 'Select at least one letter.'
+    if len(letter_numbers) > REVIEW_BATCH_MAX:
+        return f'At most {REVIEW_BATCH_MAX} letters can be reviewed at once.'
+    if action == 'reject' and not comments.strip():
+        return 'A rejection reason is required.'
+    return None
+
+@app.route('/ceo_review', methods=['GET', 'POST'])
+@ceo_required
+def ceo_review():
+    """Review many pending letters at once"""
+    results = None
+    if request.method == 'POST':
+        letter_numbers = request.form.getlist('letter_numbers')
+        action = request.form.get('action')
+        comments = request.form.get('comments', '')
+        
+        problem = review_request(letter_numbers, action, comments)
+        if problem:
+            flash(problem)
+        else:
+            results = review_letters(letter_numbers, REVIEW_ACTIONS[action], comments)
+            if results is None:
+                flash('Error reviewing letters. Nothing was changed.')
+            else:
+                reviewed = sum(1 for result in results if result['result'] == 'reviewed')
+                verb = 'approved' if action == 'approve' else 'rejected'
+                flash(f'{reviewed} of {len(results)} letter(s) {verb}.')
+    
+    connection = get_db_connection()
+    letters = []
+    
+    if connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT l.letter_number, l.original_filename, l.upload_date, u.full_name as uploaded_by_name
+            FROM letters l
+            LEFT JOIN users u ON l.uploaded_by = u.id
+            WHERE l.status = 'Pending'
+            ORDER BY l.upload_date, l.id
+            LIMIT %s
+        """, (REVIEW_BATCH_MAX,))
+        letters = cursor.fetchall()
+        cursor.close()
+        connection.close()
+    
+    return render_template('ceo_review.html', letters=letters, results=results, batch_max=REVIEW_BATCH_MAX)
+
+@app.route('/api/review-letters', methods=['POST'])
+@ceo_required
+def api_review_letters():
+    """Approve or reject a batch of letters.
+
+    Takes {"letter_numbers": [...], "action": "approve"|"reject", "comments": "..."}
+    and answers with a result per letter; letters that aren't pending are
+    left alone and reported as not_pending.
+    """
+    data = request.get_json(silent=True) or {}
+    letter_numbers = data.get('letter_numbers')
+    comments = data.get('comments') or ''
+
+    if not isinstance(letter_numbers, list) or not all(isinstance(n, str) for n in letter_numbers):
+        return jsonify({'success': False, 'error': 'letter_numbers must be a list of strings'}), 400
+    if not isinstance(comments, str):
+        return jsonify({'success': False, 'error': 'comments must be a string'}), 400
+    problem = review_request(letter_numbers, data.get('action'), comments)
+    if problem:
+        return jsonify({'success': False, 'error': problem}), 400
+
+    results = review_letters(letter_numbers, REVIEW_ACTIONS[data['action']], comments)
+    if results is None:
+        return jsonify({'success': False, 'error': 'Database error; nothing was changed'}), 503
+    return jsonify({'success': True, 'results': results})
+
 @app.route('/user_management')
 @admin_required
 def user_management():
@@ -422,10 +1654,15 @@ def add_user():
     role = request.form['role']
     password = request.form['password']
     
+    try:
+        hashed_password = password_hasher.hash(password)
+    except HasherBusy:
+        flash('The server is busy. Please try again in a moment.')
+        return redirect(url_for('user_management'))
+    
     connection = get_db_connection()
     if connection:
         cursor = connection.cursor()
-        hashed_password = generate_password_hash(password)
         
         try:
             cursor.execute("""
@@ -447,21 +1684,7 @@ def add_user():
 @admin_required
 def settings():
     """Settings page"""
-    connection = get_db_connection()
-    settings_data = {}
-    
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT setting_key, setting_value FROM settings")
-        settings = cursor.fetchall()
-        
-        for setting in settings:
-            settings_data[setting['setting_key']] = setting['setting_value']
-        
-        cursor.close()
-        connection.close()
-    
-    return render_template('settings.html', settings=settings_data)
+    return render_template('settings.html', settings=get_settings())
 
 @app.route('/update_settings', methods=['POST'])
 @admin_required
@@ -534,9 +1757,8 @@ def update_settings():
         cursor.close()
         connection.close()
         
-        # Clear the company info cache so changes take effect immediately
-        get_company_info.cache_clear()
-        get_setting.cache_clear()
+        # Make every worker reload settings so changes take effect immediately
+        settings_cache.invalidate()
 
         flash('Settings updated successfully!')
     
@@ -553,13 +1775,18 @@ def edit_user():
     role = request.form['role']
     password = request.form.get('password', '')
     
+    try:
+        hashed_password = password_hasher.hash(password) if password else None
+    except HasherBusy:
+        flash('The server is busy. Please try again in a moment.')
+        return redirect(url_for('user_management'))
+    
     connection = get_db_connection()
     if connection:
         cursor = connection.cursor()
         
         try:
             if password:
-                hashed_password = generate_password_hash(password)
                 cursor.execute("""
                     UPDATE users SET username = %s, full_name = %s, email = %s, 
                     role = %s, password = %s, updated_date = %s
@@ -606,6 +1833,7 @@ def delete_user():
 
 @app.route('/view_letter/<letter_number>')
 @login_required
+@replica_reads
 def view_letter(letter_number):
     """View letter details and content"""
     connection = get_db_connection()
@@ -614,7 +1842,9 @@ def view_letter(letter_number):
     if connection:
         cursor = connection.cursor(dictionary=True)
         cursor.execute("""
-            SELECT l.*, u1.full_name as uploaded_by_name, u2.full_name as verified_by_name
+            SELECT l.letter_number, l.original_filename, l.uploaded_by, l.upload_date, l.status,
+                   l.require_ceo_verification, l.verified_date, l.verification_comments,
+                   u1.full_name as uploaded_by_name, u2.full_name as verified_by_name
             FROM letters l
             LEFT JOIN users u1 ON l.uploaded_by = u1.id
             LEFT JOIN users u2 ON l.verified_by = u2.id
@@ -639,284 +1869,152 @@ def view_letter(letter_number):
     flash('Letter not found.')
     return redirect(url_for('letter_status'))
 
-@app.route('/download_letter/<letter_number>')
-@login_required
-def download_letter(letter_number):
-    """Download letter file"""
+def serve_letter_file(letter_number, as_attachment):
+    """Send a letter's PDF, or hand it to the front-end server when DOWNLOAD_OFFLOAD is set"""
     connection = get_db_connection()
     letter = None
     
     if connection:
         cursor = connection.cursor(dictionary=True)
         cursor.execute("""
-            SELECT filename, original_filename, uploaded_by
+            SELECT filename, original_filename, uploaded_by, upload_date, file_sha256
             FROM letters WHERE letter_number = %s
         """, (letter_number,))
         
         letter = cursor.fetchone()
         cursor.close()
         connection.close()
-        
-        # Check permissions
-        if letter and (session.get('role') in ['Admin', 'CEO'] or 
-                      letter['uploaded_by'] == session.get('user_id')):
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], letter['filename'])
-            if os.path.exists(file_path):
-                return send_file(file_path, as_attachment=True, 
-                               download_name=letter['original_filename'])
-            else:
-                flash('File not found.')
+    
+    # Check permissions
+    if not letter or not (session.get('role') in ['Admin', 'CEO'] or 
+                          letter['uploaded_by'] == session.get('user_id')):
+        flash('Access denied.')
+        return redirect(url_for('letter_status'))
+    
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], letter['filename'])
+    try:
+        mtime = os.stat(file_path).st_mtime
+    except FileNotFoundError:
+        flash('File not found.')
+        return redirect(url_for('letter_status'))
+    
+    # Stored files never change, so the content hash is a strong validator
+    etag = letter['file_sha256'] or True
+    
+    if DOWNLOAD_OFFLOAD:
+        # The front-end server streams the file and answers Range requests;
+        # only the conditional check is done here, so a 304 costs no file I/O
+        response = Response(mimetype='application/pdf')
+        if DOWNLOAD_OFFLOAD == 'x-accel':
+            response.headers['X-Accel-Redirect'] = DOWNLOAD_ACCEL_PREFIX + letter['filename']
         else:
-            flash('Access denied.')
+            response.headers['X-Sendfile'] = os.path.abspath(file_path)
+        response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                             filename=letter['original_filename'])
+        response.set_etag(letter['file_sha256'] or f"{mtime}-{letter['filename']}")
+        response.last_modified = mtime
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            response.headers.pop('X-Accel-Redirect', None)
+            response.headers.pop('X-Sendfile', None)
+    else:
+        response = send_file(file_path, mimetype='application/pdf', as_attachment=as_attachment,
+                             download_name=letter['original_filename'], conditional=True,
+                             etag=etag, last_modified=mtime)
     
-    return redirect(url_for('letter_status'))
+    # Revalidate every time, so access checks still apply to cached copies
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
-def send_ceo_notification(letter_number, filename):
-    """Send email notification to CEO"""
-    ceo_email = get_setting('ceo_email')
-    company_name = get_setting('company_name', 'GEEC')
+@app.route('/download_letter/<letter_number>')
+@login_required
+@replica_reads
+def download_letter(letter_number):
+    """Download letter file"""
+    return serve_letter_file(letter_number, as_attachment=True)
+
+@app.route('/letter_file/<letter_number>')
+@login_required
+@replica_reads
+def view_letter_file(letter_number):
+    """Open the letter PDF in the browser's viewer"""
+    return serve_letter_file(letter_number, as_attachment=False)
+
+def queue_ceo_notification(cursor, letter_number, filename, uploader_name, upload_date):
+    """Queue the CEO approval request in the caller's transaction"""
+    settings = get_settings()
+    ceo_email = settings.get('ceo_email')
+    company_name = settings.get('company_name', 'GEEC')
     
     if not ceo_email:
         print("CEO email not configured")
         return False
     
-    # Get uploader information
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT l.*, u.full_name, u.email 
-            FROM letters l 
-            JOIN users u ON l.uploaded_by = u.id 
-            WHERE l.letter_number = %s
-        """, (letter_number,))
-        letter_info = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        
-        if letter_info:
-            subject = f"[{company_name}] New Letter Requires CEO Approval - {letter_number}"
-            
-            html_content = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">
-                        Letter Approval Required
-                    </h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
-                        <h3 style="color: #495057; margin-top: 0;">Letter Details:</h3>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Letter Number:</td>
-                                <td style="padding: 8px;">{letter_number}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Document:</td>
-                                <td style="padding: 8px;">{filename}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Uploaded by:</td>
-                                <td style="padding: 8px;">{letter_info['full_name']}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Upload Date:</td>
-                                <td style="padding: 8px;">{letter_info['upload_date'].strftime('%Y-%m-%d %H:%M:%S')}</td>
-                            </tr>
-                        </table>
-                    </div>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <a href="{request.url_root}ceo_verify/{letter_number}" 
-                           style="background-color: #3498db; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                            Review & Approve Letter
-                        </a>
-                    </div>
-                    
-                    <p style="color: #7f8c8d; font-size: 14px; margin-top: 30px;">
-                        This is an automated notification from {company_name} Document Management System.
-                    </p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            plain_content = f"""
-            Letter Approval Required
-            
-            Letter Number: {letter_number}
-            Document: {filename}
-            Uploaded by: {letter_info['full_name']}
-            Upload Date: {letter_info['upload_date'].strftime('%Y-%m-%d %H:%M:%S')}
-            
-            Please visit: {request.url_root}ceo_verify/{letter_number}
-            
-            This is an automated notification from {company_name} Document Management System.
-            """
-            
-            success, message = send_email_notification(ceo_email, subject, html_content, plain_content)
-            if success:
-                print(f"CEO notification sent successfully: {message}")
-            else:
-                print(f"Failed to send CEO notification: {message}")
-            
-            return success
+    subject = f"[{company_name}] New Letter Requires CEO Approval - {letter_number}"
+    html_content, plain_content = email_renderer.render(
+        'ceo_notification', company_name, letter_number=letter_number, filename=filename,
+        uploader_name=uploader_name, upload_date=upload_date, url_root=request.url_root)
     
-    return False
+    enqueue_email(cursor, ceo_email, subject, html_content, plain_content)
+    return True
 
-def send_approval_notification(letter_number, status, comments=None):
-    """Send email notification when letter is approved/rejected"""
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT l.*, u1.full_name as uploader_name, u1.email as uploader_email,
-                   u2.full_name as ceo_name
-            FROM letters l 
-            JOIN users u1 ON l.uploaded_by = u1.id 
-            LEFT JOIN users u2 ON l.verified_by = u2.id
-            WHERE l.letter_number = %s
-        """, (letter_number,))
-        letter_info = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        
-        if letter_info and letter_info['uploader_email']:
-            company_name = get_setting('company_name', 'GEEC')
-            status_color = "#27ae60" if status == "Verified" else "#e74c3c"
-            status_text = "APPROVED" if status == "Verified" else "REJECTED"
-            
-            subject = f"[{company_name}] Letter {status_text} - {letter_number}"
-            
-            html_content = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: {status_color}; border-bottom: 2px solid {status_color}; padding-bottom: 10px;">
-                        Letter {status_text}
-                    </h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
-                        <h3 style="color: #495057; margin-top: 0;">Letter Details:</h3>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Letter Number:</td>
-                                <td style="padding: 8px;">{letter_number}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Document:</td>
-                                <td style="padding: 8px;">{letter_info['original_filename']}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Status:</td>
-                                <td style="padding: 8px; color: {status_color}; font-weight: bold;">{status_text}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Reviewed by:</td>
-                                <td style="padding: 8px;">{letter_info['ceo_name'] or 'CEO'}</td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 8px; font-weight: bold;">Review Date:</td>
-                                <td style="padding: 8px;">{letter_info['verified_date'].strftime('%Y-%m-%d %H:%M:%S')}</td>
-                            </tr>
-                        </table>
-                    </div>
-                    
-                    {f'<div style="background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0;"><h4 style="margin-top: 0; color: #856404;">Comments:</h4><p style="margin-bottom: 0;">{comments}</p></div>' if comments else ''}
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <a href="{request.url_root}view_letter/{letter_number}" 
-                           style="background-color: #3498db; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                            View Letter Details
-                        </a>
-                    </div>
-                    
-                    <p style="color: #7f8c8d; font-size: 14px; margin-top: 30px;">
-                        This is an automated notification from {company_name} Document Management System.
-                    </p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            plain_content = f"""
-            Letter {status_text}
-            
-            Letter Number: {letter_number}
-            Document: {letter_info['original_filename']}
-            Status: {status_text}
-            Reviewed by: {letter_info['ceo_name'] or 'CEO'}
-            Review Date: {letter_info['verified_date'].strftime('%Y-%m-%d %H:%M:%S')}
-            
-            {f'Comments: {comments}' if comments else ''}
-            
-            View details at: {request.url_root}view_letter/{letter_number}
-            
-            This is an automated notification from {company_name} Document Management System.
-            """
-            
-            success, message = send_email_notification(letter_info['uploader_email'], subject, html_content, plain_content)
-            if success:
-                print(f"Approval notification sent successfully: {message}")
-            else:
-                print(f"Failed to send approval notification: {message}")
-            
-            return success
+def queue_approval_notification(cursor, letter_number, original_filename, uploader_email, status,
+                                reviewer_name, review_date, comments=None):
+    """Queue the approved/rejected notification to the uploader in the caller's transaction"""
+    if not uploader_email:
+        return False
+    
+    company_name = get_setting('company_name', 'GEEC')
+    status_text = "APPROVED" if status == "Verified" else "REJECTED"
+    
+    subject = f"[{company_name}] Letter {status_text} - {letter_number}"
+    html_content, plain_content = email_renderer.render(
+        'approval_notification', company_name, letter_number=letter_number,
+        original_filename=original_filename, status=status, status_text=status_text,
+        reviewer_name=reviewer_name, review_date=review_date, comments=comments,
+        url_root=request.url_root)
     
-    return False
+    enqueue_email(cursor, uploader_email, subject, html_content, plain_content)
+    return True
+
+def queue_review_notifications(cursor, letters, status, reviewer_name, review_date, comments=None):
+    """Queue one notification per uploader for a bulk review, in the caller's transaction"""
+    by_uploader = {}
+    for letter in letters:
+        if letter['uploader_email']:
+            by_uploader.setdefault(letter['uploader_email'], []).append(letter)
+
+    company_name = get_setting('company_name', 'GEEC')
+    status_text = "APPROVED" if status == "Verified" else "REJECTED"
+
+    for uploader_email, uploader_letters in by_uploader.items():
+        if len(uploader_letters) == 1:
+            letter = uploader_letters[0]
+            queue_approval_notification(cursor, letter['letter_number'], letter['original_filename'],
+                                        uploader_email, status, reviewer_name, review_date, comments)
+            continue
+
+        subject = f"[{company_name}] {len(uploader_letters)} Letters {status_text}"
+        html_content, plain_content = email_renderer.render(
+            'review_digest', company_name, letters=uploader_letters, status=status, status_text=status_text,
+            reviewer_name=reviewer_name, review_date=review_date, comments=comments,
+            url_root=request.url_root)
+        enqueue_email(cursor, uploader_email, subject, html_content, plain_content)
 
 @app.route('/api/test-email', methods=['POST'])
 @admin_required
 def test_email():
     """Test email configuration"""
     try:
-        admin_email = get_setting('admin_email')
+        settings = get_settings()
+        admin_email = settings.get('admin_email')
         if not admin_email:
             return jsonify({'success': False, 'error': 'Admin email not configured'})
         
-        company_name = get_setting('company_name', 'GEEC')
+        company_name = settings.get('company_name', 'GEEC')
         subject = f"[{company_name}] Email Configuration Test"
-        
-        html_content = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #27ae60; border-bottom: 2px solid #27ae60; padding-bottom: 10px;">
-                    Email Test Successful ✓
-                </h2>
-                
-                <p>This is a test email from your {company_name} Document Management System.</p>
-                
-                <div style="background-color: #d4edda; border-left: 4px solid #27ae60; padding: 15px; margin: 20px 0;">
-                    <h4 style="margin-top: 0; color: #155724;">Email Configuration Status:</h4>
-                    <ul style="margin-bottom: 0;">
-                        <li>Mailtrap integration: <strong>Working</strong></li>
-                        <li>From email: <strong>{MAILTRAP_FROM_EMAIL}</strong></li>
-                        <li>Test timestamp: <strong>{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</strong></li>
-                    </ul>
-                </div>
-                
-                <p style="color: #7f8c8d; font-size: 14px; margin-top: 30px;">
-                    This is an automated test from {company_name} Document Management System.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        plain_content = f"""
-        Email Test Successful ✓
-        
-        This is a test email from your {company_name} Document Management System.
-        
-        Email Configuration Status:
-        - Mailtrap integration: Working
-        - From email: {MAILTRAP_FROM_EMAIL}
-        - Test timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        
-        This is an automated test from {company_name} Document Management System.
-        """
+        html_content, plain_content = email_renderer.render(
+            'test_email', company_name, from_email=MAILTRAP_FROM_EMAIL, sent_at=datetime.now())
         
         success, message = send_email_notification(admin_email, subject, html_content, plain_content)
         
@@ -928,41 +2026,138 @@ def test_email():
     except Exception as e:
         return jsonify({'success': False, 'error': f'Email test failed: {str(e)}'})
 
+@app.route('/email_outbox')
+@admin_required
+def email_outbox():
+    """Email outbox status page"""
+    counts, failures = {}, []
+    connection = get_db_connection()
+    
+    if connection:
+        counts, failures = get_outbox_summary(connection)
+        connection.close()
+    
+    return render_template('email_outbox.html', counts=counts, failures=failures)
+
+@app.route('/email_outbox/<int:message_id>/retry', methods=['POST'])
+@admin_required
+def retry_outbox_email(message_id):
+    """Re-queue a dead-lettered email"""
+    connection = get_db_connection()
+    if connection:
+        if retry_dead_email(connection, message_id):
+            flash('Email queued for another delivery attempt.')
+        else:
+            flash('Email not found or not dead-lettered.')
+        connection.close()
+    
+    return redirect(url_for('email_outbox'))
+
+@app.route('/settings/profiles')
+@admin_required
+def profiles():
+    """Stored request profiles"""
+    return render_template('profiles.html', profiles=profile_store.list(), enabled=PROFILING_ENABLED,
+                           sample_rate=PROFILE_SAMPLE_RATE)
+
+@app.route('/settings/profiles/<name>')
+@admin_required
+def view_profile(name):
+    """Slowest functions and largest allocations of one profiled request"""
+    profile = profile_store.load(name)
+    if not profile:
+        flash('Profile not found.')
+        return redirect(url_for('profiles'))
+    return render_template('profiles.html', profile=profile, enabled=PROFILING_ENABLED,
+                           sample_rate=PROFILE_SAMPLE_RATE)
+
+@app.route('/settings/profiles/<name>/download')
+@admin_required
+def download_profile(name):
+    """Download the pstats file of a profile"""
+    try:
+        path = profile_store.path(name, 'prof')
+    except ValueError:
+        path = None
+    if not path or not os.path.exists(path):
+        flash('Profile not found.')
+        return redirect(url_for('profiles'))
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{name}.prof')
+
+@app.cli.command('outbox-worker')
+@click.option('--concurrency', type=int, default=lambda: int(os.getenv('OUTBOX_CONCURRENCY', 4)), help='Emails sent in parallel.')
+@click.option('--max-attempts', type=int, default=lambda: int(os.getenv('OUTBOX_MAX_ATTEMPTS', 6)), help='Attempts before an email is dead-lettered.')
+@click.option('--once', is_flag=True, help='Exit once the queue is empty.')
+def outbox_worker(concurrency, max_attempts, once):
+    """Deliver queued emails from email_outbox"""
+    worker = OutboxWorker(get_db_connection, send_email_notification, send_many=send_email_batch,
+                          concurrency=concurrency, max_attempts=max_attempts)
+    worker.run(once=once)
+
 @app.route('/api/clear-cache', methods=['POST'])
 @admin_required
 def clear_cache():
     """Clear application cache"""
     try:
-        get_company_info.cache_clear()
-        get_setting.cache_clear()
+        settings_cache.invalidate()
         return jsonify({'success': True, 'message': 'Cache cleared successfully'})
     except Exception as e:
         return jsonify({'success': False, 'error': f'Cache clearing failed: {str(e)}'})
 
-@app.route('/api/get-qr-code/<letter_number>')
-@login_required
-def get_letter_qr_code(letter_number):
-    """Get QR code for a letter (lazy loading)"""
-    connection = get_db_connection()
-    qr_code = None
-
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        # Check permissions similar to view_letter
-        cursor.execute("SELECT qr_code, uploaded_by FROM letters WHERE letter_number = %s", (letter_number,))
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
+def letter_verify_url(letter_number):
+    """Public verification URL encoded in a letter's QR code"""
+    base_url = (QR_BASE_URL or request.url_root).rstrip('/')
+    return f"{base_url}/verify/{letter_number}"
 
-        if result:
-            # Check permissions
-            if (session.get('role') in ['Admin', 'CEO'] or
-                result['uploaded_by'] == session.get('user_id')):
-                return jsonify({'success': True, 'qr_code': result['qr_code']})
-            else:
-                return jsonify({'success': False, 'error': 'Access denied'}), 403
+@app.route('/qr/<letter_number>.<any(png, svg):fmt>')
+@replica_reads
+def letter_qr_code(letter_number, fmt):
+    """QR code image for a letter, generated on first request and cached"""
+    data = letter_verify_url(letter_number)
+    # Without QR_BASE_URL the URL comes from the request's Host header, which the
+    # client controls; such codes are drawn per request and never cached
+    cacheable = bool(QR_BASE_URL)
+    image = qr_cache.lookup(data, fmt) if cacheable else None
+    metrics.inc('geec_qr_codes_total', 'QR code requests by cache result', format=fmt,
+                result=('hit' if image is not None else 'miss') if cacheable else 'uncached')
+    
+    if image is None:
+        # Only draw codes for letters that exist, so the cache can't be filled with junk
+        connection = get_db_connection()
+        exists = False
+        if connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1 FROM letters WHERE letter_number = %s", (letter_number,))
+            exists = cursor.fetchone() is not None
+            cursor.close()
+            connection.close()
+        
+        if not exists:
+            return jsonify({'success': False, 'error': 'Letter not found'}), 404
+        with metrics.timer('geec_qr_render_seconds', 'Time to draw and store a QR code', format=fmt):
+            image = qr_cache.get(data, fmt) if cacheable else render_qr_code(data, fmt)
+    
+    response = Response(image, mimetype=QR_FORMATS[fmt])
+    if not cacheable:
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+    response.set_etag(qr_cache.key(data, fmt))
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response.make_conditional(request)
 
-    return jsonify({'success': False, 'error': 'Letter not found'}), 404
+def remove_unreferenced_blob(cursor, connection, sha256):
+    """Delete a blob's file unless an upload of the same content has claimed it again"""
+    try:
+        # An upload takes the blob row before placing its file, so while this lock
+        # is held the row is either committed (file in use) or gone for good
+        cursor.execute("SELECT sha256 FROM blobs WHERE sha256 = %s FOR UPDATE", (sha256,))
+        if not cursor.fetchone():
+            blob_store.remove(sha256)
+        connection.commit()
+    except (Error, OSError) as e:
+        connection.rollback()
+        print(f"Error deleting blob {sha256}: {e}")
 
 @app.route('/delete_letter/<letter_number>', methods=['POST'])
 @admin_required
@@ -974,28 +2169,45 @@ def delete_letter(letter_number):
         
         try:
             # Get letter information before deletion
-            cursor.execute("SELECT filename, original_filename FROM letters WHERE letter_number = %s", (letter_number,))
+            cursor.execute("""
+                SELECT filename, original_filename, status, uploaded_by, file_sha256
+                FROM letters WHERE letter_number = %s FOR UPDATE
+            """, (letter_number,))
             letter = cursor.fetchone()
             
             if letter:
                 # Delete from database
                 cursor.execute("DELETE FROM letters WHERE letter_number = %s", (letter_number,))
-                connection.commit()
+                adjust_status_counts(cursor, letter['uploaded_by'], old_status=letter['status'])
                 
-                # Delete physical file
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], letter['filename'])
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        print(f"Deleted file: {file_path}")
-                    except OSError as e:
-                        print(f"Error deleting file {file_path}: {e}")
+                # Stored files may be shared with other letters; remove the blob only with
+                # its last reference, and only once the delete is committed
+                if letter['file_sha256'] and letter['filename'] == blob_store.relative_path(letter['file_sha256']):
+                    last_reference = release_blob(cursor, letter['file_sha256'])
+                    connection.commit()
+                    if last_reference:
+                        remove_unreferenced_blob(cursor, connection, letter['file_sha256'])
+                else:
+                    connection.commit()
+                    # Files from before migrate-uploads are not shared
+                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], letter['filename'])
+                    if os.path.exists(file_path):
+                        try:
+                            os.remove(file_path)
+                            print(f"Deleted file: {file_path}")
+                        except OSError as e:
+                            print(f"Error deleting file {file_path}: {e}")
+                
+                verify_cache.invalidate(letter_number)
+                publish_letter_event('letter.deleted', letter_number, letter['uploaded_by'], old_status=letter['status'])
+                index_executor.submit(search_index.remove, letter_number)
                 
                 flash(f'Letter "{letter["original_filename"]}" has been deleted successfully.')
             else:
                 flash('Letter not found.')
                 
         except Error as e:
+            connection.rollback()
             flash(f'Error deleting letter: {e}')
         finally:
             cursor.close()
@@ -1005,49 +2217,67 @@ def delete_letter(letter_number):
     
     return redirect(url_for('letter_status'))
 
+def get_mail_transport():
+    """Return the process-wide mail transport, creating it on first use"""
+    global mail_transport
+    if mail_transport is None:
+        if MAIL_TRANSPORT == 'smtp':
+            mail_transport = SMTPTransport(from_email=MAILTRAP_FROM_EMAIL, timeout=MAIL_TIMEOUT, **SMTP_CONFIG)
+        else:
+            # Get API key from env or database
+            api_key = MAILTRAP_API_KEY or get_setting('mailtrap_api_key')
+            if not api_key:
+                return None
+            mail_transport = MailtrapTransport(api_key, MAILTRAP_FROM_EMAIL, timeout=MAIL_TIMEOUT)
+    return mail_transport
+
+def reset_mail_transport():
+    """Drop the current transport so the next email picks up changed settings"""
+    global mail_transport
+    if mail_transport is not None:
+        mail_transport.close()
+        mail_transport = None
+
 def send_email_notification(to_email, subject, html_content, plain_content=None):
-    """Send email using Mailtrap"""
+    """Send email through the configured mail transport"""
+    transport = get_mail_transport()
+    if transport is None:
+        print("Mailtrap API key not configured")
+        return False, "Mailtrap API key not configured"
+
     try:
-        # Get API key from env or database
-        api_key = MAILTRAP_API_KEY
-        if not api_key:
-            api_key = get_setting('mailtrap_api_key')
+        with metrics.timer('geec_email_send_seconds', 'Time to hand emails to the mail transport',
+                           transport=MAIL_TRANSPORT):
+            result = transport.send(to_email, subject, html_content, plain_content)
+    except Exception as e:
+        result = False, f"Email sending failed: {str(e)}"
+    count_sent_emails([result])
+    return result
 
-        if not api_key:
-            print("Mailtrap API key not configured")
-            return False, "Mailtrap API key not configured"
+def send_email_batch(messages):
+    """Send (to_email, subject, html, text) tuples in as few requests as the transport allows"""
+    transport = get_mail_transport()
+    if transport is None:
+        return [(False, "Mailtrap API key not configured")] * len(messages)
+    with metrics.timer('geec_email_send_seconds', 'Time to hand emails to the mail transport',
+                       transport=MAIL_TRANSPORT):
+        results = transport.send_many(messages)
+    count_sent_emails(results)
+    return results
 
-        if plain_content is None:
-            plain_content = html_content
-        
-        mail = mt.Mail(
-            sender=mt.Address(email=MAILTRAP_FROM_EMAIL, name="GEEC DMS"),
-            to=[mt.Address(email=to_email)],
-            subject=subject,
-            text=plain_content,
-            html=html_content,
-        )
-        
-        client = mt.MailtrapClient(token=api_key)
-        response = client.send(mail)
-        
-        return True, f"Email sent successfully via Mailtrap"
-    
-    except Exception as e:
-        return False, f"Email sending failed: {str(e)}"
+def count_sent_emails(results):
+    for success, _ in results:
+        metrics.inc('geec_emails_total', 'Emails handed to the mail transport',
+                    result='sent' if success else 'unknown' if success is None else 'failed')
 
-@lru_cache(maxsize=32)
 def get_setting(key, default=None):
-    """Get setting value from database"""
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT setting_value FROM settings WHERE setting_key = %s", (key,))
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        return result['setting_value'] if result else default
-    return default
+    """Get setting value from the current settings snapshot"""
+    return get_settings().get(key, default)
+
+# Caches built from settings follow every change, including ones saved by other workers
+settings_cache.on_change(email_renderer.clear)
+settings_cache.on_change(verify_cache.clear)
+settings_cache.on_change(reset_mail_transport)
 
 if __name__ == '__main__':
     # Production settings
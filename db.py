@@ -0,0 +1,361 @@
+"""
+MySQL connection pool.
+
+mysql.connector's built-in pool fails immediately when every connection is
+in use and opens all of its connections at import time. ConnectionPool
+opens connections lazily up to a fixed size, and makes callers wait up to a
+timeout for one to be returned when the pool is busy; only a bounded number
+of callers may wait, so a stall fails fast rather than piling up requests.
+A connection that sat idle for a while is pinged before it is lent out.
+Connections idle or open for too long are closed instead of being reused.
+
+Connections are lent as PooledConnection wrappers whose close() returns
+them to the pool. Uncommitted work is rolled back on return. The optional
+on_wait and on_query hooks receive the time spent waiting for a connection
+and in each query (execute plus fetching its rows), for metrics.
+`with pool.connection() as connection:` always returns the connection,
+even when a query raises.
+
+ReplicaMonitor decides whether a read replica may be used. It samples the
+replica's replication lag every few seconds; when replication is stopped,
+too far behind or unreachable, reads go to the primary instead.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from mysql.connector import Error
+
+
+class PoolTimeout(Error):
+    """No connection became free within the pool timeout"""
+
+
+class TimedCursor:
+    """Cursor wrapper reporting the time spent executing and fetching each query"""
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+        self._elapsed = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _report(self):
+        if self._elapsed is not None:
+            self._on_query(self._elapsed)
+            self._elapsed = None
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._elapsed = (self._elapsed or 0) + time.perf_counter() - started
+
+    def execute(self, *args, **kwargs):
+        self._report()
+        return self._timed(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._report()
+        return self._timed(self._cursor.executemany, *args, **kwargs)
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._report()
+        return self._cursor.close()
+
+
+class PooledConnection:
+    """A borrowed connection; close() gives it back to the pool"""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise Error("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.__getattr__('cursor')(*args, **kwargs)
+        if self._pool.on_query is None:
+            return cursor
+        return TimedCursor(cursor, self._pool.on_query)
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._checkin(raw, self._created_at)
+
+
+class ConnectionPool:
+    """Lazily filled pool of MySQL connections with a bounded wait queue"""
+
+    def __init__(self, connect, size=5, timeout=5, max_waiting=50, ping_after=30,
+                 idle_timeout=300, max_lifetime=3600, on_wait=None, on_query=None):
+        self.connect = connect
+        self.on_wait = on_wait
+        self.on_query = on_query
+        self.size = size
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.ping_after = ping_after
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self._idle = deque()
+        self._condition = threading.Condition()
+        self._pid = os.getpid()
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.discarded = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _after_fork(self):
+        # A forked worker must not reuse (or QUIT) sockets owned by its parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._open = self._in_use = self._waiting = 0
+
+    def _reserve(self):
+        """Take an idle connection or a slot to open one, waiting if the pool is full"""
+        started = time.monotonic()
+        with self._condition:
+            self._after_fork()
+            if not self._idle and self._open >= self.size:
+                if self._waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise PoolTimeout(f"Connection pool exhausted ({self._waiting} requests waiting)")
+                self._waiting += 1
+                try:
+                    deadline = started + self.timeout
+                    while not self._idle and self._open >= self.size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            waited = time.monotonic() - started
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.checkouts += 1
+            self._in_use += 1
+            if self._idle:
+                entry = self._idle.pop()
+            else:
+                self._open += 1
+                entry = None
+
+        if self.on_wait is not None:
+            self.on_wait(waited)
+        return entry
+
+    def _release_slot(self, opened):
+        with self._condition:
+            self._in_use -= 1
+            if opened:
+                self._open -= 1
+            self._condition.notify()
+
+    def _usable(self, raw, created_at, returned_at):
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime or now - returned_at > self.idle_timeout:
+            return False
+        if now - returned_at > self.ping_after:
+            try:
+                raw.ping(reconnect=False)
+            except Error:
+                return False
+        return True
+
+    def get_connection(self):
+        """Borrow a connection, raising PoolTimeout or mysql Error if none can be had"""
+        entry = self._reserve()
+        while entry is not None:
+            raw, created_at, returned_at = entry
+            if self._usable(raw, created_at, returned_at):
+                return PooledConnection(self, raw, created_at)
+            self._close(raw)
+            with self._condition:
+                if self._idle:
+                    self._open -= 1
+                    entry = self._idle.pop()
+                else:
+                    # Reuse the discarded connection's slot for a new one
+                    entry = None
+
+        try:
+            raw = self.connect()
+        except Exception:
+            self._release_slot(opened=True)
+            raise
+        return PooledConnection(self, raw, time.monotonic())
+
+    def _close(self, raw):
+        self.discarded += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _checkin(self, raw, created_at):
+        if self._pid != os.getpid():
+            return
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            keep = time.monotonic() - created_at < self.max_lifetime
+        except Error:
+            # e.g. unread results left behind by a failed request
+            keep = False
+
+        now = time.monotonic()
+        expired = [] if keep else [raw]
+        with self._condition:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((raw, created_at, now))
+            else:
+                self._open -= 1
+            # The least recently used connections sit at the left end
+            while self._idle and now - self._idle[0][2] > self.idle_timeout:
+                expired.append(self._idle.popleft()[0])
+                self._open -= 1
+            self._condition.notify()
+        for connection in expired:
+            self._close(connection)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        connection = self.get_connection()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+                'discarded': self.discarded,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0,
+                'wait_max_ms': round(self.wait_max * 1000, 2),
+            }
+
+
+def replication_lag(connection):
+    """Seconds a replica is behind its source, None if it is not replicating"""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except Error:
+            # MySQL before 8.0.22 and MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    if not row:
+        return None
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return None if lag is None else int(lag)
+
+
+class ReplicaMonitor:
+    """Keeps track of whether a replica is close enough to the primary to read from"""
+
+    def __init__(self, pool, max_lag=5, check_interval=5, measure=replication_lag):
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.measure = measure
+        self._lock = threading.Lock()
+        self._checked = None
+        self._healthy = False
+        self.lag = None
+        self.error = None
+        self.fallbacks = 0
+
+    def healthy(self):
+        """Whether reads may go to the replica, rechecking the lag when the last sample is old"""
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= self.check_interval:
+            # One thread samples; the others keep using the previous answer meanwhile
+            if self._lock.acquire(blocking=self._checked is None):
+                try:
+                    self._sample()
+                    self._checked = time.monotonic()
+                finally:
+                    self._lock.release()
+
+        if not self._healthy:
+            self.fallbacks += 1
+        return self._healthy
+
+    def _sample(self):
+        try:
+            with self.pool.connection() as connection:
+                self.lag = self.measure(connection)
+            self.error = None if self.lag is not None else 'Replica is not replicating'
+        except Error as e:
+            self.lag, self.error = None, str(e)
+
+        was_healthy = self._healthy or self._checked is None
+        self._healthy = self.lag is not None and self.lag <= self.max_lag
+        if was_healthy and not self._healthy:
+            print(f"Reading from the primary database: {self.error or f'replica {self.lag}s behind'}")
+
+    def mark_failed(self, error):
+        """Stop using the replica until the next sample"""
+        self._healthy = False
+        self.error = str(error)
+
+    def stats(self):
+        return {
+            'healthy': self._healthy,
+            'lag': self.lag,
+            'max_lag': self.max_lag,
+            'error': self.error,
+            'fallbacks': self.fallbacks,
+        }
@@ -0,0 +1,52 @@
+"""
+Notification email rendering.
+
+Email bodies live in templates/email/ as <name>.html and <name>.txt pairs.
+EmailRenderer compiles them once per process in its own Jinja environment,
+separate from Flask's, so the outbox worker and other code running outside
+a request can render them too; anything request-specific such as url_root
+is passed in by the caller. The shared header and footer are rendered once
+per company name and kept until clear() is called after a settings change.
+"""
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+
+class EmailRenderer:
+    """Renders (html, text) bodies from the precompiled email templates"""
+
+    def __init__(self, template_folder):
+        self.env = Environment(
+            loader=FileSystemLoader(template_folder),
+            autoescape=select_autoescape(['html']),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+        )
+        self._fragments = {}
+
+    def fragments(self, company_name):
+        """Header and footers for a company name, rendered on first use"""
+        fragments = self._fragments.get(company_name)
+        if fragments is None:
+            fragments = (
+                Markup(self.env.get_template('_header.html').render()),
+                Markup(self.env.get_template('_footer.html').render(company_name=company_name)),
+                self.env.get_template('_footer.txt').render(company_name=company_name),
+            )
+            self._fragments[company_name] = fragments
+        return fragments
+
+    def render(self, name, company_name, **context):
+        """Render the <name>.html and <name>.txt pair, returning (html, text)"""
+        header, footer_html, footer_text = self.fragments(company_name)
+        html_content = self.env.get_template(f'{name}.html').render(
+            context, company_name=company_name, header=header, footer=footer_html)
+        plain_content = self.env.get_template(f'{name}.txt').render(
+            context, company_name=company_name, footer=footer_text)
+        return html_content, plain_content
+
+    def clear(self):
+        """Forget rendered fragments, e.g. after the company name changes"""
+        self._fragments.clear()
@@ -0,0 +1,194 @@
+"""
+Letter change events for the /api/events Server-Sent Events stream.
+
+Routes publish an event after committing a letter change and every open
+stream waits on the broker for new ones. MemoryEventBroker only reaches
+streams served by the same process; FileEventBroker appends events to a
+shared log file so streams held by other gunicorn/Passenger workers see
+them too.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+
+class MemoryEventBroker:
+    """In-process broker keeping the most recent events in a ring buffer"""
+
+    def __init__(self, max_events=1000):
+        self._events = deque(maxlen=max_events)
+        self._last_id = 0
+        self._condition = threading.Condition()
+
+    def publish(self, event_type, data):
+        """Publish an event to every stream in this process"""
+        with self._condition:
+            self._last_id += 1
+            self._events.append(Event(str(self._last_id), event_type, data))
+            self._condition.notify_all()
+            return str(self._last_id)
+
+    def position(self, last_event_id=None):
+        """Where a stream should start reading, as (position, resync).
+
+        resync is True when the client asked to resume from an event that is
+        no longer buffered, so it has to catch up some other way.
+        """
+        with self._condition:
+            if last_event_id and last_event_id.isdigit():
+                last = int(last_event_id)
+                oldest = int(self._events[0].id) - 1 if self._events else self._last_id
+                if oldest <= last <= self._last_id:
+                    return last, False
+                return self._last_id, True
+            return self._last_id, False
+
+    def wait(self, position, timeout):
+        """Block until events newer than position arrive, returning (events, position)"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._last_id <= position:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], position
+                self._condition.wait(remaining)
+
+            events = [event for event in self._events if int(event.id) > position]
+            return events, self._last_id
+
+
+class FileEventBroker:
+    """Cross-worker broker backed by an append-only JSON lines file.
+
+    An event id is "<inode>:<offset>" of the end of its line, so any worker
+    can resume a stream from an id issued by another one. Publishers hold an
+    exclusive lock while appending and rotate the file to <path>.1 once it
+    grows past max_bytes. Readers stat the file every poll_interval seconds,
+    and are woken immediately for events published by their own process.
+    """
+
+    def __init__(self, path, poll_interval=0.5, max_bytes=1024 * 1024):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._condition = threading.Condition()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _open_locked(self):
+        """Open the current log file for appending with the write lock held"""
+        while True:
+            handle = open(self.path, 'ab')
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+
+            # Another worker may have rotated the file while we waited for the lock
+            try:
+                if os.stat(self.path).st_ino == os.fstat(handle.fileno()).st_ino:
+                    return handle
+            except FileNotFoundError:
+                pass
+            handle.close()
+
+    def publish(self, event_type, data):
+        """Append an event to the shared log"""
+        line = (json.dumps({'type': event_type, 'data': data}, default=str) + '\n').encode()
+
+        handle = self._open_locked()
+        try:
+            if os.fstat(handle.fileno()).st_size + len(line) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+                handle.close()
+                handle = self._open_locked()
+
+            handle.write(line)
+            handle.flush()
+            stat = os.fstat(handle.fileno())
+        finally:
+            handle.close()
+
+        with self._condition:
+            self._condition.notify_all()
+        return f"{stat.st_ino}:{stat.st_size}"
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            open(self.path, 'ab').close()
+            return os.stat(self.path)
+
+    def position(self, last_event_id=None):
+        """Where a stream should start reading, as (position, resync)"""
+        stat = self._stat()
+        current = (stat.st_ino, stat.st_size)
+
+        if last_event_id:
+            try:
+                inode, offset = (int(part) for part in last_event_id.split(':', 1))
+            except ValueError:
+                return current, True
+            if inode == stat.st_ino and offset <= stat.st_size:
+                return (inode, offset), False
+            return current, True
+
+        return current, False
+
+    def _read(self, path, inode, offset):
+        """Read complete event lines after offset, if path is still the given inode"""
+        try:
+            with open(path, 'rb') as handle:
+                if os.fstat(handle.fileno()).st_ino != inode:
+                    return [], offset
+                handle.seek(offset)
+                chunk = handle.read()
+        except FileNotFoundError:
+            return [], offset
+
+        events = []
+        # A line without its newline is still being written; leave it for next time
+        for line in chunk.split(b'\n')[:-1]:
+            offset += len(line) + 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            events.append(Event(f"{inode}:{offset}", record.get('type'), record.get('data')))
+        return events, offset
+
+    def wait(self, position, timeout):
+        """Block until events newer than position arrive, returning (events, position)"""
+        deadline = time.monotonic() + timeout
+        inode, offset = position
+
+        while True:
+            stat = self._stat()
+            if stat.st_ino != inode:
+                # Rotated: drain the old file, then continue from the start of the new one
+                events, _ = self._read(self.path + '.1', inode, offset)
+                inode, offset = stat.st_ino, 0
+                newer, offset = self._read(self.path, inode, offset)
+                return events + newer, (inode, offset)
+
+            if stat.st_size > offset:
+                events, offset = self._read(self.path, inode, offset)
+                if events:
+                    return events, (inode, offset)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return [], (inode, offset)
+            with self._condition:
+                self._condition.wait(min(self.poll_interval, remaining))
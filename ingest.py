@@ -0,0 +1,85 @@
+"""
+Single-pass ingest of uploaded PDFs.
+
+Werkzeug normally spools a file upload to a temporary file, after which the
+view copies it to its final place. IngestedUpload is handed to Werkzeug's
+multipart parser instead: every chunk is hashed and written straight into
+the upload folder as it arrives, and the view moves the finished file into
+place with a rename. The first bytes are checked for the PDF signature, so
+anything else stops being written after its first chunk; the last bytes
+are kept to check for the end-of-file marker.
+"""
+
+import hashlib
+import os
+import uuid
+
+PDF_MAGIC = b'%PDF-'
+PDF_EOF = b'%%EOF'
+TAIL_SIZE = 1024
+
+
+class IngestedUpload:
+    """Writable upload stream that hashes, sizes and validates a PDF as it is written"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.part")
+        self.size = 0
+        self.rejected = False
+        self._file = open(self.path, 'w+b')
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self._tail = b''
+        self._kept = False
+
+    def write(self, data):
+        if self.rejected:
+            # Let the parser drain the body, but keep nothing of it
+            return len(data)
+
+        if len(self._head) < len(PDF_MAGIC):
+            self._head += data[:len(PDF_MAGIC) - len(self._head)]
+            if not PDF_MAGIC.startswith(self._head):
+                self.rejected = True
+                self._file.truncate(0)
+                return len(data)
+
+        self._hash.update(data)
+        self.size += len(data)
+        self._tail = (self._tail + data)[-TAIL_SIZE:]
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def problem(self):
+        """Why the upload is not an acceptable PDF, or None if it is"""
+        if self.rejected or self._head != PDF_MAGIC:
+            return 'The uploaded file is not a PDF document.'
+        if PDF_EOF not in self._tail:
+            return 'The uploaded PDF is incomplete or damaged.'
+        return None
+
+    def keep(self, destination):
+        """Move the written file to its final path"""
+        self._file.close()
+        os.replace(self.path, destination)
+        self._kept = True
+
+    def close(self):
+        """Close the stream, deleting the file unless it was kept"""
+        self._file.close()
+        if not self._kept:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def __getattr__(self, name):
+        # read(), readline(), tell()... for anything that still reads the upload
+        return getattr(self._file, name)
@@ -0,0 +1,220 @@
+"""
+Mail transports with long-lived connections.
+
+Every transport exposes send(to_email, subject, html, text) and
+send_many(messages), both returning (success, detail) per message like
+send_email_notification always has. success is None when the message may or
+may not have gone out, so sending it again could deliver it twice. Instances
+are meant to be created once per process and reused:
+
+- MailtrapTransport talks to the Mailtrap Email Sending API through one
+  keep-alive requests.Session, so only the first message pays for the TLS
+  handshake, and send_many uses the batch endpoint.
+- SMTPTransport keeps a small pool of authenticated SMTP sessions and
+  checks idle ones with NOOP before reuse.
+"""
+
+import queue
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class MailtrapTransport:
+    """Mailtrap Email Sending API over a pooled keep-alive HTTPS session"""
+
+    API_URL = 'https://send.api.mailtrap.io'
+    BATCH_LIMIT = 500
+
+    def __init__(self, api_key, from_email, from_name='GEEC DMS', timeout=10, pool_size=10, api_url=None):
+        self.from_address = {'email': from_email, 'name': from_name}
+        self.timeout = timeout
+        self.api_url = (api_url or self.API_URL).rstrip('/')
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @staticmethod
+    def _message(to_email, subject, html_content, plain_content):
+        return {
+            'to': [{'email': to_email}],
+            'subject': subject,
+            'text': plain_content or html_content,
+            'html': html_content,
+        }
+
+    def send(self, to_email, subject, html_content, plain_content=None):
+        """Send one email"""
+        payload = dict(self._message(to_email, subject, html_content, plain_content), **{'from': self.from_address})
+        try:
+            response = self.session.post(f'{self.api_url}/api/send', json=payload, timeout=self.timeout)
+            if response.ok:
+                return True, "Email sent successfully via Mailtrap"
+            return False, f"Email sending failed: HTTP {response.status_code} {response.text[:200]}"
+        except requests.RequestException as e:
+            return False, f"Email sending failed: {str(e)}"
+
+    def send_many(self, messages):
+        """Send (to_email, subject, html, text) tuples through the batch endpoint"""
+        results = []
+        for start in range(0, len(messages), self.BATCH_LIMIT):
+            chunk = messages[start:start + self.BATCH_LIMIT]
+            payload = {
+                'base': {'from': self.from_address},
+                'requests': [self._message(*message) for message in chunk],
+            }
+            try:
+                response = self.session.post(f'{self.api_url}/api/batch', json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                results.extend([(False, f"Email sending failed: {str(e)}")] * len(chunk))
+                continue
+
+            if not response.ok:
+                error = f"Email sending failed: HTTP {response.status_code} {response.text[:200]}"
+                results.extend([(False, error)] * len(chunk))
+                continue
+
+            # The batch endpoint answers 200 and reports each message separately
+            try:
+                responses = response.json()['responses']
+                if not isinstance(responses, list):
+                    raise TypeError
+            except (ValueError, KeyError, TypeError):
+                # Accepted, but no readable report (e.g. a proxy's page): Mailtrap may have sent them
+                error = (f"Delivery unknown: HTTP {response.status_code} without a readable batch report; "
+                         f"check the Mailtrap logs before retrying")
+                results.extend([(None, error)] * len(chunk))
+                continue
+            for index in range(len(chunk)):
+                item = responses[index] if index < len(responses) else {'errors': ['no result returned']}
+                if not isinstance(item, dict):
+                    item = {'errors': [f'unreadable result {item!r}'[:200]]}
+                if item.get('success'):
+                    results.append((True, "Email sent successfully via Mailtrap"))
+                else:
+                    results.append((False, f"Email sending failed: {'; '.join(map(str, item.get('errors') or []))}"))
+        return results
+
+    def close(self):
+        self.session.close()
+
+
+class SMTPTransport:
+    """SMTP with a pool of reusable authenticated sessions"""
+
+    def __init__(self, host, port=587, username=None, password=None, from_email=None, from_name='GEEC DMS',
+                 use_tls=True, use_ssl=False, timeout=10, pool_size=4, idle_check=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.from_email = from_email
+        self.from_name = from_name
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        return connection
+
+    def _checkout(self):
+        """Reuse an idle session, checking it first if it sat unused for a while"""
+        while True:
+            try:
+                connection, returned_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - returned_at < self.idle_check:
+                return connection
+            try:
+                if connection.noop()[0] == 250:
+                    return connection
+            except smtplib.SMTPException:
+                pass
+            self._discard(connection)
+
+    def _checkin(self, connection):
+        try:
+            self._idle.put_nowait((connection, time.monotonic()))
+        except queue.Full:
+            self._discard(connection)
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def _build(self, to_email, subject, html_content, plain_content):
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = formataddr((self.from_name, self.from_email))
+        message['To'] = to_email
+        message.attach(MIMEText(plain_content or html_content, 'plain', 'utf-8'))
+        message.attach(MIMEText(html_content, 'html', 'utf-8'))
+        return message
+
+    def _send_on(self, connection, to_email, subject, html_content, plain_content):
+        connection.sendmail(self.from_email, [to_email],
+                            self._build(to_email, subject, html_content, plain_content).as_string())
+
+    def send(self, to_email, subject, html_content, plain_content=None):
+        """Send one email"""
+        return self.send_many([(to_email, subject, html_content, plain_content)])[0]
+
+    def send_many(self, messages):
+        """Send (to_email, subject, html, text) tuples over a single pooled session"""
+        results = []
+        try:
+            connection = self._checkout()
+        except (smtplib.SMTPException, OSError) as e:
+            return [(False, f"Email sending failed: {str(e)}")] * len(messages)
+
+        for message in messages:
+            try:
+                self._send_on(connection, *message)
+                results.append((True, "Email sent successfully via SMTP"))
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped an idle session; reconnect once and retry
+                try:
+                    connection = self._connect()
+                    self._send_on(connection, *message)
+                    results.append((True, "Email sent successfully via SMTP"))
+                except (smtplib.SMTPException, OSError) as e:
+                    results.append((False, f"Email sending failed: {str(e)}"))
+            except (smtplib.SMTPException, OSError) as e:
+                results.append((False, f"Email sending failed: {str(e)}"))
+
+        self._checkin(connection)
+        return results
+
+    def close(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(connection)
@@ -0,0 +1,213 @@
+"""
+Prometheus-style metrics shared by every worker process.
+
+Each process records counters, gauges and histograms in memory and writes
+them, at most once per flush_interval, to its own JSON file in a shared
+directory (plus once more at exit). /metrics merges the files of all
+workers: counters and histograms are summed, and gauges are summed over the
+processes that are still running. Files left by processes that died more
+than `retention` seconds ago are removed, which Prometheus sees as a
+counter reset.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        # os.kill would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms for one process, merged across workers at scrape time"""
+
+    def __init__(self, directory, flush_interval=1.0, retention=3600):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._reset()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._path = os.path.join(self.directory, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        self._series = {}
+        self._flushed = 0
+        self._dirty = False
+
+    def _series_for(self, kind, name, help_text, labels, buckets=None):
+        if self._pid != os.getpid():
+            # A forked worker starts with its own file and empty values
+            self._reset()
+        if name not in self._meta:
+            self._meta[name] = {'type': kind, 'help': help_text, 'buckets': list(buckets or [])}
+        self._dirty = True
+        key = (name, tuple(sorted(labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            if kind == 'histogram':
+                series = {'buckets': [0] * (len(self._meta[name]['buckets']) + 1), 'sum': 0.0, 'count': 0}
+            else:
+                series = {'value': 0}
+            self._series[key] = series
+        return series
+
+    def inc(self, name, help_text, amount=1, **labels):
+        """Add to a counter"""
+        with self._lock:
+            self._series_for('counter', name, help_text, labels)['value'] += amount
+        self._maybe_flush()
+
+    def set(self, name, help_text, value, **labels):
+        """Set a gauge"""
+        with self._lock:
+            self._series_for('gauge', name, help_text, labels)['value'] = value
+        self._maybe_flush()
+
+    def observe(self, name, help_text, value, buckets=DEFAULT_BUCKETS, **labels):
+        """Record a value in a histogram"""
+        with self._lock:
+            series = self._series_for('histogram', name, help_text, labels, buckets)
+            bounds = self._meta[name]['buckets']
+            index = next((i for i, bound in enumerate(bounds) if value <= bound), len(bounds))
+            series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name, help_text, buckets=DEFAULT_BUCKETS, **labels):
+        """Observe the duration of a with block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, help_text, time.perf_counter() - started, buckets, **labels)
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to its file if they changed"""
+        with self._lock:
+            if self._pid != os.getpid() or not self._dirty:
+                return
+            self._flushed = time.monotonic()
+            self._dirty = False
+            state = {
+                'pid': self._pid,
+                'meta': self._meta,
+                'series': [[name, labels, series] for (name, labels), series in self._series.items()],
+            }
+            data = json.dumps(state)
+
+        temp_path = f"{self._path}.tmp"
+        try:
+            with open(temp_path, 'w') as handle:
+                handle.write(data)
+            os.replace(temp_path, self._path)
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+
+    def _load_all(self):
+        states = []
+        now = time.time()
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path) as handle:
+                    state = json.load(handle)
+                mtime = os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+
+            state['alive'] = _pid_alive(state.get('pid', 0))
+            if not state['alive'] and now - mtime > self.retention:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            states.append(state)
+        return states
+
+    def collect(self):
+        """Merged values of every worker, as {name: (meta, {labels: series})}"""
+        self.flush()
+        merged = {}
+        for state in self._load_all():
+            for name, labels, series in state['series']:
+                meta = state['meta'][name]
+                if meta['type'] == 'gauge' and not state['alive']:
+                    continue
+                values = merged.setdefault(name, (meta, {}))[1]
+                labels = tuple(tuple(pair) for pair in labels)
+                current = values.get(labels)
+                if current is None:
+                    values[labels] = {key: list(value) if isinstance(value, list) else value
+                                      for key, value in series.items()}
+                elif meta['type'] == 'histogram':
+                    current['buckets'] = [a + b for a, b in zip(current['buckets'], series['buckets'])]
+                    current['sum'] += series['sum']
+                    current['count'] += series['count']
+                else:
+                    current['value'] += series['value']
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for name, (meta, values) in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {meta['help']}")
+            lines.append(f"# TYPE {name} {meta['type']}")
+            for labels, series in sorted(values.items()):
+                if meta['type'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(series['value'])}")
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(meta['buckets'] + [float('inf')], series['buckets']):
+                    cumulative += count
+                    bucket_labels = labels + (('le', _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+        return '\n'.join(lines) + '\n'
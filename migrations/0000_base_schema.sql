@@ -0,0 +1,42 @@
+-- Base schema: users, letters and settings as the application expects them
+-- before the incremental migrations. Every statement is idempotent, so
+-- databases created from the old database_schema.sql can run it too;
+-- `flask --app app migrate` records it as version 0. It creates no user
+-- accounts: see `flask --app app seed-default-users` in the README.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    full_name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'User',
+    password VARCHAR(255) NOT NULL,
+    created_date DATETIME NOT NULL,
+    updated_date DATETIME NULL,
+    UNIQUE KEY uq_users_username (username)
+);
+
+CREATE TABLE IF NOT EXISTS letters (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    letter_number VARCHAR(64) NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    original_filename VARCHAR(255) NOT NULL,
+    uploaded_by INT NOT NULL,
+    upload_date DATETIME NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+    require_ceo_verification TINYINT(1) NOT NULL DEFAULT 0,
+    verified_by INT NULL,
+    verified_date DATETIME NULL,
+    verification_comments TEXT,
+    qr_code LONGTEXT,
+    UNIQUE KEY uq_letters_letter_number (letter_number)
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+    setting_key VARCHAR(100) NOT NULL PRIMARY KEY,
+    setting_value TEXT
+);
+
+INSERT IGNORE INTO settings (setting_key, setting_value) VALUES
+    ('company_name', 'GEEC'),
+    ('ceo_email', 'ceo@example.com');
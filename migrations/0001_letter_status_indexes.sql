@@ -0,0 +1,11 @@
+-- Indexes backing the keyset-paginated letter_status page.
+-- Every page is read in (upload_date, id) order, optionally narrowed by
+-- uploader or status, so each filter gets a composite index that ends in
+-- the same sort key and MySQL can stop after LIMIT rows.
+
+CREATE INDEX idx_letters_upload_date ON letters (upload_date, id);
+CREATE INDEX idx_letters_uploader_date ON letters (uploaded_by, upload_date, id);
+CREATE INDEX idx_letters_status_date ON letters (status, upload_date, id);
+
+-- Prefix search on the original filename (letter_number is already unique)
+CREATE INDEX idx_letters_original_filename ON letters (original_filename);
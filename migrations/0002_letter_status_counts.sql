@@ -0,0 +1,18 @@
+-- Materialized letter counts per status, read by the dashboard instead of
+-- a GROUP BY over the whole letters table. uploaded_by = 0 holds the
+-- global totals; every other row belongs to one uploader. The app keeps
+-- the rows current in the same transaction as each letter change, and
+-- `flask --app app reconcile-counts` rebuilds them if they ever drift.
+
+CREATE TABLE letter_status_counts (
+    uploaded_by INT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    letter_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (uploaded_by, status)
+);
+
+INSERT INTO letter_status_counts (uploaded_by, status, letter_count)
+SELECT uploaded_by, status, COUNT(*) FROM letters GROUP BY uploaded_by, status;
+
+INSERT INTO letter_status_counts (uploaded_by, status, letter_count)
+SELECT 0, status, COUNT(*) FROM letters GROUP BY status;
@@ -0,0 +1,19 @@
+-- Durable email outbox. Notifications are inserted in the same transaction
+-- as the letter change and delivered by `flask --app app outbox-worker`,
+-- so a slow mail provider never holds up an upload or an approval.
+
+CREATE TABLE email_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    to_email VARCHAR(255) NOT NULL,
+    subject VARCHAR(500) NOT NULL,
+    html_body MEDIUMTEXT NOT NULL,
+    text_body MEDIUMTEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME NOT NULL,
+    last_error TEXT,
+    created_at DATETIME NOT NULL,
+    sent_at DATETIME NULL,
+    INDEX idx_email_outbox_due (status, next_attempt_at),
+    INDEX idx_email_outbox_created (created_at)
+);
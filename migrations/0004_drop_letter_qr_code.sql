@@ -0,0 +1,5 @@
+-- QR codes are now generated on demand by /qr/<letter_number>.png|.svg and
+-- cached outside the database, so the base64 PNG stored with every letter
+-- is no longer read. Apply after deploying the code that stops writing it.
+
+ALTER TABLE letters DROP COLUMN qr_code;
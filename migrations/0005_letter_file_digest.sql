@@ -0,0 +1,7 @@
+-- SHA-256 and size of each uploaded PDF, computed while the upload is
+-- streamed to disk. Letters uploaded before this migration keep NULLs.
+
+ALTER TABLE letters
+    ADD COLUMN file_sha256 CHAR(64) NULL,
+    ADD COLUMN file_size BIGINT NULL,
+    ADD INDEX idx_letters_file_sha256 (file_sha256);
@@ -0,0 +1,11 @@
+-- Content-addressable letter storage. Each distinct file is stored once as
+-- uploads/ab/cd/<sha256>; this table counts the letters that reference it
+-- so delete_letter only removes the file with its last reference.
+-- Existing flat uploads are moved with `flask --app app migrate-uploads`.
+
+CREATE TABLE blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL
+);
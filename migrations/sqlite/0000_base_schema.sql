@@ -0,0 +1,79 @@
+-- SQLite schema (DB_ENGINE=sqlite): the result of the MySQL migrations up to
+-- 0006 in one file, without user accounts (see `flask --app app
+-- seed-default-users`). A later MySQL migration NNNN needs a SQLite
+-- counterpart with the same number here.
+--
+-- Text columns that MySQL compares case-insensitively are COLLATE NOCASE.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) NOT NULL COLLATE NOCASE UNIQUE,
+    full_name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'User',
+    password VARCHAR(255) NOT NULL,
+    created_date DATETIME NOT NULL,
+    updated_date DATETIME NULL
+);
+
+CREATE TABLE IF NOT EXISTS letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    letter_number VARCHAR(64) NOT NULL COLLATE NOCASE UNIQUE,
+    filename VARCHAR(255) NOT NULL,
+    original_filename VARCHAR(255) NOT NULL COLLATE NOCASE,
+    uploaded_by INT NOT NULL,
+    upload_date DATETIME NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+    require_ceo_verification TINYINT NOT NULL DEFAULT 0,
+    verified_by INT NULL,
+    verified_date DATETIME NULL,
+    verification_comments TEXT,
+    file_sha256 CHAR(64) NULL,
+    file_size BIGINT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_letters_upload_date ON letters (upload_date, id);
+CREATE INDEX IF NOT EXISTS idx_letters_uploader_date ON letters (uploaded_by, upload_date, id);
+CREATE INDEX IF NOT EXISTS idx_letters_status_date ON letters (status, upload_date, id);
+CREATE INDEX IF NOT EXISTS idx_letters_original_filename ON letters (original_filename);
+CREATE INDEX IF NOT EXISTS idx_letters_file_sha256 ON letters (file_sha256);
+
+CREATE TABLE IF NOT EXISTS settings (
+    setting_key VARCHAR(100) NOT NULL PRIMARY KEY,
+    setting_value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS letter_status_counts (
+    uploaded_by INT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    letter_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (uploaded_by, status)
+);
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email VARCHAR(255) NOT NULL,
+    subject VARCHAR(500) NOT NULL,
+    html_body TEXT NOT NULL,
+    text_body TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME NOT NULL,
+    last_error TEXT,
+    created_at DATETIME NOT NULL,
+    sent_at DATETIME NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_created ON email_outbox (created_at);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL
+);
+
+INSERT OR IGNORE INTO settings (setting_key, setting_value) VALUES
+    ('company_name', 'GEEC'),
+    ('ceo_email', 'ceo@example.com');
@@ -0,0 +1,198 @@
+"""
+Durable email outbox.
+
+Routes call enqueue_email() on the cursor of the transaction that changes
+the letter, so a notification is stored if and only if the change commits.
+OutboxWorker runs in a separate process (`flask --app app outbox-worker`),
+claims due messages, delivers them with a bounded number of concurrent
+sends and reschedules failures with exponential backoff until they are
+either sent or dead-lettered.
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+OUTBOX_STATUSES = ('pending', 'sent', 'dead')
+
+
+def enqueue_email(cursor, to_email, subject, html_content, plain_content=None):
+    """Queue an email on the caller's cursor; it is only delivered if the caller commits"""
+    now = datetime.now()
+    cursor.execute("""
+        INSERT INTO email_outbox (to_email, subject, html_body, text_body, status,
+                                  attempts, next_attempt_at, created_at)
+        VALUES (%s, %s, %s, %s, 'pending', 0, %s, %s)
+    """, (to_email, subject, html_content, plain_content, now, now))
+
+
+def get_outbox_summary(connection, recent=25):
+    """Message counts per status plus the most recent failures, for the status page"""
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT status, COUNT(*) as count FROM email_outbox GROUP BY status")
+    counts = {status: 0 for status in OUTBOX_STATUSES}
+    for row in cursor.fetchall():
+        counts[row['status']] = row['count']
+
+    cursor.execute("""
+        SELECT id, to_email, subject, status, attempts, next_attempt_at, last_error, created_at
+        FROM email_outbox
+        WHERE last_error IS NOT NULL AND status <> 'sent'
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, (recent,))
+    failures = cursor.fetchall()
+    cursor.close()
+
+    return counts, failures
+
+
+def retry_dead_email(connection, message_id):
+    """Put a dead-lettered message back in the queue; returns True if one was found"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        UPDATE email_outbox SET status = 'pending', attempts = 0, next_attempt_at = %s
+        WHERE id = %s AND status = 'dead'
+    """, (datetime.now(), message_id))
+    retried = cursor.rowcount > 0
+    connection.commit()
+    cursor.close()
+    return retried
+
+
+class OutboxWorker:
+    """Drains email_outbox.
+
+    get_connection returns a new DB connection and send(to, subject, html,
+    text) returns (success, message) like send_email_notification. When
+    send_many is given, each claimed batch is split into one chunk per
+    concurrent sender and every chunk goes out in a single call. A claim
+    pushes next_attempt_at past the lease, so a message held by a worker
+    that dies is picked up again once the lease runs out. A success of None
+    means the message may already have been delivered; it is dead-lettered
+    at once instead of retried, for an admin to check and retry by hand.
+    """
+
+    def __init__(self, get_connection, send, concurrency=4, batch_size=20, max_attempts=6,
+                 base_delay=30, max_delay=3600, lease=300, send_many=None):
+        self.get_connection = get_connection
+        self.send = send
+        self.send_many = send_many
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+
+    def backoff(self, attempts):
+        """Seconds to wait before the next attempt, doubling each time with some jitter"""
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    def claim(self):
+        """Lease a batch of due messages to this worker"""
+        connection = self.get_connection()
+        if not connection:
+            return []
+
+        cursor = connection.cursor(dictionary=True)
+        try:
+            now = datetime.now()
+            cursor.execute("""
+                SELECT id, to_email, subject, html_body, text_body, attempts
+                FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= %s
+                ORDER BY next_attempt_at
+                LIMIT %s
+                FOR UPDATE
+            """, (now, self.batch_size))
+            messages = cursor.fetchall()
+
+            if messages:
+                ids = [message['id'] for message in messages]
+                cursor.execute(f"""
+                    UPDATE email_outbox SET attempts = attempts + 1, next_attempt_at = %s
+                    WHERE id IN ({', '.join(['%s'] * len(ids))})
+                """, (now + timedelta(seconds=self.lease), *ids))
+            connection.commit()
+        finally:
+            cursor.close()
+            connection.close()
+
+        for message in messages:
+            message['attempts'] += 1
+        return messages
+
+    def deliver(self, message):
+        """Send one message, returning (message, success, detail)"""
+        try:
+            success, detail = self.send(message['to_email'], message['subject'],
+                                        message['html_body'], message['text_body'])
+        except Exception as e:
+            success, detail = False, str(e)
+        return message, success, detail
+
+    def deliver_many(self, messages):
+        """Send a chunk of messages in one call, returning (message, success, detail) for each"""
+        try:
+            outcomes = self.send_many([(message['to_email'], message['subject'],
+                                        message['html_body'], message['text_body']) for message in messages])
+        except Exception as e:
+            outcomes = [(False, str(e))] * len(messages)
+        return [(message, success, detail) for message, (success, detail) in zip(messages, outcomes)]
+
+    def record(self, results):
+        """Store the outcome of a batch of deliveries"""
+        connection = self.get_connection()
+        if not connection:
+            # The lease expires and the batch is retried
+            return
+
+        cursor = connection.cursor()
+        now = datetime.now()
+        try:
+            for message, success, detail in results:
+                if success:
+                    cursor.execute("""
+                        UPDATE email_outbox SET status = 'sent', sent_at = %s, last_error = NULL
+                        WHERE id = %s
+                    """, (now, message['id']))
+                elif success is None or message['attempts'] >= self.max_attempts:
+                    cursor.execute("""
+                        UPDATE email_outbox SET status = 'dead', last_error = %s
+                        WHERE id = %s
+                    """, (detail[:1000], message['id']))
+                else:
+                    retry_at = now + timedelta(seconds=self.backoff(message['attempts']))
+                    cursor.execute("""
+                        UPDATE email_outbox SET next_attempt_at = %s, last_error = %s
+                        WHERE id = %s
+                    """, (retry_at, detail[:1000], message['id']))
+            connection.commit()
+        finally:
+            cursor.close()
+            connection.close()
+
+    def run_once(self, executor):
+        """Claim and deliver one batch; returns the number of messages handled"""
+        messages = self.claim()
+        if messages and self.send_many:
+            chunks = [messages[i::self.concurrency] for i in range(self.concurrency) if messages[i::self.concurrency]]
+            self.record([result for results in executor.map(self.deliver_many, chunks) for result in results])
+        elif messages:
+            self.record(list(executor.map(self.deliver, messages)))
+        return len(messages)
+
+    def run(self, poll_interval=5, once=False):
+        """Deliver messages until interrupted (or until the queue is empty with once=True)"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                handled = self.run_once(executor)
+                if handled:
+                    print(f"Outbox: processed {handled} message(s)")
+                elif once:
+                    return
+                else:
+                    time.sleep(poll_interval)
@@ -0,0 +1,94 @@
+"""
+Password hashing in a bounded process pool.
+
+Hashing or checking a password is deliberately expensive: tens of
+milliseconds of CPU and, for scrypt, tens of megabytes of memory. Done on
+request threads, a burst of logins takes every core the worker has and
+slows down all the other requests it is serving. PasswordHasher runs that
+work in a pool of `workers` processes instead, so at most that many hashes
+run at once. At most `max_pending` may be running or queued; a caller that
+gets no slot within `timeout` seconds gets HasherBusy. With workers=0 the
+hashing runs on the calling thread, for hosts that don't allow extra
+processes.
+
+`method` is the cost policy in Werkzeug's notation, e.g. 'scrypt:32768:8:1'
+or 'pbkdf2:sha256:600000'. needs_rehash() tells whether a stored hash was
+made under another policy, so login can replace it while it has the
+password.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Too many password hashes are already running or queued"""
+
+
+class PasswordHasher:
+    """Hashes and checks passwords in a small pool of processes"""
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=16, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = os.getpid()
+        self._policy = None
+
+    def _after_fork(self):
+        # A forked web worker must not use its parent's pool or count its parent's callers
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+            self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned rather than forked: a web worker has threads and open sockets
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+
+        self._after_fork()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy(f"{self.max_pending} password hashes already pending")
+        try:
+            executor = self._pool()
+            try:
+                return executor.submit(function, *args).result()
+            except BrokenProcessPool:
+                # A pool process died (e.g. killed for memory); the next call starts a new pool
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                return function(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password under the current policy"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Whether a password matches a stored hash"""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether a stored hash was made under a different policy"""
+        if self._policy is None:
+            # Werkzeug fills in defaults, e.g. 'scrypt' is stored as 'scrypt:32768:8:1'
+            self._policy = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._policy
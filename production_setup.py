@@ -77,7 +77,7 @@ def check_required_files():
     
     required_files = [
         'app.py', 'passenger_wsgi.py', '.env', 
-        'database_schema.sql', 'requirements.txt'
+        'migrations/0000_base_schema.sql', 'requirements.txt'
     ]
     
     for file in required_files:
@@ -0,0 +1,129 @@
+"""
+On-demand request profiling.
+
+When profiling is enabled, an admin can add `?profile=1` (or an
+`X-Profile: 1` header) to any request, and a sample of all requests can be
+profiled as well. The request then runs under cProfile and tracemalloc, and
+the result is stored in the profile directory: a .prof file (pstats
+format, for snakeviz or `python -m pstats`) and a .json summary with the
+slowest functions and the lines that allocated the most memory. Only one
+request is profiled at a time; others that ask while one is running are
+served normally.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+PROFILE_NAME = re.compile(r'^[\w-]+$')
+
+
+class ProfileRun:
+    """cProfile and tracemalloc state of one profiled request"""
+
+    def __init__(self):
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        self.memory_before = tracemalloc.take_snapshot()
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.duration = time.perf_counter() - self.started
+        self.memory_after = tracemalloc.take_snapshot()
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self.started_tracing:
+            tracemalloc.stop()
+
+
+class ProfileStore:
+    """Profiles of single requests, kept on local disk"""
+
+    def __init__(self, directory, max_profiles=50, top=40):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.top = top
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start profiling this request, or return None if another one is being profiled"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            return ProfileRun()
+        except Exception:
+            self._lock.release()
+            raise
+
+    def finish(self, run, **details):
+        """Stop a run and save it with details such as the endpoint and status, returning its name"""
+        try:
+            run.stop()
+        finally:
+            self._lock.release()
+
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{details.get('endpoint') or 'request'}-{uuid.uuid4().hex[:6]}"
+        name = re.sub(r'[^\w-]', '_', name)
+        # Created with the first profile, so nothing is written while profiling is unused
+        os.makedirs(self.directory, exist_ok=True)
+        run.profile.dump_stats(self.path(name, 'prof'))
+
+        report = io.StringIO()
+        pstats.Stats(run.profile, stream=report).sort_stats('cumulative').print_stats(self.top)
+        memory = [{'location': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                  for stat in run.memory_after.compare_to(run.memory_before, 'lineno')[:self.top]]
+        summary = dict(details, name=name, created=datetime.now().isoformat(timespec='seconds'),
+                       duration=round(run.duration, 4), peak_memory=run.peak_memory,
+                       functions=report.getvalue(), memory=memory)
+        with open(self.path(name, 'json'), 'w') as handle:
+            json.dump(summary, handle)
+
+        self._prune()
+        return name
+
+    def path(self, name, extension):
+        if not PROFILE_NAME.match(name):
+            raise ValueError(f"Invalid profile name: {name}")
+        return os.path.join(self.directory, f"{name}.{extension}")
+
+    def list(self):
+        """Summaries of the stored profiles, newest first, without the reports"""
+        profiles = []
+        if not os.path.isdir(self.directory):
+            return profiles
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            if filename.endswith('.json'):
+                summary = self.load(filename[:-5])
+                if summary:
+                    summary.pop('functions', None)
+                    summary.pop('memory', None)
+                    profiles.append(summary)
+        return profiles
+
+    def load(self, name):
+        try:
+            with open(self.path(name, 'json')) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def _prune(self):
+        names = sorted(filename[:-5] for filename in os.listdir(self.directory) if filename.endswith('.json'))
+        for name in names[:max(0, len(names) - self.max_profiles)]:
+            for extension in ('json', 'prof'):
+                try:
+                    os.remove(self.path(name, extension))
+                except OSError:
+                    pass
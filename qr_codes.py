@@ -0,0 +1,99 @@
+"""
+QR code images for letters.
+
+A letter's QR code only encodes its public verification URL, so it is
+generated on demand instead of being stored with the letter. QRCodeCache
+keeps recently served images in memory and every generated image on disk,
+so each code is normally drawn once per server. Images never change for a
+given URL, which lets /qr/ responses carry a strong ETag and be cached by
+browsers as immutable.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+
+QR_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def render_qr_code(data, fmt):
+    """Draw a QR code for data as PNG or SVG bytes"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    if fmt == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """Two-level (memory LRU, then disk) cache of rendered QR codes"""
+
+    def __init__(self, cache_dir, max_items=256):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(data, fmt):
+        """Content key of an image, also used as its ETag"""
+        return hashlib.sha256(f"{fmt}:{data}".encode()).hexdigest()
+
+    def _path(self, key, fmt):
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def lookup(self, data, fmt):
+        """Return a cached image or None, without rendering anything"""
+        key = self.key(data, fmt)
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+                return image
+
+        try:
+            with open(self._path(key, fmt), 'rb') as handle:
+                image = handle.read()
+        except FileNotFoundError:
+            return None
+
+        self._remember(key, image)
+        return image
+
+    def get(self, data, fmt):
+        """Return the image for data, rendering and storing it on a miss"""
+        image = self.lookup(data, fmt)
+        if image is not None:
+            return image
+
+        key = self.key(data, fmt)
+        image = render_qr_code(data, fmt)
+
+        # Write to a temporary name first so readers never see a partial file
+        path = self._path(key, fmt)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'wb') as handle:
+            handle.write(image)
+        os.replace(temp_path, path)
+
+        self._remember(key, image)
+        return image
+
+    def _remember(self, key, image):
+        with self._lock:
+            self._items[key] = image
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
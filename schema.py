@@ -0,0 +1,194 @@
+"""
+Versioned schema migrations and index checks.
+
+Migrations are the numbered files in migrations/ (NNNN_description.sql),
+applied in order by `flask --app app migrate` and recorded in the
+schema_migrations table. MySQL commits DDL implicitly, so a migration that
+fails halfway is not rolled back: the runner stops, leaves it unrecorded
+and reports the error.
+
+check_schema() runs when a worker serves its first request. It warns about pending
+migrations, about missing indexes the hot queries rely on, and about any
+hot query that EXPLAIN says would scan a whole table with no usable index.
+
+SQLite databases (DB_ENGINE=sqlite) take their migrations from
+migrations/sqlite/, and are inspected with PRAGMA index_list and
+EXPLAIN QUERY PLAN instead.
+"""
+
+import os
+import re
+from datetime import datetime
+
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+# (table, leading columns) of the indexes the application's lookups need
+REQUIRED_INDEXES = [
+    ('letters', ('letter_number',)),
+    ('letters', ('uploaded_by', 'upload_date')),
+    ('letters', ('status', 'upload_date')),
+    ('letters', ('upload_date',)),
+    ('users', ('username',)),
+    ('settings', ('setting_key',)),
+    ('letter_status_counts', ('uploaded_by',)),
+    ('email_outbox', ('status', 'next_attempt_at')),
+    ('blobs', ('sha256',)),
+]
+
+# Representative hot queries checked with EXPLAIN
+HOT_QUERIES = [
+    ('letter by number', "SELECT id FROM letters WHERE letter_number = 'X'"),
+    ('letters by uploader', "SELECT id FROM letters WHERE uploaded_by = 1 ORDER BY upload_date DESC, id DESC LIMIT 20"),
+    ('letters by status', "SELECT id FROM letters WHERE status = 'Pending' ORDER BY upload_date DESC, id DESC LIMIT 20"),
+    ('user by username', "SELECT id FROM users WHERE username = 'X'"),
+    ('setting by key', "SELECT setting_value FROM settings WHERE setting_key = 'X'"),
+    ('due emails', "SELECT id FROM email_outbox WHERE status = 'pending' AND next_attempt_at <= NOW()"),
+]
+
+
+def discover(directory):
+    """Migration files in version order, as (version, name, path)"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    return sorted(migrations)
+
+
+def split_statements(sql):
+    """Statements of a migration file; each ends with ';' at the end of a line"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in re.split(r';\s*$', '\n'.join(lines), flags=re.M)
+            if statement.strip()]
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+
+
+def applied_versions(cursor):
+    ensure_migrations_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def record_migration(cursor, version, name):
+    cursor.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                   (version, name, datetime.now()))
+
+
+def apply_migration(connection, version, name, path):
+    """Run one migration file and record it"""
+    with open(path, encoding='utf-8') as handle:
+        statements = split_statements(handle.read())
+
+    cursor = connection.cursor()
+    try:
+        for statement in statements:
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+        record_migration(cursor, version, name)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def pending_migrations(connection, directory):
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+    finally:
+        cursor.close()
+    return [migration for migration in discover(directory) if migration[0] not in applied]
+
+
+def is_sqlite(cursor):
+    return getattr(cursor, 'dialect', None) == 'sqlite'
+
+
+def index_columns(cursor):
+    """Columns of every index, as {table: {index: [columns]}}"""
+    indexes = {}
+    if is_sqlite(cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite!_%' ESCAPE '!'")
+        for (table,) in cursor.fetchall():
+            indexes[table] = {}
+            cursor.execute(f"PRAGMA index_list('{table}')")
+            for index in [row[1] for row in cursor.fetchall()]:
+                cursor.execute(f"PRAGMA index_info('{index}')")
+                indexes[table][index] = [row[2] for row in sorted(cursor.fetchall())]
+        return indexes
+
+    cursor.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """)
+    for table, index, column in cursor.fetchall():
+        indexes.setdefault(table, {}).setdefault(index, []).append(column)
+    return indexes
+
+
+def missing_indexes(cursor):
+    """REQUIRED_INDEXES with no index starting with those columns, skipping absent tables"""
+    indexes = index_columns(cursor)
+
+    missing = []
+    for table, columns in REQUIRED_INDEXES:
+        if table not in indexes:
+            continue
+        if not any(tuple(index[:len(columns)]) == columns for index in indexes[table].values()):
+            missing.append((table, columns))
+    return missing
+
+
+def full_scan_queries(cursor):
+    """Names of HOT_QUERIES that EXPLAIN plans as a full scan with no candidate index"""
+    scans = []
+    for name, sql in HOT_QUERIES:
+        try:
+            cursor.execute(("EXPLAIN QUERY PLAN " if is_sqlite(cursor) else "EXPLAIN ") + sql)
+            rows = cursor.fetchall()
+        except Exception:
+            # Table not created yet; pending migrations are reported separately
+            continue
+        if is_sqlite(cursor):
+            # Rows are (id, parent, notused, detail), e.g. "SCAN users" or "SEARCH users USING INDEX ..."
+            if any(row[3].startswith('SCAN ') and 'INDEX' not in row[3] for row in rows):
+                scans.append(name)
+            continue
+        columns = [column[0].lower() for column in cursor.description]
+        for row in rows:
+            plan = dict(zip(columns, row))
+            if plan.get('type') == 'ALL' and not plan.get('possible_keys'):
+                scans.append(name)
+                break
+    return scans
+
+
+def index_warnings(connection):
+    """Missing indexes and full-scan hot queries, as human-readable warnings"""
+    cursor = connection.cursor()
+    try:
+        warnings = [f"Missing index on {table} ({', '.join(columns)})"
+                    for table, columns in missing_indexes(cursor)]
+        warnings += [f"Query '{name}' would scan a whole table" for name in full_scan_queries(cursor)]
+    finally:
+        cursor.close()
+    return warnings
+
+
+def check_schema(connection, directory):
+    """Human-readable warnings about the schema, empty when all is well"""
+    warnings = [f"Migration {version:04d}_{name} has not been applied"
+                for version, name, _ in pending_migrations(connection, directory)]
+    return warnings + index_warnings(connection)
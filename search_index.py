@@ -0,0 +1,134 @@
+"""
+Full-text search over letter contents.
+
+The text of each PDF is extracted by a background thread after the letter
+is committed and stored in an SQLite FTS5 index kept next to the uploads
+(a sidecar file, so it works on shared hosting and in local tests without
+touching the MySQL schema). The index is derived data: it can be deleted
+and rebuilt with `flask --app app search-backfill`.
+"""
+
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+from markupsafe import Markup, escape
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # search still works on filenames without pypdf
+    PdfReader = None
+
+MAX_TEXT_LENGTH = 500000
+
+# Control characters marking matches in snippets, turned into <mark> after escaping
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+
+def extract_pdf_text(path, max_length=MAX_TEXT_LENGTH):
+    """Text of a PDF, or '' if it has none or cannot be read"""
+    if PdfReader is None:
+        return ''
+
+    parts, length = [], 0
+    try:
+        for page in PdfReader(path).pages:
+            text = page.extract_text() or ''
+            parts.append(text)
+            length += len(text)
+            if length >= max_length:
+                break
+    except Exception as e:
+        print(f"Could not extract text from {path}: {e}")
+    return '\n'.join(parts)[:max_length]
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query matching every word, the last one as a prefix"""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Escape a snippet and mark the matched words"""
+    return Markup(str(escape(snippet)).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+class SearchIndex:
+    """SQLite FTS5 index of letter filenames and contents"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS letter_text USING fts5(
+                    letter_number UNINDEXED, uploaded_by UNINDEXED, original_filename, content,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            connection.commit()
+
+    def _connect(self):
+        # One short-lived connection per call, so the index is safe to share
+        # between threads and forked workers
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(self, letter_number, uploaded_by, original_filename, content):
+        """Index a letter, replacing any previous entry"""
+        with closing(self._connect()) as connection:
+            connection.execute("DELETE FROM letter_text WHERE letter_number = ?", (letter_number,))
+            connection.execute("""
+                INSERT INTO letter_text (letter_number, uploaded_by, original_filename, content)
+                VALUES (?, ?, ?, ?)
+            """, (letter_number, uploaded_by, original_filename, content))
+            connection.commit()
+
+    def remove(self, letter_number):
+        with closing(self._connect()) as connection:
+            connection.execute("DELETE FROM letter_text WHERE letter_number = ?", (letter_number,))
+            connection.commit()
+
+    def indexed_letters(self):
+        """Letter numbers already in the index"""
+        with closing(self._connect()) as connection:
+            return {row[0] for row in connection.execute("SELECT letter_number FROM letter_text")}
+
+    def search(self, query, uploaded_by=None, limit=20, offset=0):
+        """Best matches first, as dicts with letter_number, original_filename and snippet.
+
+        uploaded_by limits results to one user's letters.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        sql = f"""
+            SELECT letter_number, original_filename,
+                   snippet(letter_text, -1, '{MATCH_START}', '{MATCH_END}', '...', 16) as snippet
+            FROM letter_text
+            WHERE letter_text MATCH ?
+        """
+        params = [match]
+        if uploaded_by is not None:
+            sql += " AND uploaded_by = ?"
+            params.append(uploaded_by)
+        sql += " ORDER BY bm25(letter_text, 0, 0, 5.0, 1.0) LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        with closing(self._connect()) as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(sql, params).fetchall()
+
+        return [{'letter_number': row['letter_number'],
+                 'original_filename': row['original_filename'],
+                 'snippet': highlight(row['snippet'])} for row in rows]
@@ -0,0 +1,283 @@
+"""
+Cross-worker cache for values read from the settings table.
+
+Every worker keeps the values it has loaded in a small TTL LRU, tagged with
+the settings version they were loaded under. The version is a counter held
+by a pluggable backend and bumped whenever settings change, so a save in
+one gunicorn/Passenger worker makes the copies in all the others stale on
+their next lookup:
+
+- MemoryBackend keeps the counter in the process (single-process servers)
+- SharedMemoryBackend keeps it in a memory-mapped file, read without a
+  system call, for workers on one host
+- RedisBackend keeps it in Redis, checked at most every check_interval
+  seconds, and also shares loaded values between hosts
+
+Concurrent misses for the same key are coalesced, so after a clear only one
+thread per worker goes to the database while the others wait for its result.
+
+The application caches a single entry, a SettingsSnapshot of the whole
+table, so a cold worker runs one settings query rather than one per key.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+MISS = object()
+
+
+class MemoryBackend:
+    """Version counter for a single process"""
+
+    def __init__(self):
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def version(self):
+        return self._version
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def load(self, version, key):
+        """Value stored by another worker, or MISS"""
+        return MISS
+
+    def store(self, version, key, value, ttl):
+        pass
+
+
+class SharedMemoryBackend(MemoryBackend):
+    """Version counter in an 8-byte memory-mapped file shared by the workers on one host"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            self._map = mmap.mmap(fd, 8)
+        finally:
+            os.close(fd)
+
+    def version(self):
+        return struct.unpack_from('<Q', self._map)[0]
+
+    def bump(self):
+        with open(self.path + '.lock', 'ab') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            with self._lock:
+                version = self.version() + 1
+                struct.pack_into('<Q', self._map, 0, version)
+                return version
+
+
+class RedisBackend(MemoryBackend):
+    """Version counter and shared values in Redis (or anything speaking its GET/SET/INCR)"""
+
+    def __init__(self, client, prefix='geec:settings', check_interval=1.0):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.check_interval = check_interval
+        self._checked = 0
+
+    def version(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            try:
+                self._version = int(self.client.get(f'{self.prefix}:version') or 0)
+                self._checked = now
+            except Exception as e:
+                print(f"Settings cache version check failed: {e}")
+        return self._version
+
+    def bump(self):
+        self._version = int(self.client.incr(f'{self.prefix}:version'))
+        self._checked = time.monotonic()
+        return self._version
+
+    def load(self, version, key):
+        try:
+            value = self.client.get(f'{self.prefix}:{version}:{key}')
+        except Exception as e:
+            print(f"Settings cache read failed: {e}")
+            return MISS
+        return MISS if value is None else json.loads(value)
+
+    def store(self, version, key, value, ttl):
+        try:
+            self.client.set(f'{self.prefix}:{version}:{key}', json.dumps(value, default=dict), ex=ttl)
+        except Exception as e:
+            print(f"Settings cache write failed: {e}")
+
+
+class _Flight:
+    """A load in progress that other threads missing the same key wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISS
+        self.error = None
+
+
+class SettingsCache:
+    """Per-process TTL LRU of settings values, invalidated through a shared version counter"""
+
+    def __init__(self, backend, ttl=300, max_items=256):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._listeners = []
+        self._seen_version = backend.version()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def on_change(self, callback):
+        """Call callback in this process whenever the settings version moves"""
+        self._listeners.append(callback)
+
+    def check(self):
+        """Drop local values if settings changed anywhere, returning the current version"""
+        version = self.backend.version()
+        if version != self._seen_version:
+            with self._lock:
+                changed = version != self._seen_version
+                self._seen_version = version
+                self._entries.clear()
+            if changed:
+                for callback in self._listeners:
+                    callback()
+        return version
+
+    def get(self, key, loader, decode=None):
+        """Cached value for key, calling loader() once across concurrent misses.
+
+        decode rebuilds a value that the backend shared as plain JSON.
+        """
+        version = self.check()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[2]
+
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self.backend.load(version, key)
+            if value is not MISS and decode is not None:
+                value = decode(value)
+            elif value is MISS:
+                self.loads += 1
+                value = loader()
+                self.backend.store(version, key, value, self.ttl)
+            flight.value = value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._entries[key] = (version, time.monotonic() + self.ttl, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_items:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return value
+
+    def invalidate(self):
+        """Make every worker reload settings on its next lookup"""
+        self.backend.bump()
+        self.check()
+
+    def clear(self):
+        """Drop this process's values only"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'version': self._seen_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class SettingsSnapshot(Mapping):
+    """Read-only view of every row in the settings table with typed accessors.
+
+    A snapshot is never modified; a refresh builds a new one and the cache
+    swaps the reference, so readers always see one consistent set of values.
+    """
+
+    __slots__ = ('_values', 'company_info')
+
+    def __init__(self, values):
+        self._values = MappingProxyType(dict(values))
+        self.company_info = MappingProxyType({
+            'name': self._values.get('company_name', 'GEEC'),
+            'logo': self._values.get('company_logo'),
+        })
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def get_int(self, key, default=0):
+        try:
+            return int(self._values[key])
+        except (KeyError, TypeError, ValueError):
+            return default
+
+    def get_bool(self, key, default=False):
+        value = self._values.get(key)
+        if value is None:
+            return default
+        return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
@@ -49,7 +49,7 @@ FLASK_ENV=development
     
     print("\nSetup complete!")
     print("Next steps:")
-    print("1. Set up MySQL database using database_schema.sql")
+    print("1. Create the MySQL database and run: flask --app app migrate")
     print("2. Update .env with your database credentials")
     print("3. Run: python app.py")
 
@@ -0,0 +1,173 @@
+"""
+SQLite database engine.
+
+With DB_ENGINE=sqlite the application keeps its data in a single SQLite
+file instead of a MySQL server: for development, for running the tests and
+benchmarks without a server, and for small single-server sites.
+SQLiteConnection gives a sqlite3 connection the part of the mysql.connector
+interface the application uses (dictionary cursors, in_transaction, ping,
+mysql.connector exceptions), so the same ConnectionPool, queries and error
+handling work with either engine. The database runs in WAL mode, so
+readers never wait for the writer, and a writer waits up to `timeout`
+seconds for another one to commit.
+
+Queries stay written for MySQL. translate() rewrites the few MySQL-only
+constructs the application uses:
+- %s placeholders become ?
+- INSERT IGNORE becomes INSERT OR IGNORE
+- ON DUPLICATE KEY UPDATE ... VALUES(column) becomes
+  ON CONFLICT DO UPDATE SET ... excluded.column (SQLite 3.35 or newer)
+- NOW() becomes the local time
+- SELECT ... FOR UPDATE loses the clause and starts its transaction with
+  BEGIN IMMEDIATE, so nothing else can write until it commits (SQLite locks
+  the database where InnoDB locks the rows)
+Anything else has to be SQL that both engines accept.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+
+from mysql.connector import errors
+
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Stored as ISO text, which sorts and compares like the datetimes themselves
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+
+FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.I)
+INSERT_IGNORE = re.compile(r'\bINSERT\s+IGNORE\b', re.I)
+ON_DUPLICATE_KEY = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b(.*)$', re.I | re.S)
+VALUES_FUNCTION = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.I)
+NOW_FUNCTION = re.compile(r'\bNOW\(\)', re.I)
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """SQLite version of a MySQL query, and whether it locks what it reads"""
+    locking = bool(FOR_UPDATE.search(sql))
+    sql = FOR_UPDATE.sub('', sql)
+    sql = INSERT_IGNORE.sub('INSERT OR IGNORE', sql)
+    sql = ON_DUPLICATE_KEY.sub(
+        lambda match: 'ON CONFLICT DO UPDATE SET' + VALUES_FUNCTION.sub(r'excluded.\1', match.group(1)), sql)
+    sql = NOW_FUNCTION.sub("datetime('now', 'localtime')", sql)
+    return sql.replace('%s', '?'), locking
+
+
+def _call(method, *args):
+    """Run a sqlite3 call, raising the mysql.connector error the application expects"""
+    try:
+        return method(*args)
+    except sqlite3.IntegrityError as e:
+        raise errors.IntegrityError(msg=str(e)) from e
+    except sqlite3.OperationalError as e:
+        raise errors.OperationalError(msg=str(e)) from e
+    except sqlite3.Error as e:
+        raise errors.DatabaseError(msg=str(e)) from e
+
+
+class SQLiteCursor:
+    """sqlite3 cursor with the mysql.connector cursor interface"""
+
+    dialect = 'sqlite'
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection._db.cursor()
+        self._dictionary = dictionary
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def with_rows(self):
+        return self._cursor.description is not None
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def _begin(self, locking):
+        if locking and not self._connection.in_transaction:
+            _call(self._cursor.execute, 'BEGIN IMMEDIATE')
+
+    def execute(self, operation, params=()):
+        sql, locking = translate(operation)
+        self._begin(locking)
+        _call(self._cursor.execute, sql, tuple(params or ()))
+
+    def executemany(self, operation, seq_params):
+        sql, locking = translate(operation)
+        self._begin(locking)
+        _call(self._cursor.executemany, sql, [tuple(params) for params in seq_params])
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(_call(self._cursor.fetchone))
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in _call(self._cursor.fetchmany, size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in _call(self._cursor.fetchall)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the mysql.connector connection interface"""
+
+    dialect = 'sqlite'
+
+    def __init__(self, path, timeout=5):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise errors.NotSupportedError(msg=f"SQLite {sqlite3.sqlite_version} is too old; 3.35 or newer is needed")
+        # Pooled connections move between threads, though only one uses a connection at a time
+        self._db = _call(lambda: sqlite3.connect(path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES,
+                                                 check_same_thread=False))
+        _call(self._db.execute, 'PRAGMA journal_mode=WAL')
+        _call(self._db.execute, 'PRAGMA synchronous=NORMAL')
+
+    @property
+    def in_transaction(self):
+        return self._db.in_transaction
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self, dictionary)
+
+    def commit(self):
+        _call(self._db.commit)
+
+    def rollback(self):
+        _call(self._db.rollback)
+
+    def ping(self, reconnect=False):
+        _call(self._db.execute, 'SELECT 1')
+
+    def close(self):
+        self._db.close()
+
+
+def connect_sqlite(path, timeout=5):
+    """Open the database file, creating its directory on first use"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SQLiteConnection(path, timeout)
@@ -278,8 +278,15 @@ function showToast(message, type = 'info') {
 
 // Dashboard specific functions
 function initializeDashboard() {
-    // Refresh dashboard data periodically
-    setInterval(refreshDashboardStats, 300000); // Every 5 minutes
+    // Refresh the stats cards whenever a letter changes; poll only without SSE support
+    subscribeToLetterEvents({
+        'letter.created': scheduleDashboardRefresh,
+        'letter.status': scheduleDashboardRefresh,
+        'letter.deleted': scheduleDashboardRefresh,
+        'resync': scheduleDashboardRefresh
+    }, function() {
+        setInterval(refreshDashboardStats, 300000); // Every 5 minutes
+    });
     
     // Initialize charts if Chart.js is available
     if (typeof Chart !== 'undefined') {
@@ -290,6 +297,14 @@ function initializeDashboard() {
     }
 }
 
+// Several letters often change together (e.g. a CEO clearing a queue); refresh once
+let dashboardRefreshTimer = null;
+
+function scheduleDashboardRefresh() {
+    clearTimeout(dashboardRefreshTimer);
+    dashboardRefreshTimer = setTimeout(refreshDashboardStats, 1000);
+}
+
 function refreshDashboardStats() {
     fetch('/api/dashboard-stats', {
         headers: {
@@ -309,7 +324,8 @@ function updateStatsCards(stats) {
     const statsElements = {
         verified: document.querySelector('[data-stat="verified"]'),
         pending: document.querySelector('[data-stat="pending"]'),
-        rejected: document.querySelector('[data-stat="rejected"]')
+        rejected: document.querySelector('[data-stat="rejected"]'),
+        total: document.querySelector('[data-stat="total"]')
     };
     
     Object.keys(statsElements).forEach(key => {
@@ -401,27 +417,88 @@ function initializeLetterStatus() {
         });
     }
     
-    // Auto-refresh letter status
-    setInterval(refreshLetterStatus, 30000); // Every 30 seconds
+    // Live status updates; poll only without SSE support
+    subscribeToLetterEvents({
+        'letter.status': data => updateLetterStatuses([data]),
+        'letter.created': data => showToast(`New letter ${data.letter_number} uploaded. Refresh to see it.`, 'info'),
+        'letter.deleted': data => removeLetterElements(data.letter_number),
+        'resync': () => refreshLetterStatus()
+    }, function() {
+        setInterval(refreshLetterStatus, 30000); // Every 30 seconds
+    });
 }
 
+// Letter change events pushed by the server over /api/events
+function subscribeToLetterEvents(handlers, fallback) {
+    // The server turns streaming off (EVENTS_ENABLED) where it would tie up its workers
+    const liveEvents = document.querySelector('meta[name="live-events"]');
+    if (!('EventSource' in window) || !liveEvents || liveEvents.content !== 'on') {
+        fallback();
+        return null;
+    }
+    
+    // EventSource reconnects by itself and resumes from the last event id
+    const source = new EventSource('/api/events');
+    Object.keys(handlers).forEach(type => {
+        source.addEventListener(type, event => handlers[type](JSON.parse(event.data)));
+    });
+    return source;
+}
+
+function removeLetterElements(letterNumber) {
+    document.querySelectorAll(`[data-letter-number="${letterNumber}"]`).forEach(element => {
+        // Cards are wrapped in a grid column; remove the whole column
+        const column = element.closest('#lettersCards > div');
+        (column || element).remove();
+    });
+}
+
+// Delta cursor and ETag of the last status poll
+let letterStatusCursor = null;
+let letterStatusETag = null;
+
 function refreshLetterStatus() {
     const statusElements = document.querySelectorAll('[data-letter-status]');
     if (statusElements.length === 0) return;
     
-    const letterNumbers = Array.from(statusElements).map(el => el.dataset.letterNumber);
+    // Rows and cards share letter numbers; ask about each one once
+    const letterNumbers = [...new Set(Array.from(statusElements).map(el => el.dataset.letterNumber))].slice(0, 500);
+    
+    if (letterStatusCursor === null) {
+        const container = document.querySelector('[data-status-cursor]');
+        letterStatusCursor = container ? container.dataset.statusCursor : null;
+    }
+    
+    const headers = {
+        'Content-Type': 'application/json',
+        'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').getAttribute('content')
+    };
+    if (letterStatusETag) {
+        headers['If-None-Match'] = letterStatusETag;
+    }
     
     fetch('/api/letter-status', {
         method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-            'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').getAttribute('content')
-        },
-        body: JSON.stringify({ letter_numbers: letterNumbers })
+        headers: headers,
+        body: JSON.stringify({ letter_numbers: letterNumbers, since: letterStatusCursor })
+    })
+    .then(response => {
+        if (!response.ok && response.status !== 304) {
+            return null;
+        }
+        // Every answer moves the cursor on, so the next poll only scans newer changes
+        letterStatusCursor = response.headers.get('X-Status-Cursor') || letterStatusCursor;
+        // 204: nothing changed since the cursor, 304: same changes as last poll
+        if (response.status === 204 || response.status === 304) {
+            return null;
+        }
+        letterStatusETag = response.headers.get('ETag');
+        return response.json();
     })
-    .then(response => response.json())
     .then(data => {
-        updateLetterStatuses(data);
+        if (data) {
+            updateLetterStatuses(data.changes);
+        }
     })
     .catch(error => {
         console.error('Error refreshing letter status:', error);
@@ -430,11 +507,18 @@ function refreshLetterStatus() {
 
 function updateLetterStatuses(updates) {
     updates.forEach(update => {
-        const statusElement = document.querySelector(`[data-letter-number="${update.letter_number}"]`);
-        if (statusElement && statusElement.dataset.letterStatus !== update.status) {
-            // Status has changed, update the UI
-            updateLetterStatusElement(statusElement, update);
-            
+        const statusElements = document.querySelectorAll(`[data-letter-number="${update.letter_number}"]`);
+        let changed = false;
+        
+        statusElements.forEach(statusElement => {
+            if (statusElement.dataset.letterStatus !== update.status) {
+                // Status has changed, update the UI
+                updateLetterStatusElement(statusElement, update);
+                changed = true;
+            }
+        });
+        
+        if (changed) {
             // Show notification for status change
             showToast(`Letter ${update.letter_number} status updated: ${update.status}`, 'info');
         }
@@ -443,6 +527,7 @@ function updateLetterStatuses(updates) {
 
 function updateLetterStatusElement(element, update) {
     element.dataset.letterStatus = update.status;
+    element.dataset.status = update.status;
     
     const badge = element.querySelector('.badge');
     if (badge) {
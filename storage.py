@@ -0,0 +1,108 @@
+"""
+Content-addressable storage for letter files.
+
+A file is stored once under the SHA-256 of its content, sharded by the
+first two byte pairs of the digest (uploads/ab/cd/abcd...), so no directory
+grows past a few hundred entries and re-uploading an identical letter
+costs no extra space. letters.filename holds that relative path, which
+keeps every existing os.path.join(UPLOAD_FOLDER, filename) working.
+
+The blobs table counts the letters referencing each file. acquire_blob()
+and release_blob() run on the caller's cursor, inside the transaction that
+inserts or deletes the letter. A file is removed only after the delete
+that released its last reference has committed, and only if, with the
+blob row locked again, no upload of the same content has recreated it.
+"""
+
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 and size of a file on disk"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def acquire_blob(cursor, sha256, size):
+    """Count one more reference to a blob, creating its row on first use"""
+    cursor.execute("""
+        INSERT INTO blobs (sha256, size, ref_count, created_at) VALUES (%s, %s, 1, %s)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+    """, (sha256, size, datetime.now()))
+
+
+def release_blob(cursor, sha256):
+    """Drop one reference to a blob; returns True if it was the last one"""
+    cursor.execute("SELECT ref_count FROM blobs WHERE sha256 = %s FOR UPDATE", (sha256,))
+    row = cursor.fetchone()
+    if not row:
+        return False
+
+    ref_count = row['ref_count'] if isinstance(row, dict) else row[0]
+    if ref_count <= 1:
+        cursor.execute("DELETE FROM blobs WHERE sha256 = %s", (sha256,))
+        return True
+
+    cursor.execute("UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = %s", (sha256,))
+    return False
+
+
+class BlobStore:
+    """Sharded directory of files named by their SHA-256"""
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def relative_path(sha256):
+        """Path stored in letters.filename; always '/'-separated"""
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def add(self, upload):
+        """Store an IngestedUpload under its digest, returning the relative path.
+
+        If the content is already stored the upload is simply not kept and is
+        deleted when it is closed.
+        """
+        path = self.path(upload.sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            upload.keep(path)
+        return self.relative_path(upload.sha256)
+
+    def add_file(self, source_path, sha256):
+        """Store an existing file without touching it, returning the relative path.
+
+        The blob is a hard link to the source where the filesystem allows, so
+        the caller can delete the source once the new path is committed.
+        """
+        path = self.path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(source_path, temp_path)
+            except OSError:
+                shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+        return self.relative_path(sha256)
+
+    def remove(self, sha256):
+        """Delete a blob's file; returns False if it was already gone"""
+        try:
+            os.remove(self.path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,103 @@
+import unittest
+import time
+import tracemalloc
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to import email_templates
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_templates import EmailRenderer
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'email')
+ITERATIONS = 2000
+
+CONTEXT = {
+    'letter_number': 'GEEC-2024-0042',
+    'original_filename': 'contract.pdf',
+    'status': 'Verified',
+    'status_text': 'APPROVED',
+    'reviewer_name': 'Jane CEO',
+    'review_date': datetime(2024, 5, 1, 10, 30),
+    'comments': 'Looks good',
+    'url_root': 'https://dms.example.com/',
+}
+
+def fstring_approval(company_name, letter_number, original_filename, status, status_text,
+                     reviewer_name, review_date, comments, url_root):
+    """The approval body as it used to be built, trimmed to its dynamic parts"""
+    status_color = "#27ae60" if status == "Verified" else "#e74c3c"
+    html_content = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <h2 style="color: {status_color}; border-bottom: 2px solid {status_color}; padding-bottom: 10px;">
+                Letter {status_text}
+            </h2>
+            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin: 20px 0;">
+                <h3 style="color: #495057; margin-top: 0;">Letter Details:</h3>
+                <table style="width: 100%; border-collapse: collapse;">
+                    <tr><td style="padding: 8px; font-weight: bold;">Letter Number:</td><td style="padding: 8px;">{letter_number}</td></tr>
+                    <tr><td style="padding: 8px; font-weight: bold;">Document:</td><td style="padding: 8px;">{original_filename}</td></tr>
+                    <tr><td style="padding: 8px; font-weight: bold;">Status:</td><td style="padding: 8px; color: {status_color}; font-weight: bold;">{status_text}</td></tr>
+                    <tr><td style="padding: 8px; font-weight: bold;">Reviewed by:</td><td style="padding: 8px;">{reviewer_name or 'CEO'}</td></tr>
+                    <tr><td style="padding: 8px; font-weight: bold;">Review Date:</td><td style="padding: 8px;">{review_date.strftime('%Y-%m-%d %H:%M:%S')}</td></tr>
+                </table>
+            </div>
+            {f'<div style="background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0;"><h4 style="margin-top: 0; color: #856404;">Comments:</h4><p style="margin-bottom: 0;">{comments}</p></div>' if comments else ''}
+            <div style="text-align: center; margin: 30px 0;">
+                <a href="{url_root}view_letter/{letter_number}" style="background-color: #3498db; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">View Letter Details</a>
+            </div>
+            <p style="color: #7f8c8d; font-size: 14px; margin-top: 30px;">
+                This is an automated notification from {company_name} Document Management System.
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+    plain_content = f"""
+    Letter {status_text}
+    Letter Number: {letter_number}
+    Document: {original_filename}
+    Status: {status_text}
+    Reviewed by: {reviewer_name or 'CEO'}
+    Review Date: {review_date.strftime('%Y-%m-%d %H:%M:%S')}
+    {f'Comments: {comments}' if comments else ''}
+    View details at: {url_root}view_letter/{letter_number}
+    This is an automated notification from {company_name} Document Management System.
+    """
+    return html_content, plain_content
+
+class TestEmailTemplatePerformance(unittest.TestCase):
+    def measure(self, render):
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            render()
+        elapsed = (time.perf_counter() - start) / ITERATIONS
+
+        tracemalloc.start()
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak
+
+    def test_template_render_vs_fstring(self):
+        renderer = EmailRenderer(TEMPLATE_FOLDER)
+
+        def render_template():
+            return renderer.render('approval_notification', 'GEEC', **CONTEXT)
+
+        # Warm up: compile the templates and render the cached fragments once
+        html_content, plain_content = render_template()
+        self.assertIn('GEEC-2024-0042', html_content)
+        self.assertIn('View details at: https://dms.example.com/view_letter/GEEC-2024-0042', plain_content)
+
+        fstring_time, fstring_peak = self.measure(lambda: fstring_approval('GEEC', **CONTEXT))
+        template_time, template_peak = self.measure(render_template)
+
+        print(f"\nf-string:        {fstring_time * 1e6:.1f} us/email, peak {fstring_peak} bytes")
+        print(f"Jinja templates: {template_time * 1e6:.1f} us/email, peak {template_peak} bytes")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,13 +6,12 @@ import os
 # Add parent directory to path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import get_setting, update_settings, app
+from app import get_setting, update_settings, app, settings_cache
 
 class TestGetSettingPerformance(unittest.TestCase):
     def setUp(self):
-        # Clear lru_cache if it exists
-        if hasattr(get_setting, 'cache_clear'):
-            get_setting.cache_clear()
+        # Start from an empty settings cache in this process
+        settings_cache.clear()
 
     @patch('app.get_db_connection')
     def test_get_setting_db_calls(self, mock_get_db):
@@ -20,7 +19,7 @@ class TestGetSettingPerformance(unittest.TestCase):
         mock_cursor = MagicMock()
         mock_get_db.return_value = mock_conn
         mock_conn.cursor.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = {'setting_value': 'test_value'}
+        mock_cursor.fetchall.return_value = [('test_key', 'test_value'), ('company_name', 'ACME')]
 
         # First call
         val1 = get_setting('test_key')
@@ -34,6 +33,10 @@ class TestGetSettingPerformance(unittest.TestCase):
         val3 = get_setting('test_key')
         self.assertEqual(val3, 'test_value')
 
+        # Other settings come from the same snapshot
+        self.assertEqual(get_setting('company_name', 'GEEC'), 'ACME')
+        self.assertEqual(get_setting('missing_key', 'fallback'), 'fallback')
+
         # With caching, DB connection should be created only ONCE
         self.assertEqual(mock_get_db.call_count, 1, f"Expected 1 DB connection, but got {mock_get_db.call_count}")
 
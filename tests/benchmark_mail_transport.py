@@ -0,0 +1,143 @@
+import unittest
+import threading
+import json
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path to import mail_transport
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mail_transport import MailtrapTransport, SMTPTransport
+from test_mail_transport import LocalSMTPServer
+
+MESSAGES = 200
+
+class LocalMailtrapServer(ThreadingHTTPServer):
+    """Stand-in for the Mailtrap sending API that accepts every message and counts connections"""
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        super().__init__(('127.0.0.1', 0), MailtrapHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class MailtrapHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, as the real API allows
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.server.requests += 1
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path == '/api/batch':
+            body = {'success': True, 'responses': [{'success': True, 'message_ids': ['x']}
+                                                   for _ in payload['requests']]}
+        else:
+            body = {'success': True, 'message_ids': ['x']}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestMailTransportThroughput(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalSMTPServer()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def rate(self, send):
+        start = time.perf_counter()
+        for i in range(MESSAGES):
+            success, _ = send(f'user{i}@example.com', 'Letter status', '<p>Approved</p>', 'Approved')
+            self.assertTrue(success)
+        return MESSAGES / (time.perf_counter() - start)
+
+    def test_pooled_sessions_vs_connection_per_message(self):
+        def send_fresh(*message):
+            # What the app did before: a new session for every email
+            transport = SMTPTransport('127.0.0.1', self.server.port, from_email='dms@example.com', use_tls=False)
+            try:
+                return transport.send(*message)
+            finally:
+                transport.close()
+
+        fresh = self.rate(send_fresh)
+        fresh_connections = self.server.connections
+
+        pooled_transport = SMTPTransport('127.0.0.1', self.server.port, from_email='dms@example.com', use_tls=False)
+        pooled = self.rate(pooled_transport.send)
+        pooled_transport.close()
+
+        print(f"\nConnection per message: {fresh:.0f} msgs/sec ({fresh_connections} connections)")
+        print(f"Pooled sessions:        {pooled:.0f} msgs/sec ({self.server.connections - fresh_connections} connection)")
+        self.assertEqual(fresh_connections, MESSAGES)
+        self.assertEqual(self.server.connections - fresh_connections, 1)
+
+class TestMailtrapThroughput(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalMailtrapServer()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def transport(self):
+        return MailtrapTransport('token', 'dms@example.com', api_url=self.server.url)
+
+    def messages(self):
+        return [(f'user{i}@example.com', 'Letter status', '<p>Approved</p>', 'Approved') for i in range(MESSAGES)]
+
+    def test_keep_alive_and_batches_vs_connection_per_message(self):
+        def send_fresh(*message):
+            # What the app did before: requests.post, so a new connection for every email
+            transport = self.transport()
+            try:
+                return transport.send(*message)
+            finally:
+                transport.close()
+
+        counts = []
+        def measure(send_all):
+            connections, requests_made = self.server.connections, self.server.requests
+            start = time.perf_counter()
+            results = send_all(self.messages())
+            elapsed = time.perf_counter() - start
+            self.assertTrue(all(success for success, _ in results))
+            counts.append((self.server.connections - connections, self.server.requests - requests_made))
+            return MESSAGES / elapsed
+
+        fresh = measure(lambda messages: [send_fresh(*message) for message in messages])
+        pooled_transport = self.transport()
+        pooled = measure(lambda messages: [pooled_transport.send(*message) for message in messages])
+        batched = measure(pooled_transport.send_many)
+        pooled_transport.close()
+
+        print()
+        for name, rate, (connections, requests_made) in zip(
+                ('Connection per message:', 'Keep-alive session:', 'Batch endpoint:'),
+                (fresh, pooled, batched), counts):
+            print(f"{name:24}{rate:6.0f} msgs/sec ({connections} new connections, {requests_made} requests)")
+        self.assertEqual(counts, [(MESSAGES, MESSAGES), (1, MESSAGES), (0, 1)])
+
+if __name__ == '__main__':
+    unittest.main()
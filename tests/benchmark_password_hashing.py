@@ -0,0 +1,67 @@
+import unittest
+import threading
+import time
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import passwords
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher
+
+LOGINS = 48
+THREADS = 8  # Request threads logging in at the same time
+METHOD = os.getenv('BENCH_PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def other_request():
+    """Stand-in for a cheap request served by the same worker"""
+    return sum(i * i for i in range(20000))
+
+class TestPasswordHashingUnderLoad(unittest.TestCase):
+    def burst(self, hasher):
+        pwhash = hasher.hash('secret')
+        latencies, probes = [], []
+        done = threading.Event()
+
+        def login(_):
+            start = time.perf_counter()
+            self.assertTrue(hasher.verify(pwhash, 'secret'))
+            latencies.append(time.perf_counter() - start)
+
+        def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                other_request()
+                probes.append(time.perf_counter() - start)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(THREADS) as executor:
+            list(executor.map(login, range(LOGINS)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        prober.join()
+
+        self.assertEqual(len(latencies), LOGINS)
+        return LOGINS / elapsed, percentile(latencies, 0.99), percentile(probes, 0.99)
+
+    def test_pool_vs_request_threads(self):
+        inline = self.burst(PasswordHasher(METHOD, workers=0))
+        pooled_hasher = PasswordHasher(METHOD, workers=2)
+        pooled_hasher.hash('warm up')  # Start the pool processes outside the timing
+        pooled = self.burst(pooled_hasher)
+        pooled_hasher._executor.shutdown()
+
+        print(f"\n{LOGINS} logins from {THREADS} threads, {METHOD}")
+        for name, (rate, p99, probe_p99) in (('Request threads', inline), ('Process pool', pooled)):
+            print(f"{name + ':':17}{rate:6.1f} logins/sec  p99 {p99 * 1000:7.1f}ms  "
+                  f"other requests p99 {probe_p99 * 1000:6.1f}ms")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+import unittest
+import tempfile
+import random
+import json
+import time
+import io
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The suite seeds its own database and keeps the app's caches and files in a
+# temporary directory. By default the database is an SQLite file there too;
+# with BENCH_DB_ENGINE=mysql it is the BENCH_DB_NAME database, dropped and
+# recreated on every run. Set these before app is imported, since it reads
+# its configuration at import time.
+BENCH_DB_ENGINE = os.getenv('BENCH_DB_ENGINE', 'sqlite').lower()
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'geec_dms_bench')
+WORK_DIR = tempfile.TemporaryDirectory()
+os.environ.update({
+    'DB_ENGINE': BENCH_DB_ENGINE,
+    'DB_NAME': BENCH_DB_NAME,
+    'SQLITE_PATH': os.path.join(WORK_DIR.name, 'bench.sqlite3'),
+    'SCHEMA_CHECK': 'False',
+    'SETTINGS_CACHE_BACKEND': 'memory',
+    'EVENTS_BACKEND': 'memory',
+    'DOWNLOAD_OFFLOAD': '',
+    'PROFILING_ENABLED': 'False',
+    'METRICS_DIR': os.path.join(WORK_DIR.name, 'metrics'),
+    'QR_CACHE_DIR': os.path.join(WORK_DIR.name, 'qr'),
+    'SEARCH_INDEX_PATH': os.path.join(WORK_DIR.name, 'search.sqlite3'),
+})
+
+import mysql.connector
+from mysql.connector import Error
+from flask import g, request_finished
+from werkzeug.security import generate_password_hash
+import app as appmod
+from app import app, DB_CONFIG, MIGRATIONS_DIR
+from schema import pending_migrations, apply_migration
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_routes_baseline.json')
+UPDATE_BASELINE = os.getenv('BENCH_UPDATE_BASELINE', 'False').lower() == 'true'
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', 50))
+WARMUP = 3
+LETTERS = int(os.getenv('BENCH_LETTERS', 5000))
+USERS = 20
+BLOB_SIZE = 256 * 1024
+PASSWORD = 'bench-password'
+
+# A route fails when its p95 latency exceeds the baseline by this factor
+# (plus LATENCY_SLACK_MS, so very fast routes don't fail on noise), or its
+# responses grow by more than BYTES_TOLERANCE.
+LATENCY_TOLERANCE = float(os.getenv('BENCH_LATENCY_TOLERANCE', 1.5))
+LATENCY_SLACK_MS = 5
+BYTES_TOLERANCE = 1.25
+
+# Most queries a single request of each route may run, with a warm settings
+# cache. Raise a budget only together with the change that needs it.
+QUERY_BUDGETS = {
+    'login': 1,
+    'dashboard': 1,
+    'letter_status': 2,
+    'verify_letter': 1,
+    'create_letter': 4,
+    'download_letter': 1,
+    'approve_letter': 4,
+    # Lock, update and counters, then one queued email per uploader
+    'review_letters': 3 + 4,
+}
+
+# Letters approved by each review_letters request, from 4 uploaders
+REVIEW_SIZE = 20
+REVIEW_UPLOADERS = 4
+
+def pdf_bytes(size, rng):
+    return b'%PDF-1.4\n' + rng.randbytes(size) + b'\n%%EOF\n'
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+def connect_server():
+    config = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+    return mysql.connector.connect(**config)
+
+def seed_database():
+    """Create the benchmark database from the migrations and fill it with users, letters and blobs"""
+    if BENCH_DB_ENGINE == 'mysql':
+        server = connect_server()
+        cursor = server.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB_NAME}`")
+        cursor.execute(f"CREATE DATABASE `{BENCH_DB_NAME}`")
+        cursor.close()
+        server.close()
+
+    connection = appmod.connect_database()
+    for version, name, path in pending_migrations(connection, MIGRATIONS_DIR):
+        apply_migration(connection, version, name, path)
+
+    rng = random.Random(42)
+    cursor = connection.cursor()
+    password = generate_password_hash(PASSWORD)
+    users = [('bench_admin', 'Bench Admin', 'Admin'), ('bench_ceo', 'Bench CEO', 'CEO')]
+    users += [(f'bench_user{number}', f'Bench User {number}', 'User') for number in range(USERS)]
+    cursor.executemany("""
+        INSERT INTO users (username, full_name, email, role, password, created_date)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+    """, [(username, full_name, f'{username}@example.com', role, password) for username, full_name, role in users])
+    cursor.execute("SELECT id, username, full_name, role FROM users WHERE username LIKE 'bench!_%' ESCAPE '!'")
+    accounts = {username: {'user_id': user_id, 'username': username, 'full_name': full_name, 'role': role}
+                for user_id, username, full_name, role in cursor.fetchall()}
+    uploaders = [account['user_id'] for account in accounts.values() if account['role'] == 'User']
+
+    blobs = []
+    for _ in range(5):
+        content = pdf_bytes(BLOB_SIZE, rng)
+        source_path = os.path.join(WORK_DIR.name, 'seed.pdf')
+        with open(source_path, 'wb') as handle:
+            handle.write(content)
+        sha256, size = appmod.file_sha256(source_path)
+        blobs.append((appmod.blob_store.add_file(source_path, sha256), sha256, size))
+        os.remove(source_path)
+
+    ceo_id = accounts['bench_ceo']['user_id']
+    started = datetime.now() - timedelta(days=365)
+    letters = []
+    for number in range(LETTERS):
+        filename, sha256, size = blobs[number % len(blobs)]
+        status = rng.choice(appmod.LETTER_STATUSES)
+        reviewed = status != 'Pending'
+        upload_date = started + timedelta(minutes=number * 90)
+        letters.append((f'BENCH{number:07d}', filename, f'letter-{number}.pdf', rng.choice(uploaders),
+                        upload_date, status, 1, ceo_id if reviewed else None,
+                        upload_date + timedelta(hours=4) if reviewed else None, sha256, size))
+    for start in range(0, len(letters), 1000):
+        cursor.executemany("""
+            INSERT INTO letters (letter_number, filename, original_filename, uploaded_by, upload_date, status,
+            require_ceo_verification, verified_by, verified_date, file_sha256, file_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, letters[start:start + 1000])
+
+    # Letters for approve_letter to approve, one per request
+    approvals = [f'APPROVE{number:06d}' for number in range(WARMUP + ITERATIONS)]
+    filename, sha256, size = blobs[0]
+    cursor.executemany("""
+        INSERT INTO letters (letter_number, filename, original_filename, uploaded_by, upload_date, status,
+        require_ceo_verification, file_sha256, file_size)
+        VALUES (%s, %s, %s, %s, NOW(), 'Pending', 1, %s, %s)
+    """, [(letter_number, filename, 'approve.pdf', uploaders[0], sha256, size) for letter_number in approvals])
+
+    # Batches of letters for review_letters, one batch per request
+    reviews = [[f'REVIEW{batch:04d}{number:03d}' for number in range(REVIEW_SIZE)]
+               for batch in range(WARMUP + ITERATIONS)]
+    cursor.executemany("""
+        INSERT INTO letters (letter_number, filename, original_filename, uploaded_by, upload_date, status,
+        require_ceo_verification, file_sha256, file_size)
+        VALUES (%s, %s, %s, %s, NOW(), 'Pending', 1, %s, %s)
+    """, [(letter_number, filename, 'review.pdf', uploaders[number % REVIEW_UPLOADERS], sha256, size)
+          for batch in reviews for number, letter_number in enumerate(batch)])
+
+    cursor.executemany("INSERT INTO blobs (sha256, size, ref_count, created_at) VALUES (%s, %s, %s, NOW())",
+                       [(sha256, size, LETTERS + len(approvals) + REVIEW_SIZE * len(reviews))
+                        for _, sha256, size in blobs])
+    cursor.execute("""
+        INSERT INTO letter_status_counts (uploaded_by, status, letter_count)
+        SELECT uploaded_by, status, COUNT(*) FROM letters GROUP BY uploaded_by, status
+    """)
+    cursor.execute("""
+        INSERT INTO letter_status_counts (uploaded_by, status, letter_count)
+        SELECT 0, status, COUNT(*) FROM letters GROUP BY status
+    """)
+    connection.commit()
+    cursor.close()
+    connection.close()
+    return accounts, approvals, reviews
+
+class TestRoutePerformance(unittest.TestCase):
+    """Latency, queries and response size of the hot routes against a seeded database"""
+
+    results = {}
+
+    @classmethod
+    def setUpClass(cls):
+        if BENCH_DB_ENGINE == 'mysql' and not BENCH_DB_NAME.endswith('_bench'):
+            raise unittest.SkipTest("BENCH_DB_NAME must end in '_bench'; the database is dropped on every run")
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['UPLOAD_FOLDER'] = os.path.join(WORK_DIR.name, 'uploads')
+        appmod.blob_store.root = app.config['UPLOAD_FOLDER']
+        if BENCH_DB_ENGINE == 'mysql':
+            try:
+                connect_server().close()
+            except Error as e:
+                raise unittest.SkipTest(f"No MySQL server for the benchmark database: {e}")
+        cls.accounts, cls.approvals, cls.reviews = seed_database()
+
+        # Baselines are kept per engine
+        cls.baselines = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE) as handle:
+                cls.baselines = json.load(handle)
+        cls.baseline = cls.baselines.get(BENCH_DB_ENGINE, {})
+        request_finished.connect(cls.count_queries, app, weak=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        request_finished.disconnect(cls.count_queries, app)
+        if not cls.results:
+            return
+        print(f"\n{BENCH_DB_ENGINE}\n{'route':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'bytes':>10}")
+        for route, result in sorted(cls.results.items()):
+            print(f"{route:<16}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+                  f"{result['queries']:>9}{result['bytes']:>10}")
+        if UPDATE_BASELINE:
+            with open(BASELINE_FILE, 'w') as handle:
+                cls.baselines[BENCH_DB_ENGINE] = dict(cls.baseline, **cls.results)
+                json.dump(cls.baselines, handle, indent=2, sort_keys=True)
+                handle.write('\n')
+            print(f"Baseline written to {BASELINE_FILE}")
+
+    @classmethod
+    def count_queries(cls, sender, response, **extra):
+        cls.last_queries = g.get('db_queries', 0)
+
+    def client(self, username):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update(self.accounts[username])
+        return client
+
+    def benchmark(self, route, send, expected_status, location=None):
+        """Time ITERATIONS requests made by send(iteration) and check them against the budgets"""
+        latencies, queries, sizes = [], [], []
+        for iteration in range(WARMUP + ITERATIONS):
+            started = time.perf_counter()
+            response = send(iteration)
+            body = response.get_data()
+            elapsed = time.perf_counter() - started
+            self.assertEqual(response.status_code, expected_status, f"{route}: {body[:200]!r}")
+            if location:
+                self.assertTrue(response.location.endswith(location), f"{route} redirected to {response.location}")
+            if iteration >= WARMUP:
+                latencies.append(elapsed * 1000)
+                queries.append(self.last_queries)
+                sizes.append(len(body))
+
+        result = {
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+        self.results[route] = result
+
+        self.assertLessEqual(result['queries'], QUERY_BUDGETS[route],
+                             f"{route} ran {result['queries']} queries; its budget is {QUERY_BUDGETS[route]}")
+        if UPDATE_BASELINE:
+            return
+        baseline = self.baseline.get(route)
+        self.assertIsNotNone(baseline, f"No {BENCH_DB_ENGINE} baseline for {route} in {BASELINE_FILE}; "
+                                       f"record one with BENCH_UPDATE_BASELINE=True")
+        limit = baseline['p95_ms'] * LATENCY_TOLERANCE + LATENCY_SLACK_MS
+        self.assertLessEqual(result['p95_ms'], limit,
+                             f"{route} p95 is {result['p95_ms']} ms; baseline {baseline['p95_ms']} ms")
+        self.assertLessEqual(result['bytes'], baseline['bytes'] * BYTES_TOLERANCE,
+                             f"{route} returned {result['bytes']} bytes; baseline {baseline['bytes']}")
+
+    def test_login(self):
+        client = app.test_client()
+        self.benchmark('login', lambda i: client.post('/login', data={
+            'username': 'bench_user0', 'password': PASSWORD}), 302, '/dashboard')
+
+    def test_dashboard(self):
+        client = self.client('bench_admin')
+        self.benchmark('dashboard', lambda i: client.get('/dashboard'), 200)
+
+    def test_letter_status(self):
+        client = self.client('bench_admin')
+        self.benchmark('letter_status', lambda i: client.get('/letter_status'), 200)
+
+    def test_verify_letter(self):
+        # A different letter each time, so every request misses the verify cache
+        client = app.test_client()
+        self.benchmark('verify_letter', lambda i: client.get(f'/verify/BENCH{i * 7:07d}'), 200)
+
+    def test_create_letter(self):
+        client = self.client('bench_user0')
+        rng = random.Random(7)
+        self.benchmark('create_letter', lambda i: client.post('/create_letter', data={
+            'letter_file': (io.BytesIO(pdf_bytes(BLOB_SIZE, rng)), 'bench.pdf'),
+            'require_verification': 'on'}, content_type='multipart/form-data'), 302, '/letter_status')
+
+    def test_download_letter(self):
+        client = self.client('bench_admin')
+        self.benchmark('download_letter', lambda i: client.get(f'/download_letter/BENCH{i:07d}'), 200)
+
+    def test_approve_letter(self):
+        client = self.client('bench_ceo')
+        self.benchmark('approve_letter', lambda i: client.post(f'/approve_letter/{self.approvals[i]}',
+                                                               data={'comments': 'Approved'}), 302, '/letter_status')
+
+    def test_review_letters(self):
+        client = self.client('bench_ceo')
+        self.benchmark('review_letters', lambda i: client.post('/api/review-letters', json={
+            'letter_numbers': self.reviews[i], 'action': 'approve', 'comments': 'Approved'}), 200)
+
+if __name__ == '__main__':
+    unittest.main()
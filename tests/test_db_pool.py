@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path to import db
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+from db import ConnectionPool, PoolTimeout, ReplicaMonitor
+
+def fake_connection():
+    connection = MagicMock()
+    connection.in_transaction = False
+    return connection
+
+class TestConnectionPool(unittest.TestCase):
+    def test_busy_pool_waits_for_a_returned_connection(self):
+        pool = ConnectionPool(fake_connection, size=1, timeout=2)
+        first = pool.get_connection()
+        threading.Timer(0.1, first.close).start()
+
+        second = pool.get_connection()
+
+        stats = pool.stats()
+        self.assertEqual((stats['open'], stats['in_use'], stats['checkouts']), (1, 1, 2))
+        self.assertGreater(stats['wait_max_ms'], 50)
+        second.close()
+
+    def test_timeout_and_bounded_wait_queue(self):
+        pool = ConnectionPool(fake_connection, size=1, timeout=0.05, max_waiting=0)
+        held = pool.get_connection()
+        with self.assertRaises(PoolTimeout):
+            pool.get_connection()
+
+        pool.max_waiting = 1
+        with self.assertRaises(PoolTimeout):
+            pool.get_connection()
+        self.assertEqual((pool.stats()['rejected'], pool.stats()['timeouts']), (1, 1))
+        held.close()
+
+    def test_context_manager_returns_and_rolls_back(self):
+        pool = ConnectionPool(fake_connection, size=1)
+        with self.assertRaises(ValueError):
+            with pool.connection() as connection:
+                connection._raw.in_transaction = True
+                raise ValueError('query failed')
+
+        self.assertEqual(pool.stats()['idle'], 1)
+        self.assertTrue(pool._idle[0][0].rollback.called)
+
+    def test_stale_connections_are_checked_or_replaced(self):
+        pool = ConnectionPool(fake_connection, size=2, ping_after=30, idle_timeout=300)
+        connection = pool.get_connection()
+        raw = connection._raw
+        connection.close()
+
+        later = time.monotonic() + 60
+        with patch('db.time.monotonic', return_value=later):
+            raw.ping.side_effect = Error('MySQL server has gone away')
+            replacement = pool.get_connection()
+
+        self.assertIsNot(replacement._raw, raw)
+        self.assertTrue(raw.close.called)
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_query_and_wait_hooks(self):
+        queries, waits = [], []
+        pool = ConnectionPool(fake_connection, on_query=queries.append, on_wait=waits.append)
+        with pool.connection() as connection:
+            connection._raw.cursor.return_value.fetchone.return_value = None
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.execute("SELECT 2")
+            list(cursor)
+            cursor.close()
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(len(waits), 1)
+
+class TestReplicaMonitor(unittest.TestCase):
+    def test_lagging_or_stopped_replica_is_not_used(self):
+        lags = [1, 30, None]
+        monitor = ReplicaMonitor(ConnectionPool(fake_connection), max_lag=5, check_interval=0,
+                                 measure=lambda connection: lags.pop(0))
+
+        self.assertTrue(monitor.healthy())
+        self.assertFalse(monitor.healthy())
+        self.assertFalse(monitor.healthy())
+        self.assertEqual(monitor.stats()['error'], 'Replica is not replicating')
+
+    def test_unreachable_replica_is_not_used(self):
+        def refuse():
+            raise Error("Can't connect to MySQL server")
+
+        monitor = ReplicaMonitor(ConnectionPool(refuse), check_interval=60)
+
+        self.assertFalse(monitor.healthy())
+        self.assertEqual(monitor.stats()['fallbacks'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
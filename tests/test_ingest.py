@@ -0,0 +1,54 @@
+import unittest
+import hashlib
+import tempfile
+import sys
+import os
+
+# Add parent directory to path to import ingest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import IngestedUpload
+
+class TestIngestedUpload(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def ingest(self, *chunks):
+        upload = IngestedUpload(self.directory.name)
+        for chunk in chunks:
+            upload.write(chunk)
+        upload.seek(0)
+        return upload
+
+    def test_pdf_is_hashed_and_kept(self):
+        chunks = [b'%P', b'DF-1.7\n', b'body' * 1000, b'\n%%EOF\n']
+        upload = self.ingest(*chunks)
+        destination = os.path.join(self.directory.name, 'letter.pdf')
+
+        self.assertIsNone(upload.problem())
+        self.assertEqual(upload.sha256, hashlib.sha256(b''.join(chunks)).hexdigest())
+        self.assertEqual(upload.size, len(b''.join(chunks)))
+
+        upload.keep(destination)
+        upload.close()
+        with open(destination, 'rb') as handle:
+            self.assertEqual(handle.read(), b''.join(chunks))
+
+    def test_non_pdf_stops_being_written(self):
+        upload = self.ingest(b'<html>', b'x' * 10000)
+
+        self.assertIsNotNone(upload.problem())
+        self.assertEqual(os.path.getsize(upload.path), 0)
+        upload.close()
+        self.assertFalse(os.path.exists(upload.path))
+
+    def test_missing_trailer_is_rejected(self):
+        upload = self.ingest(b'%PDF-1.7\n', b'cut off here')
+        self.assertEqual(upload.problem(), 'The uploaded PDF is incomplete or damaged.')
+        upload.close()
+
+if __name__ == '__main__':
+    unittest.main()
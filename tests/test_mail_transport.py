@@ -0,0 +1,126 @@
+import unittest
+from unittest.mock import MagicMock
+import socketserver
+import threading
+import sys
+import os
+
+# Add parent directory to path to import mail_transport
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mail_transport import MailtrapTransport, SMTPTransport
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Minimal SMTP stand-in that accepts every message and counts connections"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith('EHLO') or command.startswith('HELO'):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                data = []
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b'.\r\n', b''):
+                        break
+                    data.append(line)
+                self.server.messages.append(b''.join(data))
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+class TestSMTPTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalSMTPServer()
+        self.transport = SMTPTransport('127.0.0.1', self.server.port, from_email='dms@example.com', use_tls=False)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_sessions_are_reused_across_sends(self):
+        for i in range(5):
+            success, _ = self.transport.send(f'user{i}@example.com', 'Subject', '<p>Hi</p>', 'Hi')
+            self.assertTrue(success)
+
+        results = self.transport.send_many([('a@example.com', 'S', '<p>A</p>', 'A'),
+                                            ('b@example.com', 'S', '<p>B</p>', 'B')])
+
+        self.assertEqual([success for success, _ in results], [True, True])
+        self.assertEqual(len(self.server.messages), 7)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_dropped_session_is_replaced(self):
+        self.transport.send('a@example.com', 'S', '<p>A</p>')
+        connection, _ = self.transport._idle.get_nowait()
+        connection.close()
+        self.transport._idle.put_nowait((connection, 0))
+
+        success, _ = self.transport.send('b@example.com', 'S', '<p>B</p>')
+
+        self.assertTrue(success)
+        self.assertEqual(self.server.connections, 2)
+
+class TestMailtrapTransport(unittest.TestCase):
+    def test_batch_results_map_to_messages(self):
+        transport = MailtrapTransport('token', 'dms@example.com')
+        transport.session = MagicMock()
+        transport.session.post.return_value.ok = True
+        transport.session.post.return_value.json.return_value = {
+            'success': True,
+            'responses': [{'success': True, 'message_ids': ['1']}, {'success': False, 'errors': ['bad address']}],
+        }
+
+        results = transport.send_many([('a@example.com', 'S', '<p>A</p>', 'A'), ('nope', 'S', '<p>B</p>', 'B')])
+
+        url = transport.session.post.call_args.args[0]
+        payload = transport.session.post.call_args.kwargs['json']
+        self.assertTrue(url.endswith('/api/batch'))
+        self.assertEqual(len(payload['requests']), 2)
+        self.assertTrue(results[0][0])
+        self.assertEqual(results[1], (False, 'Email sending failed: bad address'))
+
+    def test_unreadable_batch_report_leaves_delivery_unknown(self):
+        transport = MailtrapTransport('token', 'dms@example.com')
+        transport.session = MagicMock()
+        transport.session.post.return_value.ok = True
+        transport.session.post.return_value.status_code = 200
+        transport.session.post.return_value.json.side_effect = ValueError('Expecting value')
+
+        results = transport.send_many([('a@example.com', 'S', '<p>A</p>', 'A'), ('b@example.com', 'S', '<p>B</p>', 'B')])
+
+        self.assertEqual([success for success, _ in results], [None, None])
+        self.assertTrue(results[0][1].startswith('Delivery unknown'))
+
+if __name__ == '__main__':
+    unittest.main()
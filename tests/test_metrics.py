@@ -0,0 +1,54 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+
+# Add parent directory to path to import metrics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_histograms_are_cumulative_in_the_exposition(self):
+        registry = MetricsRegistry(self.directory.name)
+        for seconds in (0.004, 0.2, 30):
+            registry.observe('geec_http_request_duration_seconds', 'Latency', seconds, endpoint='dashboard')
+
+        text = registry.render()
+
+        self.assertIn('# TYPE geec_http_request_duration_seconds histogram', text)
+        self.assertIn('geec_http_request_duration_seconds_bucket{endpoint="dashboard",le="0.005"} 1', text)
+        self.assertIn('geec_http_request_duration_seconds_bucket{endpoint="dashboard",le="0.25"} 2', text)
+        self.assertIn('geec_http_request_duration_seconds_bucket{endpoint="dashboard",le="+Inf"} 3', text)
+        self.assertIn('geec_http_request_duration_seconds_count{endpoint="dashboard"} 3', text)
+
+    def test_workers_are_merged(self):
+        worker_a = MetricsRegistry(self.directory.name)
+        worker_b = MetricsRegistry(self.directory.name)
+        worker_a.inc('geec_emails_total', 'Emails', result='sent')
+        worker_b.inc('geec_emails_total', 'Emails', amount=2, result='sent')
+        worker_b.flush()
+
+        # A worker that has exited: its counters still count, its gauges don't
+        with open(os.path.join(self.directory.name, '999999999-dead.json'), 'w') as handle:
+            json.dump({'pid': 999999999,
+                       'meta': {'geec_emails_total': {'type': 'counter', 'help': 'Emails', 'buckets': []},
+                                'geec_db_pool_connections': {'type': 'gauge', 'help': 'Pool', 'buckets': []}},
+                       'series': [['geec_emails_total', [['result', 'sent']], {'value': 4}],
+                                  ['geec_db_pool_connections', [], {'value': 5}]]}, handle)
+        worker_a.set('geec_db_pool_connections', 'Pool', 1)
+
+        text = worker_a.render()
+
+        self.assertIn('geec_emails_total{result="sent"} 7', text)
+        self.assertIn('geec_db_pool_connections 1', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import MagicMock
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import os
+
+# Add parent directory to path to import outbox
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbox import OutboxWorker
+
+class TestOutboxWorker(unittest.TestCase):
+    def setUp(self):
+        self.connection = MagicMock()
+        self.cursor = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+
+    def make_worker(self, send, **kwargs):
+        return OutboxWorker(lambda: self.connection, send, concurrency=2, **kwargs)
+
+    def updates(self):
+        return [call.args for call in self.cursor.execute.call_args_list if 'UPDATE email_outbox SET' in call.args[0]]
+
+    def test_successful_delivery_marks_sent(self):
+        self.cursor.fetchall.return_value = [
+            {'id': 1, 'to_email': 'a@example.com', 'subject': 's', 'html_body': 'h', 'text_body': 't', 'attempts': 0},
+        ]
+        send = MagicMock(return_value=(True, 'ok'))
+        worker = self.make_worker(send)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(worker.run_once(executor), 1)
+
+        send.assert_called_once_with('a@example.com', 's', 'h', 't')
+        self.assertIn("status = 'sent'", self.updates()[-1][0])
+
+    def test_failure_is_retried_then_dead_lettered(self):
+        self.cursor.fetchall.return_value = [
+            {'id': 1, 'to_email': 'a@example.com', 'subject': 's', 'html_body': 'h', 'text_body': 't', 'attempts': 0},
+            {'id': 2, 'to_email': 'b@example.com', 'subject': 's', 'html_body': 'h', 'text_body': 't', 'attempts': 2},
+        ]
+        send = MagicMock(side_effect=RuntimeError('provider down'))
+        worker = self.make_worker(send, max_attempts=3)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            worker.run_once(executor)
+
+        retry, dead = self.updates()[-2:]
+        self.assertIn('next_attempt_at', retry[0])
+        self.assertEqual(retry[1][1:], ('provider down', 1))
+        self.assertIn("status = 'dead'", dead[0])
+        self.assertEqual(dead[1], ('provider down', 2))
+
+    def test_unknown_delivery_is_dead_lettered_without_retry(self):
+        self.cursor.fetchall.return_value = [
+            {'id': 1, 'to_email': 'a@example.com', 'subject': 's', 'html_body': 'h', 'text_body': 't', 'attempts': 0},
+        ]
+        send_many = MagicMock(return_value=[(None, 'Delivery unknown')])
+        worker = self.make_worker(MagicMock(), send_many=send_many, max_attempts=3)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            worker.run_once(executor)
+
+        self.assertIn("status = 'dead'", self.updates()[-1][0])
+        self.assertEqual(self.updates()[-1][1], ('Delivery unknown', 1))
+
+    def test_send_many_delivers_in_chunks(self):
+        self.cursor.fetchall.return_value = [
+            {'id': i, 'to_email': f'{i}@example.com', 'subject': 's', 'html_body': 'h', 'text_body': 't', 'attempts': 0}
+            for i in range(1, 6)
+        ]
+        send_many = MagicMock(side_effect=lambda messages: [(True, 'ok')] * len(messages))
+        send = MagicMock()
+        worker = self.make_worker(send, send_many=send_many)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(worker.run_once(executor), 5)
+
+        send.assert_not_called()
+        self.assertEqual(sorted(len(call.args[0]) for call in send_many.call_args_list), [2, 3])
+        self.assertEqual(sum("status = 'sent'" in update[0] for update in self.updates()), 5)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        worker = self.make_worker(MagicMock(), base_delay=10, max_delay=100)
+
+        self.assertTrue(8 <= worker.backoff(1) <= 12)
+        self.assertTrue(16 <= worker.backoff(2) <= 24)
+        self.assertTrue(80 <= worker.backoff(10) <= 120)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import passwords
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+from passwords import PasswordHasher, HasherBusy
+
+# Cheap policy so the tests don't spend seconds hashing
+METHOD = 'pbkdf2:sha256:1000'
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_inline_hash_verify_and_rehash(self):
+        hasher = PasswordHasher(METHOD, workers=0)
+        pwhash = hasher.hash('secret')
+
+        self.assertTrue(pwhash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(hasher.verify(pwhash, 'secret'))
+        self.assertFalse(hasher.verify(pwhash, 'wrong'))
+        self.assertFalse(hasher.needs_rehash(pwhash))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:2000')))
+
+    def test_pool_hashes_in_another_process(self):
+        hasher = PasswordHasher(METHOD, workers=1)
+        pwhash = hasher.hash('secret')
+
+        self.assertTrue(hasher.verify(pwhash, 'secret'))
+        self.assertFalse(hasher.verify(pwhash, 'wrong'))
+        hasher._executor.shutdown()
+
+    def test_busy_when_no_slot_is_free(self):
+        hasher = PasswordHasher(METHOD, workers=1, max_pending=1, timeout=0.05)
+        hasher._slots.acquire()
+        try:
+            with self.assertRaises(HasherBusy):
+                hasher.verify(generate_password_hash('secret', METHOD), 'secret')
+        finally:
+            hasher._slots.release()
+        self.assertIsNone(hasher._executor)
+
+if __name__ == '__main__':
+    unittest.main()
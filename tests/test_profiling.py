@@ -0,0 +1,65 @@
+import unittest
+import tempfile
+import pstats
+import sys
+import os
+
+# Add parent directory to path to import profiling
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import ProfileStore
+
+def render_page():
+    return [str(number) * 100 for number in range(2000)]
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_profile_records_functions_and_memory(self):
+        store = ProfileStore(self.directory.name)
+        run = store.start()
+        pages = render_page()
+        name = store.finish(run, endpoint='letter_status', method='GET', path='/letter_status', status=200)
+
+        profile = store.load(name)
+        self.assertEqual(profile['endpoint'], 'letter_status')
+        self.assertIn('render_page', profile['functions'])
+        self.assertTrue(any('test_profiling.py' in stat['location'] for stat in profile['memory']))
+        self.assertGreater(profile['peak_memory'], 0)
+        self.assertIn('render_page', str(pstats.Stats(store.path(name, 'prof')).stats))
+        self.assertNotIn('functions', store.list()[0])
+        del pages
+
+    def test_directory_is_created_with_the_first_profile(self):
+        directory = os.path.join(self.directory.name, 'profiles')
+        store = ProfileStore(directory)
+        self.assertEqual(store.list(), [])
+        self.assertFalse(os.path.exists(directory))
+
+        store.finish(store.start(), endpoint='dashboard')
+        self.assertEqual(len(store.list()), 1)
+
+    def test_one_request_is_profiled_at_a_time(self):
+        store = ProfileStore(self.directory.name)
+        run = store.start()
+        self.assertIsNone(store.start())
+        store.finish(run, endpoint='dashboard')
+        store.finish(store.start(), endpoint='dashboard')
+
+    def test_old_profiles_are_pruned_and_names_checked(self):
+        store = ProfileStore(self.directory.name, max_profiles=2)
+        names = [store.finish(store.start(), endpoint=f'page{number}') for number in range(3)]
+
+        self.assertEqual(len(store.list()), 2)
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+        self.assertIsNone(store.load('../settings'))
+        with self.assertRaises(ValueError):
+            store.path('../../app', 'prof')
+        self.assertIn(names[-1], [profile['name'] for profile in store.list()])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import sys
+import os
+
+# Add parent directory to path to import qr_codes
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qr_codes
+from qr_codes import QRCodeCache
+
+class TestQRCodeCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = 'https://dms.example.com/verify/ABC123'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_each_code_is_rendered_once(self):
+        cache = QRCodeCache(self.directory.name)
+        with patch('qr_codes.render_qr_code', wraps=qr_codes.render_qr_code) as render:
+            png = cache.get(self.url, 'png')
+            self.assertEqual(cache.get(self.url, 'png'), png)
+            # A fresh process finds the image on disk
+            self.assertEqual(QRCodeCache(self.directory.name).lookup(self.url, 'png'), png)
+
+        self.assertEqual(render.call_count, 1)
+        self.assertTrue(png.startswith(b'\x89PNG'))
+
+    def test_lookup_does_not_render(self):
+        cache = QRCodeCache(self.directory.name)
+        self.assertIsNone(cache.lookup(self.url, 'svg'))
+        self.assertIn(b'<svg', cache.get(self.url, 'svg'))
+
+    def test_memory_cache_is_bounded(self):
+        cache = QRCodeCache(self.directory.name, max_items=2)
+        for letter_number in ('A', 'B', 'C'):
+            cache.get(f'https://dms.example.com/verify/{letter_number}', 'png')
+
+        self.assertEqual(len(cache._items), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads its configuration at import time, so point it at an SQLite
+# database and cache directories in a temporary directory first
+WORK_DIR = tempfile.TemporaryDirectory()
+os.environ.update({
+    'DB_ENGINE': 'sqlite',
+    'SQLITE_PATH': os.path.join(WORK_DIR.name, 'routes.sqlite3'),
+    'SCHEMA_CHECK': 'False',
+    'SETTINGS_CACHE_BACKEND': 'memory',
+    'EVENTS_BACKEND': 'memory',
+    'PROFILING_ENABLED': 'False',
+    'METRICS_DIR': os.path.join(WORK_DIR.name, 'metrics'),
+    'QR_CACHE_DIR': os.path.join(WORK_DIR.name, 'qr'),
+    'SEARCH_INDEX_PATH': os.path.join(WORK_DIR.name, 'search.sqlite3'),
+})
+
+from mysql.connector import Error
+import app as appmod
+from app import app, MIGRATIONS_DIR
+from schema import pending_migrations, apply_migration
+
+def setUpModule():
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['UPLOAD_FOLDER'] = os.path.join(WORK_DIR.name, 'uploads')
+    appmod.blob_store.root = app.config['UPLOAD_FOLDER']
+
+    connection = appmod.connect_database()
+    for version, name, path in pending_migrations(connection, MIGRATIONS_DIR):
+        apply_migration(connection, version, name, path)
+    cursor = connection.cursor()
+    cursor.executemany("""
+        INSERT INTO users (username, full_name, email, role, password, created_date)
+        VALUES (%s, %s, %s, %s, 'x', NOW())
+    """, [('admin', 'Admin', 'admin@example.com', 'Admin'),
+          ('ceo', 'CEO', 'ceo@example.com', 'CEO'),
+          ('user', 'User', 'user@example.com', 'User')])
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+def query(sql, params=()):
+    with appmod.db_connection(primary=True) as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall() if cursor.description else None
+        connection.commit()
+        cursor.close()
+    return rows
+
+def user_id(username):
+    return query("SELECT id FROM users WHERE username = %s", (username,))[0]['id']
+
+def add_letter(letter_number, status='Pending', uploaded_by='user', filename=None, file_sha256=None):
+    query("""
+        INSERT INTO letters (letter_number, filename, original_filename, uploaded_by, upload_date, status,
+        require_ceo_verification, file_sha256)
+        VALUES (%s, %s, %s, %s, NOW(), %s, 1, %s)
+    """, (letter_number, filename or f'{letter_number}.pdf', f'{letter_number}.pdf',
+          user_id(uploaded_by), status, file_sha256))
+
+def client(username):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update({'user_id': user_id(username), 'username': username,
+                        'full_name': username.title(), 'role': {'admin': 'Admin', 'ceo': 'CEO'}.get(username, 'User')})
+    return client
+
+class TestApiVerify(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        add_letter('VERIFY0001', status='Verified')
+        add_letter('VERIFY0002')
+
+    def test_mixed_case_and_duplicates_as_json(self):
+        response = app.test_client().post('/api/verify', json={
+            'letter_numbers': ['VERIFY0001', 'verify0002', 'NOPE', 'verify0002', 'Verify0001']})
+
+        results = response.get_json()['results']
+        self.assertEqual([(r['letter_number'], r['found']) for r in results],
+                         [('VERIFY0001', True), ('verify0002', True), ('NOPE', False), ('Verify0001', True)])
+        self.assertEqual([r.get('status') for r in results], ['Verified', 'Pending', None, 'Verified'])
+
+    def test_mixed_case_and_duplicates_as_ndjson(self):
+        response = app.test_client().post('/api/verify', headers={'Accept': 'application/x-ndjson'}, json={
+            'letter_numbers': ['VERIFY0001', 'verify0002', 'NOPE', 'verify0002', 'Verify0001']})
+
+        results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(sorted((r['letter_number'], r['found']) for r in results),
+                         [('NOPE', False), ('VERIFY0001', True), ('Verify0001', True), ('verify0002', True)])
+
+class TestReviewLetters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        query("""
+            INSERT INTO users (username, full_name, email, role, password, created_date)
+            VALUES ('clerk', 'Clerk', 'clerk@example.com', 'User', 'x', NOW())
+        """)
+
+    def setUp(self):
+        query("DELETE FROM email_outbox")
+
+    def review(self, letter_numbers, action='approve', comments='Checked'):
+        return client('ceo').post('/api/review-letters', json={
+            'letter_numbers': letter_numbers, 'action': action, 'comments': comments})
+
+    def test_each_letter_gets_its_own_result(self):
+        add_letter('REVIEW0001')
+        add_letter('REVIEW0002', status='Rejected')
+
+        response = self.review(['REVIEW0001', 'REVIEW0002', 'NOPE'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['results'], [
+            {'letter_number': 'REVIEW0001', 'result': 'reviewed', 'status': 'Verified'},
+            {'letter_number': 'REVIEW0002', 'result': 'not_pending', 'status': 'Rejected'},
+            {'letter_number': 'NOPE', 'result': 'not_found'},
+        ])
+        self.assertEqual(query("SELECT status FROM letters WHERE letter_number IN ('REVIEW0001', 'REVIEW0002') "
+                               "ORDER BY letter_number"), [{'status': 'Verified'}, {'status': 'Rejected'}])
+
+    def test_mixed_case_letter_numbers(self):
+        add_letter('REVIEW0003')
+
+        results = self.review(['review0003', 'Review0003']).get_json()['results']
+
+        self.assertEqual([result['result'] for result in results], ['reviewed', 'reviewed'])
+        self.assertEqual(query("SELECT status FROM letters WHERE letter_number = 'REVIEW0003'"),
+                         [{'status': 'Verified'}])
+        self.assertEqual(len(query("SELECT id FROM email_outbox")), 1)
+
+    def test_rejection_needs_a_reason(self):
+        add_letter('REVIEW0004')
+
+        response = self.review(['REVIEW0004'], action='reject', comments='  ')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'A rejection reason is required.')
+        self.assertEqual(query("SELECT status FROM letters WHERE letter_number = 'REVIEW0004'"),
+                         [{'status': 'Pending'}])
+
+    def test_batch_is_capped(self):
+        response = self.review([f'CAP{number:04d}' for number in range(appmod.REVIEW_BATCH_MAX + 1)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(appmod.REVIEW_BATCH_MAX), response.get_json()['error'])
+        self.assertEqual(self.review([f'CAP{number:04d}' for number in range(appmod.REVIEW_BATCH_MAX)]).status_code, 200)
+
+    def test_one_email_per_uploader(self):
+        for number in range(5, 8):
+            add_letter(f'REVIEW{number:04d}')
+        add_letter('REVIEW0008', uploaded_by='clerk')
+
+        self.review(['REVIEW0005', 'REVIEW0006', 'REVIEW0007', 'REVIEW0008'], action='reject', comments='Unsigned')
+
+        self.assertEqual(query("SELECT to_email, subject FROM email_outbox ORDER BY to_email"), [
+            {'to_email': 'clerk@example.com', 'subject': '[GEEC] Letter REJECTED - REVIEW0008'},
+            {'to_email': 'user@example.com', 'subject': '[GEEC] 3 Letters REJECTED'},
+        ])
+
+class TestDeleteLetter(unittest.TestCase):
+    def add_stored_letter(self, letter_number):
+        source_path = os.path.join(WORK_DIR.name, f'{letter_number}.pdf')
+        with open(source_path, 'wb') as handle:
+            handle.write(f'%PDF-1.4 {letter_number}'.encode())
+        sha256, size = appmod.file_sha256(source_path)
+        filename = appmod.blob_store.add_file(source_path, sha256)
+        os.remove(source_path)
+        query("INSERT INTO blobs (sha256, size, ref_count, created_at) VALUES (%s, %s, 1, NOW())", (sha256, size))
+        add_letter(letter_number, filename=filename, file_sha256=sha256)
+        return sha256
+
+    def test_blob_is_removed_after_the_delete_commits(self):
+        sha256 = self.add_stored_letter('DELETE0001')
+
+        client('admin').post('/delete_letter/DELETE0001')
+
+        self.assertEqual(query("SELECT id FROM letters WHERE letter_number = 'DELETE0001'"), [])
+        self.assertEqual(query("SELECT sha256 FROM blobs WHERE sha256 = %s", (sha256,)), [])
+        self.assertFalse(os.path.exists(appmod.blob_store.path(sha256)))
+
+    def test_blob_is_kept_when_the_commit_fails(self):
+        sha256 = self.add_stored_letter('DELETE0002')
+        admin = client('admin')
+        get_db_connection = appmod.get_db_connection
+
+        def failing_commit(*args, **kwargs):
+            connection = MagicMock(wraps=get_db_connection(*args, **kwargs))
+            connection.commit.side_effect = Error('commit failed')
+            return connection
+
+        with patch.object(appmod, 'get_db_connection', failing_commit):
+            admin.post('/delete_letter/DELETE0002')
+
+        self.assertEqual(len(query("SELECT id FROM letters WHERE letter_number = 'DELETE0002'")), 1)
+        self.assertEqual(query("SELECT ref_count FROM blobs WHERE sha256 = %s", (sha256,)), [{'ref_count': 1}])
+        self.assertTrue(os.path.exists(appmod.blob_store.path(sha256)))
+
+if __name__ == '__main__':
+    unittest.main()
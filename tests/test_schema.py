@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add parent directory to path to import schema
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import discover, split_statements, missing_indexes, full_scan_queries
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+class TestSchema(unittest.TestCase):
+    def test_migrations_are_numbered_and_split(self):
+        migrations = discover(MIGRATIONS_DIR)
+        versions = [version for version, _, _ in migrations]
+        self.assertEqual(versions, list(range(len(versions))))
+
+        statements = split_statements(open(migrations[0][2]).read())
+        self.assertTrue(statements[0].startswith('CREATE TABLE IF NOT EXISTS users'))
+        self.assertFalse(any(statement.startswith('--') or statement.endswith(';') for statement in statements))
+
+    def test_required_indexes_match_on_leading_columns(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            ('letters', 'uq_letters_letter_number', 'letter_number'),
+            ('letters', 'idx_letters_uploader_date', 'uploaded_by'),
+            ('letters', 'idx_letters_uploader_date', 'upload_date'),
+            ('letters', 'idx_letters_uploader_date', 'id'),
+            ('settings', 'PRIMARY', 'setting_key'),
+        ]
+
+        missing = missing_indexes(cursor)
+
+        self.assertIn(('letters', ('status', 'upload_date')), missing)
+        self.assertNotIn(('letters', ('uploaded_by', 'upload_date')), missing)
+        self.assertNotIn(('settings', ('setting_key',)), missing)
+        # Tables that don't exist yet are left to the pending migrations
+        self.assertFalse([table for table, _ in missing if table not in ('letters', 'settings')])
+
+    def test_full_scans_without_candidate_index_are_reported(self):
+        cursor = MagicMock()
+        cursor.description = [('id',), ('table',), ('type',), ('possible_keys',)]
+        plans = {
+            'letters': [(1, 'letters', 'ref', 'idx_letters_status_date')],
+            'users': [(1, 'users', 'ALL', None)],
+        }
+        cursor.execute.side_effect = lambda sql: setattr(
+            cursor, 'rows', plans['users'] if 'FROM users' in sql else plans['letters'])
+        cursor.fetchall.side_effect = lambda: cursor.rows
+
+        self.assertEqual(full_scan_queries(cursor), ['user by username'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add parent directory to path to import search_index
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex, build_match_query
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = SearchIndex(os.path.join(self.directory.name, 'search.sqlite3'))
+        self.index.add('A1', 1, 'contract.pdf', 'Annual maintenance contract for the <b>generators</b>')
+        self.index.add('B2', 2, 'memo.pdf', 'Maintenance window moved to Friday')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_results_are_filtered_by_uploader(self):
+        self.assertEqual({r['letter_number'] for r in self.index.search('maintenance')}, {'A1', 'B2'})
+        self.assertEqual([r['letter_number'] for r in self.index.search('maintenance', uploaded_by=2)], ['B2'])
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        snippet = self.index.search('generat')[0]['snippet']
+        self.assertIn('<mark>generators</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_reindex_and_remove(self):
+        self.index.add('A1', 1, 'contract.pdf', 'Replaced text')
+        self.assertEqual(self.index.search('annual'), [])
+
+        self.index.remove('B2')
+        self.assertEqual(self.index.indexed_letters(), {'A1'})
+
+    def test_query_syntax_is_neutralised(self):
+        self.assertEqual(build_match_query('NOT "x" OR y*'), '"NOT" "x" "OR" "y"*')
+        self.assertIsNone(build_match_query('*** "'))
+
+if __name__ == '__main__':
+    unittest.main()
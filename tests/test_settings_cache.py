@@ -0,0 +1,101 @@
+import unittest
+import tempfile
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path to import settings_cache
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings_cache import SettingsCache, SettingsSnapshot, MemoryBackend, SharedMemoryBackend, RedisBackend
+
+class LocalRedis:
+    """Stand-in for a Redis client supporting the commands RedisBackend uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def incr(self, key):
+        with self.lock:
+            self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+            return int(self.data[key])
+
+class TestSettingsCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_invalidation_reaches_other_workers(self):
+        path = os.path.join(self.directory.name, 'settings.version')
+        worker_a = SettingsCache(SharedMemoryBackend(path))
+        worker_b = SettingsCache(SharedMemoryBackend(path))
+        changes = []
+        worker_b.on_change(lambda: changes.append(True))
+
+        self.assertEqual(worker_b.get('company_name', lambda: 'Old'), 'Old')
+        self.assertEqual(worker_b.get('company_name', lambda: 'New'), 'Old')
+
+        worker_a.invalidate()
+
+        self.assertEqual(worker_b.get('company_name', lambda: 'New'), 'New')
+        self.assertEqual(changes, [True])
+
+    def test_redis_backend_shares_values_between_hosts(self):
+        client = LocalRedis()
+        host_a = SettingsCache(RedisBackend(client, check_interval=0))
+        host_b = SettingsCache(RedisBackend(client, check_interval=0))
+
+        host_a.get('ceo_email', lambda: 'ceo@example.com')
+        self.assertEqual(host_b.get('ceo_email', lambda: 'not loaded'), 'ceo@example.com')
+
+        host_b.invalidate()
+        self.assertEqual(host_a.get('ceo_email', lambda: 'new@example.com'), 'new@example.com')
+
+    def test_snapshots_are_shared_through_redis(self):
+        client = LocalRedis()
+        rows = [('company_name', 'ACME'), ('max_file_size', '1048576'), ('maintenance', 'yes')]
+        SettingsCache(RedisBackend(client)).get('settings', lambda: SettingsSnapshot(rows))
+
+        snapshot = SettingsCache(RedisBackend(client)).get('settings', lambda: None, decode=SettingsSnapshot)
+
+        self.assertIsInstance(snapshot, SettingsSnapshot)
+        self.assertEqual(snapshot.company_info['name'], 'ACME')
+        self.assertEqual(snapshot.get_int('max_file_size'), 1048576)
+        self.assertTrue(snapshot.get_bool('maintenance'))
+        self.assertEqual(snapshot.get('ceo_email', 'none'), 'none')
+        with self.assertRaises(TypeError):
+            snapshot['company_name'] = 'Other'
+
+    def test_concurrent_misses_load_once(self):
+        cache = SettingsCache(MemoryBackend())
+        calls = []
+
+        def slow_load():
+            calls.append(True)
+            time.sleep(0.1)
+            return 'GEEC'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('company_name', slow_load)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['GEEC'] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['loads'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import tempfile
+import threading
+import sys
+import os
+from datetime import datetime
+
+# Add parent directory to path to import sqlite_db
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error, IntegrityError
+from db import ConnectionPool
+from schema import pending_migrations, apply_migration, check_schema
+from sqlite_db import connect_sqlite, translate
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations', 'sqlite')
+
+class TestSQLiteEngine(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data', 'dms.sqlite3')
+        self.pool = ConnectionPool(lambda: connect_sqlite(self.path), size=4)
+        with self.pool.connection() as connection:
+            for version, name, path in pending_migrations(connection, MIGRATIONS_DIR):
+                apply_migration(connection, version, name, path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_mysql_constructs_are_translated(self):
+        sql, locking = translate("SELECT ref_count FROM blobs WHERE sha256 = %s FOR UPDATE")
+        self.assertEqual(sql, "SELECT ref_count FROM blobs WHERE sha256 = ?")
+        self.assertTrue(locking)
+
+        sql, locking = translate("""
+            INSERT INTO letter_status_counts (uploaded_by, status, letter_count) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE letter_count = letter_count + VALUES(letter_count)
+        """)
+        self.assertIn("ON CONFLICT DO UPDATE SET letter_count = letter_count + excluded.letter_count", sql)
+        self.assertFalse(locking)
+
+    def test_base_schema_has_the_required_indexes(self):
+        with self.pool.connection() as connection:
+            self.assertEqual(check_schema(connection, MIGRATIONS_DIR), [])
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT COUNT(*) AS users FROM users")
+            # Accounts with known passwords are only created by seed-default-users
+            self.assertEqual(cursor.fetchone(), {'users': 0})
+            cursor.execute("INSERT INTO users (username, full_name, email, role, password, created_date) "
+                           "VALUES ('admin', 'A', 'a@example.com', 'Admin', 'x', NOW())")
+            cursor.execute("SELECT role FROM users WHERE username = %s", ('ADMIN',))
+            self.assertEqual(cursor.fetchone(), {'role': 'Admin'})
+            cursor.close()
+
+    def test_rows_errors_and_upserts_behave_like_mysql(self):
+        uploaded = datetime(2024, 5, 1, 10, 30, 15)
+        with self.pool.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                INSERT INTO letters (letter_number, filename, original_filename, uploaded_by, upload_date, status)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, ('ABC123', 'a/b/abc', 'letter.pdf', 1, uploaded, 'Pending'))
+            for _ in range(2):
+                cursor.execute("""
+                    INSERT INTO letter_status_counts (uploaded_by, status, letter_count) VALUES (%s, %s, 1)
+                    ON DUPLICATE KEY UPDATE letter_count = letter_count + VALUES(letter_count)
+                """, (1, 'Pending'))
+            connection.commit()
+
+            cursor.execute("SELECT upload_date, verified_date FROM letters WHERE letter_number = %s", ('abc123',))
+            self.assertEqual(cursor.fetchone(), {'upload_date': uploaded, 'verified_date': None})
+            cursor.execute("SELECT letter_count FROM letter_status_counts WHERE uploaded_by = 1")
+            self.assertEqual(cursor.fetchall(), [{'letter_count': 2}])
+
+            cursor.execute("INSERT INTO users (username, full_name, email, password, created_date) "
+                           "VALUES ('admin', 'X', 'x@example.com', 'x', NOW())")
+            with self.assertRaises(IntegrityError):
+                cursor.execute("INSERT INTO users (username, full_name, email, password, created_date) "
+                               "VALUES ('Admin', 'X', 'x@example.com', 'x', NOW())")
+            with self.assertRaises(Error):
+                cursor.execute("SELECT missing_column FROM letters")
+            cursor.close()
+
+    def test_select_for_update_holds_the_write_lock_until_commit(self):
+        order = []
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT setting_value FROM settings WHERE setting_key = 'company_name' FOR UPDATE")
+            cursor.fetchall()
+
+            def writer():
+                with self.pool.connection() as other:
+                    other_cursor = other.cursor()
+                    other_cursor.execute("UPDATE settings SET setting_value = 'B' WHERE setting_key = 'company_name'")
+                    other.commit()
+                    order.append('second')
+
+            thread = threading.Thread(target=writer)
+            thread.start()
+            thread.join(0.3)
+            cursor.execute("UPDATE settings SET setting_value = 'A' WHERE setting_key = 'company_name'")
+            order.append('first')
+            connection.commit()
+            cursor.close()
+        thread.join()
+
+        self.assertEqual(order, ['first', 'second'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import MagicMock
+import tempfile
+import sys
+import os
+
+# Add parent directory to path to import storage
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import IngestedUpload
+from storage import BlobStore, release_blob, file_sha256
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = BlobStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def upload(self, content):
+        upload = IngestedUpload(os.path.join(self.directory.name, '.incoming'))
+        upload.write(content)
+        return upload
+
+    def test_identical_uploads_share_one_file(self):
+        first, second = self.upload(b'%PDF-1.7 same'), self.upload(b'%PDF-1.7 same')
+
+        self.assertEqual(self.store.add(first), self.store.add(second))
+        first.close()
+        second.close()
+
+        sha256 = first.sha256
+        self.assertEqual(self.store.relative_path(sha256), f'{sha256[:2]}/{sha256[2:4]}/{sha256}')
+        self.assertEqual(file_sha256(self.store.path(sha256)), (sha256, 13))
+        self.assertEqual(os.listdir(os.path.join(self.directory.name, '.incoming')), [])
+
+    def test_add_file_leaves_the_source(self):
+        source = os.path.join(self.directory.name, 'legacy.pdf')
+        with open(source, 'wb') as handle:
+            handle.write(b'%PDF-1.4 legacy')
+        sha256, _ = file_sha256(source)
+
+        self.store.add_file(source, sha256)
+
+        self.assertTrue(os.path.exists(source))
+        self.assertTrue(os.path.exists(self.store.path(sha256)))
+
+    def test_release_reports_last_reference(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = {'ref_count': 2}
+        self.assertFalse(release_blob(cursor, 'ab' * 32))
+        self.assertIn('ref_count - 1', cursor.execute.call_args.args[0])
+
+        cursor.fetchone.return_value = {'ref_count': 1}
+        self.assertTrue(release_blob(cursor, 'ab' * 32))
+        self.assertIn('DELETE FROM blobs', cursor.execute.call_args.args[0])
+
+if __name__ == '__main__':
+    unittest.main()
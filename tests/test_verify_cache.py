@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch
+import time
+import sys
+import os
+
+# Add parent directory to path to import verify_cache
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events import MemoryEventBroker
+from verify_cache import VerifyCache
+
+class TestVerifyCache(unittest.TestCase):
+    def test_entries_expire_after_their_ttl(self):
+        cache = VerifyCache(ttl=60, negative_ttl=5)
+        cache.set('L1', '<p>verified</p>', found=True)
+        cache.set('NOPE', '<p>unknown</p>', found=False)
+
+        self.assertEqual(cache.get('L1'), ('<p>verified</p>', True))
+        self.assertEqual(cache.get('NOPE'), ('<p>unknown</p>', False))
+
+        later = time.monotonic() + 10
+        with patch('verify_cache.time.monotonic', return_value=later):
+            self.assertIsNotNone(cache.get('L1'))
+            self.assertIsNone(cache.get('NOPE'))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['negative_hits'], stats['misses']), (2, 1, 1))
+
+    def test_letter_events_invalidate_entries(self):
+        broker = MemoryEventBroker()
+        cache = VerifyCache()
+        cache.listen(broker)
+        cache.set('L1', '<p>pending</p>', found=True)
+
+        broker.publish('letter.status', {'letter_number': 'L1', 'status': 'Verified'})
+
+        deadline = time.monotonic() + 2
+        while cache.get('L1') is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(cache.get('L1'))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_any_spelling_of_a_number_shares_one_entry(self):
+        cache = VerifyCache()
+        cache.set('abc123', '<p>pending</p>', found=True)
+
+        self.assertEqual(cache.get('ABC123'), ('<p>pending</p>', True))
+        cache.invalidate('ABC123')
+        self.assertIsNone(cache.get('abc123'))
+
+    def test_pages_rendered_while_a_replica_catches_up_expire_early(self):
+        cache = VerifyCache(ttl=60, settle=5)
+        cache.invalidate('L1')
+        cache.set('L1', '<p>maybe stale</p>', found=True)
+        cache.set('L2', '<p>fresh</p>', found=True)
+
+        later = time.monotonic() + 10
+        with patch('verify_cache.time.monotonic', return_value=later):
+            self.assertIsNone(cache.get('L1'))
+            self.assertIsNotNone(cache.get('L2'))
+
+    def test_size_is_bounded(self):
+        cache = VerifyCache(max_items=2)
+        for letter_number in ('A', 'B', 'C'):
+            cache.set(letter_number, '', found=False)
+
+        self.assertIsNone(cache.get('A'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Read-through cache for the public /verify page.
+
+Every QR scan lands on /verify/<letter_number>, so the rendered page is
+kept per letter number for a short TTL, and unknown numbers are remembered
+for a shorter one so bots probing random numbers don't reach MySQL either.
+Entries are dropped as soon as a letter changes: directly by the worker
+that made the change, and in every other worker by a listener thread that
+follows the letter event broker used for /api/events.
+
+With a lagging read replica, a page rendered just after an invalidation
+may still show the old state, so entries stored within `settle` seconds of
+one expire when that window ends.
+
+Letter numbers match case-insensitively in the database, so entries are
+keyed by the upper-case number: a change to a letter drops the cached page
+for every spelling of its number.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifyCache:
+    """Per-process TTL cache of rendered verification pages with hit statistics"""
+
+    def __init__(self, ttl=60, negative_ttl=10, max_items=10000, settle=0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_items = max_items
+        self.settle = settle
+        self._entries = OrderedDict()
+        self._unsettled = {}
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(letter_number):
+        return letter_number.upper()
+
+    def get(self, letter_number):
+        """Return (html, found) for a cached page, or None on a miss"""
+        letter_number = self.key(letter_number)
+        with self._lock:
+            entry = self._entries.get(letter_number)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+
+            if entry[2]:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return entry[1], entry[2]
+
+    def set(self, letter_number, html, found):
+        now = time.monotonic()
+        expires = now + (self.ttl if found else self.negative_ttl)
+        letter_number = self.key(letter_number)
+        with self._lock:
+            settled_at = self._unsettled.get(letter_number)
+            if settled_at is not None:
+                if settled_at > now:
+                    expires = min(expires, settled_at)
+                else:
+                    del self._unsettled[letter_number]
+            self._entries[letter_number] = (expires, html, found)
+            self._entries.move_to_end(letter_number)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, letter_number):
+        letter_number = self.key(letter_number)
+        with self._lock:
+            if self._entries.pop(letter_number, None) is not None:
+                self.invalidations += 1
+            if self.settle:
+                now = time.monotonic()
+                if len(self._unsettled) >= self.max_items:
+                    self._unsettled = {key: until for key, until in self._unsettled.items() if until > now}
+                self._unsettled[letter_number] = now + self.settle
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+            }
+
+    def listen(self, broker):
+        """Start (once per process) the thread that invalidates entries on letter events"""
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            # Forked workers don't inherit the parent's threads or its entries
+            self._entries.clear()
+            self._listener_pid = os.getpid()
+
+        threading.Thread(target=self._follow, args=(broker,), daemon=True).start()
+
+    def _follow(self, broker):
+        position, _ = broker.position()
+        while True:
+            try:
+                events, position = broker.wait(position, 30)
+            except OSError as e:
+                print(f"Verify cache listener error: {e}")
+                time.sleep(5)
+                continue
+
+            for event in events:
+                letter_number = (event.data or {}).get('letter_number')
+                if letter_number:
+                    self.invalidate(letter_number)